@@ -1,14 +1,15 @@
 # ./agents/data_loader_agent.py
 
-import os
+import threading
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 from services.logger_config import app_logger
+from services.llm_registry import get_chat_llm
+from services.settings import STORAGE_BACKEND
 
 # Importe as ferramentas que este agente usará
 from tools.unzip_file_tool import unzip_file_tool
-from tools.load_csv_tool import load_csv_to_sqlite_tool
+from tools.load_csv_tool import load_csv_to_sqlite_tool, load_zip_to_sqlite_tool
 
 load_dotenv()
 
@@ -16,15 +17,17 @@ class DataLoaderAgent:
     def __init__(self):
         # Inicializa o LLM que este agente usará.
         # Ele precisa de um LLM para raciocinar e decidir qual ferramenta usar.
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini", # Usando o modelo especificado
-            temperature=0,       # Determinístico para tarefas de carga de dados
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        # Determinístico para tarefas de carga de dados (cliente compartilhado no processo)
+        self.llm = get_chat_llm(temperature=0, track_usage=False)
+        self._crews = {} # extract_to_disk -> Crew pré-montada
+        self._crew_lock = threading.Lock()
+        self._kickoff_lock = threading.Lock()
 
-    def run(self, zip_file_path: str, destination_directory: str):
-        app_logger.info(f"DataLoaderAgent: Iniciando execução para '{zip_file_path}'")
-        
+    def _build_crew(self, extract_to_disk: bool) -> Crew:
+        """
+        Monta o agente, as tarefas e a Crew de carga, uma única vez para cada fluxo (leitura direta
+        do ZIP ou descompactação no disco); os caminhos e o backend entram como inputs do kickoff.
+        """
         # 1. Defina o Agente
         data_loader_agent = Agent(
             role="Engenheiro de Dados para Carga de Arquivos",
@@ -34,15 +37,16 @@ class DataLoaderAgent:
                 "de arquivo e organizar informações para análise posterior. Garanto que todos os dados "
                 "sejam carregados corretamente e que seus esquemas sejam devidamente registrados."
             ),
-            tools=[unzip_file_tool, load_csv_to_sqlite_tool], # Passa as funções das ferramentas diretamente
+            tools=[unzip_file_tool, load_csv_to_sqlite_tool, load_zip_to_sqlite_tool], # Passa as funções das ferramentas diretamente
             verbose=True,
             allow_delegation=False,
             llm=self.llm # Atribui o LLM ao agente
         )
 
         # 2. Defina as Tarefas
+        # {zip_file_path}, {destination_directory} e {storage_backend} são preenchidos pela Crew a partir dos inputs do kickoff
         unzip_task = Task(
-            description=f"""
+            description="""
             Descompacte o arquivo ZIP localizado em '{zip_file_path}' para o diretório de destino '{destination_directory}'.
             Assegure-se de que todos os arquivos CSV contidos no ZIP sejam extraídos corretamente.
             """,
@@ -55,11 +59,12 @@ class DataLoaderAgent:
         )
 
         load_csv_task = Task(
-            description=f"""
+            description="""
             Após a descompactação, carregue todos os arquivos CSV encontrados no diretório '{destination_directory}'
             para o banco de dados SQLite localizado em './tmp/db.sqlite'.
             Cada arquivo CSV deve se tornar uma tabela no SQLite com o mesmo nome do arquivo (ajustado para ser válido para SQL).
             Além disso, os metadados de cada tabela (nomes de colunas e tipos de dados) devem ser registrados no DataFrameStore.
+            Use obrigatoriamente storage_backend='{storage_backend}' ao chamar a ferramenta de carga.
             """,
             expected_output=(
                 "Uma mensagem de sucesso confirmando a quantidade de arquivos CSV carregados no SQLite "
@@ -69,20 +74,65 @@ class DataLoaderAgent:
             agent=data_loader_agent
         )
 
+        # Carga direta: os CSVs são lidos de dentro do ZIP, sem cópia temporária no disco
+        load_zip_task = Task(
+            description="""
+            Carregue todos os arquivos CSV contidos no arquivo ZIP '{zip_file_path}' diretamente
+            para o banco de dados SQLite localizado em './tmp/db.sqlite', sem descompactá-lo no disco.
+            Cada arquivo CSV deve se tornar uma tabela no SQLite com o mesmo nome do arquivo (ajustado para ser válido para SQL).
+            Além disso, os metadados de cada tabela (nomes de colunas e tipos de dados) devem ser registrados no DataFrameStore.
+            Use obrigatoriamente storage_backend='{storage_backend}' ao chamar a ferramenta de carga.
+            """,
+            expected_output=(
+                "Uma mensagem de sucesso confirmando a quantidade de arquivos CSV carregados no SQLite "
+                "e que seus metadados foram atualizados no DataFrameStore, ou uma mensagem de erro detalhada."
+            ),
+            tools=[load_zip_to_sqlite_tool],
+            agent=data_loader_agent
+        )
+
+        tasks = [unzip_task, load_csv_task] if extract_to_disk else [load_zip_task]
+
         # 3. Crie a Crew para orquestrar o agente e as tarefas
-        crew = Crew(
+        return Crew(
             agents=[data_loader_agent],
-            tasks=[unzip_task, load_csv_task],
+            tasks=tasks,
             verbose=True,
             process=Process.sequential # Garante que as tarefas sejam executadas em ordem
         )
 
-        # 4. Inicie o processo da Crew
+    def _get_crew(self, extract_to_disk: bool) -> Crew:
+        with self._crew_lock:
+            if extract_to_disk not in self._crews:
+                self._crews[extract_to_disk] = self._build_crew(extract_to_disk)
+            return self._crews[extract_to_disk]
+
+    def run(self, zip_file_path: str, destination_directory: str, extract_to_disk: bool = False,
+            storage_backend: str = STORAGE_BACKEND):
+        """
+        Carrega os CSVs do ZIP no SQLite (ou como arquivos Parquet, conforme storage_backend).
+        Invólucro opcional (INGESTION_MODE=agent): o agente decide chamar as ferramentas de carga,
+        que executam o pipeline determinístico de services/ingestion_pipeline.py. Sem necessidade do
+        raciocínio do LLM, chame ingest_zip diretamente.
+
+        Args:
+            zip_file_path (str): O caminho do arquivo ZIP.
+            destination_directory (str): Diretório de extração (usado apenas com extract_to_disk=True).
+            extract_to_disk (bool): Se True, usa o fluxo antigo (descompactar para o disco e depois
+                                    carregar o diretório). Por padrão os CSVs são lidos direto do ZIP.
+            storage_backend (str): "sqlite" (padrão) ou "parquet"; registrado nos metadados de cada tabela.
+        """
+        app_logger.info(f"DataLoaderAgent: Iniciando execução para '{zip_file_path}'")
+
+        # Crew pré-montada; as execuções são serializadas porque a Crew guarda o estado da execução
         try:
-            result = crew.kickoff(inputs={
-                "zip_file_path": zip_file_path,
-                "destination_directory": destination_directory
-            })
+            crew = self._get_crew(extract_to_disk)
+            with self._kickoff_lock:
+                result = crew.kickoff(inputs={
+                    "zip_file_path": zip_file_path,
+                    "destination_directory": destination_directory,
+                    "storage_backend": storage_backend
+                })
             app_logger.info(f"DataLoaderAgent: Processo CrewAI concluído com sucesso. Resultado: {result}")
             return result
         except Exception as e:
@@ -1,50 +1,48 @@
 # data-zip-analyzer/agents/query_analyzer_agent.py
 
-import os
+import threading
+from collections import OrderedDict
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 
 # Importe as ferramentas que este agente usará
-from tools.sql_generator_tool import sql_generator_tool
-from tools.metadata_query_tool import metadata_query_tool
+from tools.sql_generator_tool import sql_generator_tool, generate_sql
+from tools.metadata_query_tool import metadata_query_tool, generate_metadata_code
 from services.dataframe_store import DataFrameStore # Para obter o contexto dos metadados
+from services.question_cache import QuestionCodeCache
+from services.schema_context import SchemaContext
+from services.settings import SCHEMA_PRUNING, QUERY_PIPELINE
+from services.question_router import route_question, METADATA_ROUTE
+from services.llm_metrics import record_crew_usage, current_question_metrics
+from services.llm_registry import get_chat_llm
 from services.logger_config import app_logger
 
 load_dotenv()
 
+# Gerações aguardando o resultado da execução (ver QueryAnalyzerAgent.record_execution)
+PENDING_GENERATIONS_LIMIT = 64
+
 class QueryAnalyzerAgent:
     def __init__(self):
-        # O LLM para este agente, com temperatura mais baixa para precisão
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0, # Crucial para geração de código determinística
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        # O LLM para este agente, com temperatura 0 (crucial para geração de código determinística).
+        # Cliente compartilhado no processo; o uso é informado pela Crew (track_usage=False)
+        self.llm = get_chat_llm(temperature=0, track_usage=False)
+        self._crew = None # Agente, tarefa e Crew do modo 'crew', montados na primeira utilização
+        self._crew_lock = threading.Lock()
+        self._kickoff_lock = threading.Lock()
         self.dataframe_store = DataFrameStore() # Instancia o Singleton para acesso aos metadados
+        self.question_cache = QuestionCodeCache() # Cache persistente de pergunta -> código
+        # (pergunta, código) -> (contexto do esquema, se veio do cache): o código só entra no cache
+        # depois de executado com sucesso, e sai dele se falhar
+        self._pending = OrderedDict()
+        self._pending_lock = threading.Lock()
 
-    def run(self, question: str):
-        app_logger.info(f"QueryAnalyzerAgent: Iniciando análise para a pergunta: '{question}'")
-
-        # 1. Obtenha o contexto do esquema das tabelas do DataFrameStore
-        # Isso será passado para o SQLGeneratorTool
-        all_metadata_df = self.dataframe_store.get_all_metadata()
-        table_schemas_context = "Não há metadados de tabelas carregados no momento."
-        if not all_metadata_df.empty:
-            # Formata os metadados de forma que o LLM possa entender o esquema
-            # Ex: "Tabela 'nome_tabela': coluna1 TIPO, coluna2 TIPO. "
-            # Agrupa por nome de tabela e constrói a string do esquema
-            grouped_metadata = all_metadata_df.groupby('table_name').apply(
-                lambda x: f"Tabela '{x.name}': " + 
-                          ", ".join([f"{row['column_name']} {row['data_type']}" 
-                                     for idx, row in x.iterrows()]) + "."
-            )
-            table_schemas_context = "\n".join(grouped_metadata.tolist())
-
-        app_logger.debug(f"QueryAnalyzerAgent: Contexto de metadados:\n{table_schemas_context}")
-
-
-        # 2. Defina o Agente
+    def _build_crew(self) -> Crew:
+        """
+        Monta o agente, a tarefa e a Crew do modo 'crew'. São montados uma única vez e reaproveitados:
+        a pergunta e o contexto do esquema entram como inputs do kickoff.
+        """
+        # 1. Defina o Agente
         query_analyzer_agent = Agent(
             role="Analista de Perguntas e Gerador de Consultas",
             goal="Converter perguntas do usuário sobre dados ou metadados em comandos SQL ou código Python executável, utilizando o contexto do esquema das tabelas.",
@@ -54,36 +52,8 @@ class QueryAnalyzerAgent:
                 "necessário para extrair a informação, seja de dados tabulares (via SQL) ou de metadados (via Python). "
                 "Tenho acesso ao esquema de todas as tabelas e metadados carregados para garantir a precisão."
                 "No caso de comparações de texto, converter os campos e o valor procurado para maiúsculo e sem acentos."
-                "chave_de_acesso: valor único na tabela 202401_nfs_cabecalho e, utilizado como chave estrangeira na tabela 202401_nfs_itens;"
-                "modelo: define o modelo do documento;"
-                "serie: é um número de classificação de documento, portanto, não utilizado para cálculo, somente para busca, ordenação ou identificação;"
-                "numero: é um número de identificação de documento, portanto, não utilizado para cálculo, somente para busca, ordenação ou identificação;"
-                "natureza_da_operacao: categorias relacionadas ao motivo da emissão do documento;"
-                "data_emissao: campo de data e hora do momento em que o documento foi gerado;"
-                "evento_mais_recente: campo de categorização do evento relacionado a emissão do documento;"
-                "data_hora_evento_mais_recente: campo de data e hora do evento relacionado a emissão do documento;"
-                "cpf_cnpj_emitente: dígitos de documento de pessoa física (CPF) ou pessoa jurídica (CNPJ) que emitiu o documento, campo não utilizado para cálculo, somente para busca, ordenação ou identificação;"
-                "razao_social_emitente: nome ou descrição relacionado a quem emitiu o documento;"
-                "inscricao_estadual_emitente: número da inscrição estadual do emissor do documento, não utilizado para cálculo, somente para busca, ordenação ou identificação;"
-                "uf_emitente: estado brasileiro onde foi emitido o documento;"
-                "municipio_emitente: cidade brasileira onde foi emitido o documento;"
-                "cnpj_destinatario: dígitos de documento de pessoa jurídica (CNPJ) para a qual foi emitido e entregue o documento, campo não utilizado para cálculo, somente para busca, ordenação ou identificação;"
-                "nome_destinatario: nome ou descrição para a qual foi emitido e entregue o documento;"
-                "uf_destinatario: estado brasileiro para a qual foi emitido e entregue o documento;"
-                "indicador_ie_destinatario: classificação da inscrição estadual para a qual foi emitido e entregue o documento;"
-                "destino_da_operacao: classificação do tipo de operação, se foi dentro do próprio estado ou não, para fins de tributos fiscais;"
-                "consumidor_final: classificação do tipo de utilização dos itens presentes no documento, se são para uso de consumidor final, se são para transformação, para fins de análise de retenções, subsídios e até mesmo proibições;"
-                "presenca_do_comprador: classificação da presença do comprador na emissão do documento;"
-                "valor_nota_fiscal: valor monetário total do documento na moeda Real do Brasil;"
-                "numero_produto: número de ordem do produto no documento, não utilizado para cálculo, somente para busca, ordenação ou identificação;"
-                "descricao_do_produto_servico: nome ou descrição relacionado ao produto ou serviço adquirido pelo destinatário do documento;"
-                "codigo_ncm_sh: código de classificação do tipo de produto ou serviço para fins fiscais (NCM - Nomenclatura Comum do Mercosul ou SH – Sistema Harmonizado), não utilizado para cálculo, somente para busca, ordenação ou identificação;"
-                "ncm_sh_tipo_de_produto: descrição do tipo de produto ou serviço para fins fiscais (NCM - Nomenclatura Comum do Mercosul ou SH – Sistema Harmonizado);"
-                "cfop: o Código Fiscal de Operações e Prestações (CFOP) trata-se de um sistema de códigos usado no Brasil para identificar e classificar as diversas naturezas de operações e prestações de serviços sujeitas à incidência do Imposto sobre Circulação de Mercadorias e Serviços (ICMS), não utilizado para cálculo, somente para busca, ordenação ou identificação;"
-                "quantidade: valor numérico para cálculo, tendo como dimensão o campo UNIDADE;"
-                "unidade: dimensão relacionada ao valor do campo QUANTIDADE;"
-                "valor_unitario: valor monetário da unidade (quantidade = 1) do produto ou serviço especificado, na moeda Real do Brasil;"
-                "valor_total: valor total calculado do produto ou serviço, multiplicando os campos QUANTIDADE e VALOR UNITÁRIO, resultando  em valor monetário na moeda Real do Brasil;"
+                "O significado de cada coluna (ex: quais são apenas identificadores, sem uso em cálculos) está no "
+                "glossário das colunas que acompanha o contexto do esquema."
             ),
             tools=[sql_generator_tool, metadata_query_tool], # Passa as funções das ferramentas
             verbose=True,
@@ -91,11 +61,12 @@ class QueryAnalyzerAgent:
             llm=self.llm
         )
 
-        # 3. Defina a Tarefa
+        # 2. Defina a Tarefa
         # A tarefa é que o agente decida qual ferramenta usar e gere o código.
         # O prompt precisa ser muito claro para que ele gere o código e não apenas uma descrição.
+        # {question} e {table_schemas_context} são preenchidos pela Crew a partir dos inputs do kickoff.
         analyze_and_generate_task = Task(
-            description=f"""
+            description="""
             Analise a seguinte pergunta do usuário: "{question}".
 
             **Contexto das tabelas SQLite e seus esquemas:**
@@ -118,18 +89,142 @@ class QueryAnalyzerAgent:
             agent=query_analyzer_agent
         )
 
-        # 4. Crie a Crew (apenas com este agente para esta parte do fluxo)
-        crew = Crew(
+        # 3. Crie a Crew (apenas com este agente para esta parte do fluxo)
+        return Crew(
             agents=[query_analyzer_agent],
             tasks=[analyze_and_generate_task],
             verbose=True,
             process=Process.sequential # Apenas uma tarefa aqui, mas manter para consistência
         )
 
-        # 5. Inicie o processo da Crew
+    def _get_crew(self) -> Crew:
+        with self._crew_lock:
+            if self._crew is None:
+                self._crew = self._build_crew()
+            return self._crew
+
+    @staticmethod
+    def _code_text(generated_code) -> str:
+        return (generated_code.raw if hasattr(generated_code, 'raw') else str(generated_code)).strip()
+
+    def _remember_pending(self, question: str, table_schemas_context: str, generated_code, from_cache: bool):
+        """
+        Guarda o contexto em que o código foi gerado (ou obtido do cache) até que a execução seja informada.
+        """
+        key = (question, self._code_text(generated_code))
+        with self._pending_lock:
+            self._pending[key] = (table_schemas_context, from_cache)
+            self._pending.move_to_end(key)
+            while len(self._pending) > PENDING_GENERATIONS_LIMIT:
+                self._pending.popitem(last=False)
+
+    def record_execution(self, question: str, generated_code, succeeded: bool):
+        """
+        Informa o resultado da execução do código devolvido por run() para a pergunta.
+        Código executado com sucesso entra no cache de perguntas (exceto mensagens de erro ou de
+        ausência de dados); código obtido do cache que falhou é removido dele, para que a próxima
+        pergunta igual gere o código de novo.
+
+        Args:
+            question (str): A pergunta passada a run().
+            generated_code: O código devolvido por run() (str ou CrewOutput).
+            succeeded (bool): Se a execução terminou sem erro.
+        """
+        code = self._code_text(generated_code)
+        with self._pending_lock:
+            pending = self._pending.pop((question, code), None)
+        if pending is None:
+            return
+        table_schemas_context, from_cache = pending
+        # O cache é apenas uma otimização: uma falha aqui não deve impedir a resposta
+        try:
+            if not succeeded:
+                if from_cache:
+                    self.question_cache.invalidate(question, table_schemas_context)
+                    app_logger.info(f"QueryAnalyzerAgent: Código do cache falhou e foi removido: '{question}'.")
+            elif not from_cache and code and not code.startswith(("[ERRO]", "Não há metadados")):
+                self.question_cache.put(question, table_schemas_context, code)
+        except Exception as e:
+            app_logger.warning(f"QueryAnalyzerAgent: Falha ao atualizar o cache de perguntas: {e}")
+
+    def _run_direct(self, question: str, table_schemas_context: str) -> str:
+        """
+        Modo de geração direto: o roteador local decide entre dados e metadados e o código é
+        gerado com uma única chamada ao LLM, sem o raciocínio do agente.
+        """
+        store = self.dataframe_store
+        column_names = {
+            name for table_name in store.get_table_names() if store.get_table(table_name) is not None
+            for name in store.get_table(table_name).column_names()
+        }
+        route, metadata_score, data_score = route_question(question, store.get_table_names(), column_names)
+        app_logger.info(
+            f"QueryAnalyzerAgent: Pergunta roteada para '{route}' (metadados {metadata_score}, dados {data_score})."
+        )
+        metrics = current_question_metrics()
+        if metrics is not None:
+            metrics.route = route
+        if route == METADATA_ROUTE:
+            return generate_metadata_code(question)
+        return generate_sql(question, table_schemas_context)
+
+    def run(self, question: str, mode: str = QUERY_PIPELINE):
+        """
+        Gera o código (SQL ou Python) que responde à pergunta. O resultado da execução do código
+        deve ser informado em record_execution(), que decide o que fica no cache de perguntas.
+
+        Args:
+            question (str): A pergunta do usuário.
+            mode (str): "direct" (uma chamada ao LLM) ou "crew" (agente da CrewAI escolhe a ferramenta).
+
+        Returns:
+            O código gerado (str no modo direto, CrewOutput no modo crew).
+        """
+        app_logger.info(f"QueryAnalyzerAgent: Iniciando análise para a pergunta: '{question}' (modo {mode})")
+
+        # 1. Obtenha o contexto do esquema das tabelas do DataFrameStore
+        # Isso será passado para o SQLGeneratorTool
+        # Ex: "Tabela 'nome_tabela' (1000 linhas): coluna1 TIPO [perfil], coluna2 TIPO [perfil]."
+        # Com SCHEMA_PRUNING, apenas as tabelas/colunas relevantes para a pergunta (e o glossário delas)
+        # dentro de SCHEMA_CONTEXT_TOKEN_BUDGET; o índice é montado uma vez por versão (ver services/schema_context.py)
+        if SCHEMA_PRUNING:
+            table_schemas_context = SchemaContext().pruned_context(question)
+        else:
+            table_schemas_context = SchemaContext().full_context()
+
+        app_logger.debug(f"QueryAnalyzerAgent: Contexto de metadados:\n{table_schemas_context}")
+
+        # Mesma pergunta (ignorando acentos, maiúsculas, espaços e pontuação) com o mesmo esquema:
+        # reutiliza o código já gerado, sem nenhuma chamada ao LLM
+        try:
+            cached_code = self.question_cache.get(question, table_schemas_context)
+        except Exception as e:
+            app_logger.warning(f"QueryAnalyzerAgent: Falha ao consultar o cache de perguntas: {e}")
+            cached_code = None
+        if cached_code is not None:
+            metrics = current_question_metrics()
+            if metrics is not None:
+                metrics.route = "cache"
+            app_logger.info(f"QueryAnalyzerAgent: Código obtido do cache de perguntas: \n```\n{cached_code}\n```")
+            self._remember_pending(question, table_schemas_context, cached_code, from_cache=True)
+            return cached_code
+
+        if mode == "direct":
+            generated_code = self._run_direct(question, table_schemas_context)
+            app_logger.info(f"QueryAnalyzerAgent: Código gerado no modo direto: \n```\n{generated_code}\n```")
+            self._remember_pending(question, table_schemas_context, generated_code, from_cache=False)
+            return generated_code
+
+        # 2. Inicie o processo da Crew pré-montada com os inputs desta pergunta.
+        # A Crew guarda o estado da execução (descrições interpoladas, saídas das tarefas), portanto
+        # as execuções no modo 'crew' são serializadas; o modo direto não passa por aqui.
         try:
-            generated_code = crew.kickoff(inputs={"question": question})
+            crew = self._get_crew()
+            with self._kickoff_lock:
+                generated_code = crew.kickoff(inputs={"question": question, "table_schemas_context": table_schemas_context})
+            record_crew_usage(generated_code)
             app_logger.info(f"QueryAnalyzerAgent: Código gerado pela CrewAI: \n```\n{generated_code}\n```")
+            self._remember_pending(question, table_schemas_context, generated_code, from_cache=False)
             return generated_code
         except Exception as e:
             app_logger.error(f"QueryAnalyzerAgent: Erro durante a geração do código pela Crew: {e}", exc_info=True)
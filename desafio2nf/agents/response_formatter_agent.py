@@ -1,29 +1,101 @@
 # ./agents/response_formatter_agent.py
 
-import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+import pandas as pd
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 from services.logger_config import app_logger
+from services.llm_registry import get_chat_llm
+from services.llm_metrics import record_crew_usage # Uso dos agentes: informado pela Crew, não pelo callback do cliente
 
 # Importe as ferramentas que este agente usará para execução
-from tools.sqlite_query_tool import sqlite_query_tool
-from tools.metadata_query_tool import metadata_query_tool
+from tools.sqlite_query_tool import sqlite_query_tool, run_select_query
+from tools.metadata_query_tool import metadata_query_tool, execute_metadata_code
 
 load_dotenv()
 
+
+@dataclass
+class QueryExecutionResult:
+    """
+    Resultado estruturado da execução direta do código gerado, para a interface renderizar.
+
+    Attributes:
+        kind (str): 'sql', 'metadata' ou 'text' (saída que não é código executável, ex: uma mensagem).
+        code (str): O código executado (já sem cercas Markdown).
+        dataframe (pd.DataFrame): O resultado tabular, quando houver.
+        text (str): O resultado textual (valores, listas, mensagens), quando não for tabular.
+        elapsed_seconds (float): Tempo gasto na execução.
+    """
+    kind: str
+    code: str
+    dataframe: Optional[pd.DataFrame] = None
+    text: Optional[str] = None
+    elapsed_seconds: float = 0.0
+
 class ResponseFormatterAgent:
     def __init__(self):
         # O LLM para este agente, para raciocinar sobre a formatação e execução
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini", # Usando o modelo especificado
-            temperature=0.2,     # Um pouco mais de temperatura aqui pode ajudar na formatação amigável
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        # Um pouco mais de temperatura aqui pode ajudar na formatação amigável (cliente compartilhado no processo)
+        self.llm = get_chat_llm(temperature=0.2, track_usage=False)
+        self._crew = None # Agente, tarefa e Crew do resumo narrativo, montados na primeira utilização
+        self._crew_lock = threading.Lock()
+        self._kickoff_lock = threading.Lock()
 
-    def run(self, generated_code: str):
-        app_logger.info(f"ResponseFormatterAgent: Iniciando formatação para o código: \n```\n{generated_code}\n```")
+    @staticmethod
+    def _strip_code_fences(generated_code: str) -> str:
+        """Remove cercas de código Markdown (```sql, ```python, ```) ao redor do código."""
+        code = generated_code.strip()
+        code = re.sub(r"^```[a-zA-Z]*\s*", "", code)
+        code = re.sub(r"\s*```$", "", code)
+        return code.strip()
+
+    def execute(self, generated_code: str) -> QueryExecutionResult:
+        """
+        Execução direta, sem LLM: envia SQL ao banco (via cache de resultados e conexões de leitura)
+        e código de metadados ao executor de metadados, seguindo as mesmas regras de decisão que
+        a tarefa do agente descreve. Use run() apenas quando um resumo narrativo for desejado.
+
+        Args:
+            generated_code (str): O código gerado pelo QueryAnalyzerAgent.
 
+        Returns:
+            QueryExecutionResult: O resultado estruturado, com o tempo de execução.
+
+        Raises:
+            Exception: Erros de execução do SQL ou do código Python são propagados.
+        """
+        code = self._strip_code_fences(generated_code)
+        start = time.perf_counter()
+
+        if code.lower().startswith(("select", "with")):
+            kind = "sql"
+            execution_result = run_select_query(code)
+        elif "all_metadata_df" in code or "DataFrameStore" in code:
+            kind = "metadata"
+            execution_result = execute_metadata_code(code)
+        else:
+            # Ex: a ferramenta de metadados já devolve o resultado pronto, ou uma mensagem de aviso
+            kind = "text"
+            execution_result = code
+
+        elapsed_seconds = time.perf_counter() - start
+        app_logger.info(f"ResponseFormatterAgent: Execução direta ({kind}) em {elapsed_seconds:.3f}s.")
+        if isinstance(execution_result, pd.DataFrame):
+            return QueryExecutionResult(kind, code, dataframe=execution_result, elapsed_seconds=elapsed_seconds)
+        if isinstance(execution_result, pd.Series):
+            return QueryExecutionResult(kind, code, dataframe=execution_result.to_frame(), elapsed_seconds=elapsed_seconds)
+        return QueryExecutionResult(kind, code, text=str(execution_result), elapsed_seconds=elapsed_seconds)
+
+    def _build_crew(self) -> Crew:
+        """
+        Monta o agente, a tarefa e a Crew do resumo narrativo, uma única vez; o código gerado entra
+        como input do kickoff.
+        """
         # 1. Defina o Agente
         response_formatter_agent = Agent(
             role="Formatador e Apresentador de Respostas",
@@ -40,9 +112,9 @@ class ResponseFormatterAgent:
             llm=self.llm
         )
 
-        # 2. Defina a Tarefa
+        # 2. Defina a Tarefa ({generated_code} é preenchido pela Crew a partir dos inputs do kickoff)
         format_and_present_task = Task(
-            description=f"""
+            description="""
             Você recebeu o seguinte código gerado:
             ```
             {generated_code}
@@ -75,16 +147,28 @@ class ResponseFormatterAgent:
         )
 
         # 3. Crie a Crew para orquestrar o agente e a tarefa
-        crew = Crew(
+        return Crew(
             agents=[response_formatter_agent],
             tasks=[format_and_present_task],
             verbose=True,
             process=Process.sequential
         )
 
-        # 4. Inicie o processo da Crew
+    def _get_crew(self) -> Crew:
+        with self._crew_lock:
+            if self._crew is None:
+                self._crew = self._build_crew()
+            return self._crew
+
+    def run(self, generated_code: str):
+        app_logger.info(f"ResponseFormatterAgent: Iniciando formatação para o código: \n```\n{generated_code}\n```")
+
+        # Crew pré-montada; as execuções são serializadas porque a Crew guarda o estado da execução
         try:
-            final_response = crew.kickoff(inputs={"generated_code": generated_code})
+            crew = self._get_crew()
+            with self._kickoff_lock:
+                final_response = crew.kickoff(inputs={"generated_code": generated_code})
+            record_crew_usage(final_response)
             app_logger.info(f"ResponseFormatterAgent: Resposta final da CrewAI: \n```\n{final_response}\n```")
             return final_response
         except Exception as e:
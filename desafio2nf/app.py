@@ -7,22 +7,30 @@ from agents.data_loader_agent import DataLoaderAgent
 from agents.query_analyzer_agent import QueryAnalyzerAgent
 from agents.response_formatter_agent import ResponseFormatterAgent
 from services.dataframe_store import DataFrameStore # Para exibir metadados
+from services.connection_manager import SQLiteConnectionManager
+from services.query_result_cache import QueryResultCache
+from services.question_cache import QuestionCodeCache
+from services.parquet_store import ParquetColumnCache
 from services.logger_config import app_logger # Log
+from services.settings import UPLOAD_DIR, DB_PATH, STORAGE_BACKEND, QUERY_PIPELINE, INGESTION_MODE
+from services.ingestion_jobs import IngestionJobRunner, JOB_DONE, JOB_CANCELLED
+from services.llm_metrics import track_question, QuestionMetricsLog
 from dotenv import load_dotenv
 
 load_dotenv() # Carrega as variáveis de ambiente do .env
 
 # --- Configurações Iniciais ---
-UPLOAD_DIR = "./tmp"
-DB_PATH = os.path.join(UPLOAD_DIR, "db.sqlite")
-
 # Garante que o diretório de uploads exista
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# Inicializa os agentes
-data_loader_agent_instance = DataLoaderAgent()
-query_analyzer_agent_instance = QueryAnalyzerAgent()
-response_formatter_agent_instance = ResponseFormatterAgent()
+# Inicializa os agentes uma única vez por processo: o Streamlit reexecuta este módulo a cada interação,
+# mas st.cache_resource devolve as mesmas instâncias (com seus clientes de LLM e Crews pré-montadas)
+# para todas as execuções e sessões.
+@st.cache_resource
+def get_agents():
+    return DataLoaderAgent(), QueryAnalyzerAgent(), ResponseFormatterAgent()
+
+data_loader_agent_instance, query_analyzer_agent_instance, response_formatter_agent_instance = get_agents()
 
 # Instância do DataFrameStore (singleton)
 dataframe_store_instance = DataFrameStore()
@@ -30,15 +38,71 @@ dataframe_store_instance = DataFrameStore()
 # --- Funções Auxiliares ---
 def clear_uploads_and_db():
     """Limpa o diretório de uploads e o banco de dados SQLite."""
+    if IngestionJobRunner().active_jobs():
+        st.sidebar.warning("Há uma carga em andamento. Cancele-a ou aguarde o término antes de limpar o ambiente.")
+        return
+    SQLiteConnectionManager().close_all() # Fecha as conexões antes de apagar o arquivo do banco
     if os.path.exists(UPLOAD_DIR):
         shutil.rmtree(UPLOAD_DIR)
     os.makedirs(UPLOAD_DIR, exist_ok=True)
     dataframe_store_instance.clear() # Limpa também os metadados em memória
+    QueryResultCache().clear()
+    ParquetColumnCache().clear()
     app_logger.info("Ambiente de uploads e DB limpo.")
     st.session_state.uploaded_zip_processed = False
+    st.session_state.ingestion_job_id = None
     st.session_state.last_question = ""
     st.success("Ambiente limpo! Pronto para um novo upload.")
 
+def format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes} min {seconds:02d} s" if minutes else f"{seconds} s"
+
+
+def show_ingestion_progress():
+    """
+    Progresso da carga em segundo plano desta sessão: arquivos, linhas, bytes lidos e estimativa
+    de término, com o botão de cancelamento. Ao final, recarrega a página uma vez para exibir as tabelas.
+    """
+    job = IngestionJobRunner().get(st.session_state.get("ingestion_job_id"))
+    if job is None:
+        return
+    snapshot = job.progress.snapshot()
+    if not job.finished:
+        progress_text = f"Carga {job.status}: {snapshot['files_done']}/{snapshot['files_total']} arquivos"
+        if snapshot["current_file"]:
+            progress_text += f" (lendo '{snapshot['current_file']}')"
+        st.progress(snapshot["fraction"], text=progress_text)
+        progress_caption = (f"{snapshot['rows_loaded']:,} linhas, {snapshot['bytes_read'] / 1e6:,.1f} de "
+                            f"{snapshot['bytes_total'] / 1e6:,.1f} MB lidos em {format_seconds(snapshot['elapsed_seconds'])}")
+        if snapshot["eta_seconds"] is not None:
+            progress_caption += f"; término estimado em {format_seconds(snapshot['eta_seconds'])}"
+        st.caption(progress_caption)
+        if snapshot["cancelled"]:
+            st.caption("Cancelamento solicitado; desfazendo o arquivo em andamento...")
+        elif st.button("Cancelar carga", key=f"cancel_ingestion_{job.job_id}"):
+            job.cancel()
+        return
+
+    if st.session_state.get("ingestion_job_reported") != job.job_id:
+        # Primeira exibição após o término: atualiza o estado e recarrega a página inteira
+        st.session_state.ingestion_job_reported = job.job_id
+        st.session_state.uploaded_zip_processed = bool(dataframe_store_instance.get_table_names())
+        st.rerun()
+    if job.status == JOB_DONE:
+        st.success(job.message())
+    elif job.status == JOB_CANCELLED:
+        st.warning(job.message())
+    else:
+        st.error(job.message())
+    if job.result is not None and job.result.stage_seconds:
+        st.caption(f"Tempo por etapa: {job.result.timings_summary()}")
+
+
+# Com st.fragment (Streamlit 1.37+), apenas o painel de progresso é reexecutado a cada segundo
+if hasattr(st, "fragment"):
+    show_ingestion_progress = st.fragment(run_every=1)(show_ingestion_progress)
+
 # --- Configuração da Página Streamlit ---
 st.set_page_config(layout="wide", page_title="NOTAVIA")
 
@@ -48,59 +112,112 @@ st.markdown("Faça upload de arquivos ZIP contendo CSVs e pergunte sobre seus da
 # --- Estado da Sessão ---
 # Usamos st.session_state para manter o estado entre as interações do Streamlit
 if 'uploaded_zip_processed' not in st.session_state:
-    st.session_state.uploaded_zip_processed = False
+    # Tabelas de cargas anteriores (catálogo do banco) já podem ser consultadas sem novo upload
+    st.session_state.uploaded_zip_processed = bool(dataframe_store_instance.get_table_names())
 if 'last_question' not in st.session_state:
     st.session_state.last_question = ""
 
 # --- Seção de Upload ---
 st.sidebar.header("Upload de Arquivo ZIP")
 uploaded_file = st.sidebar.file_uploader("Arraste e solte seu arquivo .zip aqui", type="zip")
+storage_backends = ["sqlite", "parquet"]
+storage_backend = st.sidebar.selectbox(
+    "Armazenamento das tabelas",
+    storage_backends,
+    index=storage_backends.index(STORAGE_BACKEND) if STORAGE_BACKEND in storage_backends else 0,
+    help="'parquet' grava arquivos colunares particionados por mês de emissão (requer pyarrow)."
+)
 
 if uploaded_file is not None:
-    zip_temp_path = os.path.join(UPLOAD_DIR, uploaded_file.name)
-    with open(zip_temp_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-
-    st.sidebar.success(f"Arquivo '{uploaded_file.name}' carregado para processamento!")
-    app_logger.info(f"Arquivo ZIP '{uploaded_file.name}' carregado para '{zip_temp_path}'.")
-
     # Processa o ZIP APENAS SE AINDA NÃO FOI PROCESSADO NESTA SESSÃO OU UM NOVO FOI UPLOADED
-    if not st.session_state.uploaded_zip_processed or \
+    # (uma carga em segundo plano já enviada para este ZIP não é repetida a cada reexecução do script)
+    if (not st.session_state.uploaded_zip_processed and st.session_state.get('ingestion_job_id') is None) or \
        st.session_state.get('current_zip_name') != uploaded_file.name:
-        
+
+        # O ZIP só é gravado no disco quando uma nova carga começa, nunca durante a leitura por um job
+        zip_temp_path = os.path.join(UPLOAD_DIR, uploaded_file.name)
+        with open(zip_temp_path, "wb") as f:
+            f.write(uploaded_file.getbuffer())
+
+        st.sidebar.success(f"Arquivo '{uploaded_file.name}' carregado para processamento!")
+        app_logger.info(f"Arquivo ZIP '{uploaded_file.name}' carregado para '{zip_temp_path}'.")
+
         st.session_state.current_zip_name = uploaded_file.name
-        
-        with st.spinner("Processando ZIP e carregando dados... Isso pode levar um momento."):
-            try:
-                # Chama o DataLoaderAgent
-                loader_result = data_loader_agent_instance.run(
-                    zip_file_path=zip_temp_path,
-                    destination_directory=UPLOAD_DIR
-                )
-                
-                # Acessamos o atributo 'raw' ou o que for o resultado textual final.
-                # CrewOutput geralmente tem um atributo .raw ou .result
-                # Se for uma string, .raw deve funcionar.
-                display_loader_result = loader_result.raw if hasattr(loader_result, 'raw') else str(loader_result)
-
-                st.write("---")
-                st.subheader("Processamento de Carga Concluído!")
-                # st.success(loader_result)
-                st.success(display_loader_result)
-                app_logger.info(f"Processamento de carga concluído: {display_loader_result}")
-                st.session_state.uploaded_zip_processed = True
-            except Exception as e:
-                st.error(f"Erro no processo de carga: {e}")
-                app_logger.error(f"Erro no processo de carga: {e}", exc_info=True)
-                st.session_state.uploaded_zip_processed = False
-    else:
+
+        if INGESTION_MODE == "agent":
+            with st.spinner("Processando ZIP e carregando dados... Isso pode levar um momento."):
+                try:
+                    # Chama o DataLoaderAgent
+                    loader_result = data_loader_agent_instance.run(
+                        zip_file_path=zip_temp_path,
+                        destination_directory=UPLOAD_DIR,
+                        storage_backend=storage_backend
+                    )
+
+                    # Acessamos o atributo 'raw' ou o que for o resultado textual final.
+                    # CrewOutput geralmente tem um atributo .raw ou .result
+                    # Se for uma string, .raw deve funcionar.
+                    display_loader_result = loader_result.raw if hasattr(loader_result, 'raw') else str(loader_result)
+
+                    st.write("---")
+                    st.subheader("Processamento de Carga Concluído!")
+                    # st.success(loader_result)
+                    st.success(display_loader_result)
+                    app_logger.info(f"Processamento de carga concluído: {display_loader_result}")
+                    st.session_state.uploaded_zip_processed = True
+                except Exception as e:
+                    st.error(f"Erro no processo de carga: {e}")
+                    app_logger.error(f"Erro no processo de carga: {e}", exc_info=True)
+                    st.session_state.uploaded_zip_processed = False
+        else:
+            # Pipeline determinístico (sem LLM) em segundo plano: o script não espera pela carga,
+            # e as tabelas já carregadas continuam consultáveis enquanto ela roda
+            ingestion_job = IngestionJobRunner().submit(zip_temp_path, storage_backend=storage_backend)
+            st.session_state.ingestion_job_id = ingestion_job.job_id
+    elif st.session_state.uploaded_zip_processed:
         st.info("Arquivo ZIP já processado nesta sessão. Limpe para enviar um novo.")
 
+if st.session_state.get("ingestion_job_id") is not None:
+    with st.sidebar:
+        show_ingestion_progress()
+
 # Botão para limpar o ambiente
 if st.sidebar.button("Limpar Ambiente"):
     clear_uploads_and_db()
     st.rerun() # Recarrega a página para refletir o estado limpo
 
+# Estatísticas do cache de resultados de consultas SQL
+query_cache_stats = QueryResultCache().stats()
+st.sidebar.caption(
+    f"Cache de consultas: {query_cache_stats['hits']} acertos, "
+    f"{query_cache_stats['misses']} falhas, {query_cache_stats['entries']} resultados armazenados."
+)
+question_cache_stats = QuestionCodeCache().stats()
+st.sidebar.caption(
+    f"Cache de perguntas: {question_cache_stats['hits']} acertos, {question_cache_stats['misses']} falhas, "
+    f"{question_cache_stats['entries']} códigos armazenados."
+)
+if st.sidebar.button("Limpar cache de perguntas", disabled=not question_cache_stats["entries"],
+                     help="Remove os códigos gerados armazenados; as próximas perguntas geram o código de novo."):
+    removed_entries = QuestionCodeCache().clear()
+    app_logger.info(f"Cache de perguntas limpo: {removed_entries} códigos removidos.")
+    st.rerun()
+
+# Modo de geração do código e métricas médias de cada modo (chamadas ao LLM, tokens e tempo por pergunta)
+query_pipelines = ["direct", "crew"]
+query_pipeline = st.sidebar.selectbox(
+    "Modo de geração",
+    query_pipelines,
+    index=query_pipelines.index(QUERY_PIPELINE) if QUERY_PIPELINE in query_pipelines else 0,
+    help="'direct' decide localmente entre dados e metadados e faz uma única chamada ao LLM; "
+         "'crew' usa o agente da CrewAI para escolher a ferramenta (mais chamadas ao LLM)."
+)
+for mode, mode_stats in QuestionMetricsLog().summary_by_mode().items():
+    st.sidebar.caption(
+        f"Modo {mode}: {mode_stats['questions']} perguntas, em média {mode_stats['avg_llm_calls']:.1f} chamadas ao LLM, "
+        f"{mode_stats['avg_tokens']:.0f} tokens e {mode_stats['avg_seconds']:.2f} s."
+    )
+
 # --- Seções Principais da Aplicação ---
 if st.session_state.uploaded_zip_processed:
     st.write("---")
@@ -114,7 +231,7 @@ if st.session_state.uploaded_zip_processed:
             with st.expander(f"Tabela: **`{table_name}`**"):
                 st.dataframe(
                     all_metadata_df[all_metadata_df['table_name'] == table_name]
-                    [['column_name', 'data_type', 'source_file']],
+                    [['column_name', 'data_type', 'source_file', 'storage_backend']],
                     hide_index=True
                 )
     else:
@@ -133,18 +250,24 @@ if st.session_state.uploaded_zip_processed:
         key="user_question_input"
     )
 
+    narrative_summary = st.checkbox(
+        "Gerar resumo narrativo da resposta (usa o LLM e é mais lento)",
+        value=False,
+        help="Sem esta opção, o código gerado é executado diretamente e o resultado é exibido como tabela."
+    )
+
     if st.button("Perguntar"):
         # Garanta que a pergunta usada seja a do text_area e não apenas a do session_state
         # O valor do 'question' já estará atualizado aqui se o widget foi interatado.
         if question:
             st.session_state.last_question = question # Atualiza o session_state com o valor atual do text_area
             app_logger.info(f"Pergunta do usuário: '{question}'")
-            with st.spinner("Analisando e gerando resposta..."):
+            with st.spinner("Analisando e gerando resposta..."), track_question(question, query_pipeline) as question_metrics:
                 try:
                     # 1. Chama o QueryAnalyzerAgent para gerar o código (SQL ou Python)
                     st.info("Agente de Análise está gerando a consulta...")
                     # generated_code = query_analyzer_agent_instance.run(question=question)
-                    generated_code_crew_output = query_analyzer_agent_instance.run(question=question)
+                    generated_code_crew_output = query_analyzer_agent_instance.run(question=question, mode=query_pipeline)
                     
                     # st.subheader("Código Gerado (SQL ou Python):")
                     # st.code(generated_code, language='sql' if generated_code.strip().lower().startswith('select') else 'python')
@@ -181,28 +304,53 @@ if st.session_state.uploaded_zip_processed:
                     )
                     app_logger.info(f"Código gerado pelo QueryAnalyzerAgent: \n```\n{generated_code.strip()}\n```")
 
-                    # 2. Chama o ResponseFormatterAgent para executar o código e formatar a resposta
-                    st.info("Agente de Formatação está executando e preparando a resposta...")
-                    # final_response = response_formatter_agent_instance.run(generated_code=generated_code)
-                    final_response_crew_output = response_formatter_agent_instance.run(generated_code=generated_code)
-                    
-                    # st.write("---")
-                    # st.subheader("Resposta Final:")
-                    # st.markdown(final_response) # Usa markdown para exibir tabelas, etc.
+                    # 2. Executa o código e apresenta a resposta
+                    if not narrative_summary:
+                        # Caminho direto: execução determinística, sem chamada ao LLM.
+                        # Só código executado com sucesso fica no cache de perguntas (código do cache que falha sai dele)
+                        try:
+                            execution_result = response_formatter_agent_instance.execute(generated_code)
+                        except Exception:
+                            query_analyzer_agent_instance.record_execution(question, generated_code, succeeded=False)
+                            raise
+                        query_analyzer_agent_instance.record_execution(
+                            question, generated_code, succeeded=execution_result.kind != "text"
+                        )
 
-                    # CORREÇÃO: Extrair a string do CrewOutput
-                    if hasattr(final_response_crew_output, 'raw'):
-                        final_response = final_response_crew_output.raw
-                    elif isinstance(final_response_crew_output, str):
-                        final_response = final_response_crew_output
+                        st.write("---")
+                        st.subheader("Resposta Final:")
+                        if execution_result.dataframe is not None:
+                            if execution_result.dataframe.empty:
+                                st.info("A consulta foi executada com sucesso, mas não retornou resultados.")
+                            else:
+                                st.dataframe(execution_result.dataframe, hide_index=True)
+                        else:
+                            st.markdown(execution_result.text)
+                        st.caption(f"Executado em {execution_result.elapsed_seconds * 1000:.0f} ms.")
+                        app_logger.info(f"Resposta direta ({execution_result.kind}) em {execution_result.elapsed_seconds:.3f}s.")
                     else:
-                        final_response = str(final_response_crew_output)
-                        app_logger.warning(f"Tipo de retorno inesperado do ResponseFormatterAgent: {type(final_response_crew_output)}")
+                        # Resumo narrativo: o ResponseFormatterAgent (LLM) executa e formata a resposta
+                        st.info("Agente de Formatação está executando e preparando a resposta...")
+                        # final_response = response_formatter_agent_instance.run(generated_code=generated_code)
+                        final_response_crew_output = response_formatter_agent_instance.run(generated_code=generated_code)
+                        
+                        # st.write("---")
+                        # st.subheader("Resposta Final:")
+                        # st.markdown(final_response) # Usa markdown para exibir tabelas, etc.
 
-                    st.write("---")
-                    st.subheader("Resposta Final:")
-                    st.markdown(final_response)
-                    app_logger.info(f"Resposta final formatada: \n```\n{final_response}\n```")
+                        # CORREÇÃO: Extrair a string do CrewOutput
+                        if hasattr(final_response_crew_output, 'raw'):
+                            final_response = final_response_crew_output.raw
+                        elif isinstance(final_response_crew_output, str):
+                            final_response = final_response_crew_output
+                        else:
+                            final_response = str(final_response_crew_output)
+                            app_logger.warning(f"Tipo de retorno inesperado do ResponseFormatterAgent: {type(final_response_crew_output)}")
+
+                        st.write("---")
+                        st.subheader("Resposta Final:")
+                        st.markdown(final_response)
+                        app_logger.info(f"Resposta final formatada: \n```\n{final_response}\n```")
 
                 except Exception as e:
                     # st.error(f"Ocorreu um erro ao processar sua pergunta: {e}")
@@ -211,6 +359,7 @@ if st.session_state.uploaded_zip_processed:
                     st.error(f"Ocorreu um erro ao processar sua pergunta: {e}")
                     st.info("Verifique os logs em './tmp/agent_activity.log' para mais detalhes.")
                     app_logger.error(f"Erro ao processar pergunta: {e}", exc_info=True)
+            st.caption(f"Pergunta (modo {query_pipeline}): {question_metrics.summary()}.")
 
         else:
             st.warning("Por favor, digite uma pergunta.")
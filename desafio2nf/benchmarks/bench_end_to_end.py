@@ -0,0 +1,253 @@
+# ./benchmarks/bench_end_to_end.py
+#
+# Latência ponta a ponta com o LLM local (LLM_PROVIDER=stub): carga de um ZIP sintético de NF-e
+# (cabeçalho + itens, pelo pipeline de carga, com o tempo de cada etapa) e um conjunto fixo de
+# perguntas, cada uma executada a frio e depois de novo (com os caches aquecidos), medindo
+# montagem do contexto, geração do código e execução.
+# Com --pipeline crew, a carga passa pelo DataLoaderAgent e as perguntas pelo agente da CrewAI
+# (QueryAnalyzerAgent no modo 'crew'): o LLM local substitui apenas o modelo, não os agentes.
+# Cada tamanho roda em um subprocesso próprio, para que o pico de memória (RSS) seja o do cenário.
+# O resultado é gravado em JSON, para comparar commits.
+#
+# Execução (a partir da raiz do projeto):
+#   python -m benchmarks.bench_end_to_end --rows 10000 1000000 10000000 --output bench_end_to_end.json
+#   python -m benchmarks.bench_end_to_end --rows 10000 --pipeline crew --output bench_end_to_end_crew.json
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+# O LLM local precisa estar selecionado antes de importar os módulos do projeto (lido em services/settings.py)
+os.environ["LLM_PROVIDER"] = "stub"
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_sqlite_bulk_write import build_nfe_items
+
+HEADER_TABLE = "202401_nfs_cabecalho"
+ITEMS_TABLE = "202401_nfs_itens"
+GENERATION_CHUNK_ROWS = 500000
+SCENARIO_RESULT_FILE = "scenario.json" # Resultado do subprocesso, no diretório do cenário
+
+# Perguntas do benchmark e o código que o LLM local devolve para cada uma
+QUESTIONS = {
+    "Quantas notas fiscais existem?":
+        f'SELECT COUNT(DISTINCT chave_de_acesso) AS quantidade_notas FROM "{HEADER_TABLE}"',
+    "Qual o valor total dos itens por UF do emitente?":
+        f'SELECT uf_emitente, SUM(valor_total) AS valor_total FROM "{ITEMS_TABLE}" '
+        f'GROUP BY uf_emitente ORDER BY valor_total DESC',
+    "Quais os 10 produtos com maior valor total?":
+        f'SELECT descricao_do_produto_servico, SUM(valor_total) AS valor_total FROM "{ITEMS_TABLE}" '
+        f'GROUP BY descricao_do_produto_servico ORDER BY valor_total DESC LIMIT 10',
+    "Quais tabelas foram carregadas?":
+        "all_metadata_df['table_name'].unique().tolist()",
+}
+
+
+def build_nfe_headers(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Gera um DataFrame sintético com colunas típicas de '*_nfs_cabecalho'."""
+    rng = np.random.default_rng(seed)
+    ufs = np.array(["SP", "RJ", "MG", "SC", "PR", "GO", "BA", "PE"], dtype=object)
+    return pd.DataFrame({
+        "chave_de_acesso": [f"{i:044d}" for i in range(seed, seed + rows)],
+        "data_emissao": "2024-01-15 10:32:00",
+        "uf_emitente": ufs[rng.integers(0, len(ufs), rows)],
+        "razao_social_emitente": "EMPRESA DE TESTE LTDA",
+        "uf_destinatario": ufs[rng.integers(0, len(ufs), rows)],
+        "valor_nota_fiscal": rng.random(rows) * 50000,
+    })
+
+
+def write_csv_member(zf: zipfile.ZipFile, filename: str, rows: int, build):
+    """Grava um CSV no ZIP em blocos de GENERATION_CHUNK_ROWS linhas, sem montá-lo inteiro na memória."""
+    with zf.open(filename, "w", force_zip64=True) as member:
+        with io.TextIOWrapper(member, encoding="utf-8", newline="") as text:
+            for start in range(0, rows, GENERATION_CHUNK_ROWS):
+                chunk = build(min(GENERATION_CHUNK_ROWS, rows - start), start + 1)
+                chunk.to_csv(text, index=False, header=start == 0)
+
+
+def build_nfe_zip(zip_path: str, rows: int):
+    """Gera o ZIP sintético: 'rows' itens e um cabeçalho para cada 4 itens."""
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        write_csv_member(zf, f"{HEADER_TABLE}.csv", max(rows // 4, 1), build_nfe_headers)
+        write_csv_member(zf, f"{ITEMS_TABLE}.csv", rows, build_nfe_items)
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo (ru_maxrss está em KiB no Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_question(question: str, query_analyzer, response_formatter, pipeline: str = "direct") -> dict:
+    """Executa uma pergunta como o app.py faz no modo de geração 'pipeline', medindo cada etapa."""
+    from services.llm_metrics import track_question
+    from services.schema_context import SchemaContext
+
+    with track_question(question, pipeline) as metrics:
+        start = time.perf_counter()
+        SchemaContext().pruned_context(question)
+        context_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        generated_code = query_analyzer.run(question, mode=pipeline)
+        generation_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = response_formatter.execute(str(generated_code))
+        execution_seconds = time.perf_counter() - start
+        query_analyzer.record_execution(question, generated_code, succeeded=result.kind != "text")
+
+    return {
+        "route": metrics.route,
+        "kind": result.kind,
+        "result_rows": len(result.dataframe) if result.dataframe is not None else None,
+        "context_seconds": context_seconds,
+        "generation_seconds": generation_seconds,
+        "execution_seconds": execution_seconds,
+        "wall_seconds": metrics.wall_seconds,
+        "llm_calls": metrics.llm_calls,
+        "prompt_tokens": metrics.prompt_tokens,
+        "completion_tokens": metrics.completion_tokens,
+    }
+
+
+def run_scenario(rows: int, pipeline: str = "direct") -> dict:
+    """
+    Roda um cenário no diretório de trabalho atual (vazio): gera o ZIP, carrega e faz as perguntas.
+    Deve ser chamado em um processo novo (ver main), pois os singletons do projeto guardam estado.
+    Com pipeline "crew", a carga é feita pelo DataLoaderAgent e as perguntas pelo agente da CrewAI.
+    """
+    from agents.data_loader_agent import DataLoaderAgent
+    from agents.query_analyzer_agent import QueryAnalyzerAgent
+    from agents.response_formatter_agent import ResponseFormatterAgent
+    from services.ingestion_pipeline import ingest_zip
+    from services.llm_stub import StubChatLLM
+    from services.query_result_cache import QueryResultCache
+    from services.question_cache import QuestionCodeCache
+    from services.settings import DB_PATH, UPLOAD_DIR, STORAGE_BACKEND
+
+    for question, code in QUESTIONS.items():
+        StubChatLLM.register_response(question, code)
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    zip_path = os.path.join(UPLOAD_DIR, "nfe_sintetico.zip")
+    start = time.perf_counter()
+    build_nfe_zip(zip_path, rows)
+    generation_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if pipeline == "crew":
+        # O agente devolve apenas a mensagem da ferramenta de carga, sem o tempo de cada etapa
+        load_result = str(DataLoaderAgent().run(zip_path, os.path.join(UPLOAD_DIR, "extraidos"),
+                                                storage_backend=STORAGE_BACKEND))
+        load_stage_seconds = {}
+    else:
+        ingestion = ingest_zip(zip_path)
+        load_result, load_stage_seconds = ingestion.message, ingestion.stage_seconds
+    load_seconds = time.perf_counter() - start
+    load_peak_rss_mb = peak_rss_mb()
+
+    query_analyzer = QueryAnalyzerAgent()
+    response_formatter = ResponseFormatterAgent()
+    questions = {}
+    for question in QUESTIONS:
+        questions[question] = {
+            "cold": run_question(question, query_analyzer, response_formatter, pipeline),
+            "warm": run_question(question, query_analyzer, response_formatter, pipeline),
+        }
+
+    return {
+        "rows": rows,
+        "pipeline": pipeline,
+        "zip_mb": os.path.getsize(zip_path) / 1e6,
+        "db_mb": os.path.getsize(DB_PATH) / 1e6 if os.path.exists(DB_PATH) else None,
+        "zip_generation_seconds": generation_seconds,
+        "load_seconds": load_seconds,
+        "load_result": load_result,
+        "load_stage_seconds": load_stage_seconds,
+        "load_peak_rss_mb": load_peak_rss_mb,
+        "peak_rss_mb": peak_rss_mb(),
+        "questions": questions,
+        "question_cache": QuestionCodeCache().stats(),
+        "query_result_cache": QueryResultCache().stats(),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_scenario(scenario: dict):
+    print(f"{scenario['rows']:>10,} linhas: ZIP {scenario['zip_mb']:.1f} MB, carga {scenario['load_seconds']:.2f} s, "
+          f"pico de RSS {scenario['peak_rss_mb']:.0f} MB")
+    if scenario["load_stage_seconds"]:
+        print("    etapas da carga: " + ", ".join(f"{stage} {seconds:.2f} s"
+                                                 for stage, seconds in scenario["load_stage_seconds"].items()))
+    for question, runs in scenario["questions"].items():
+        cold, warm = runs["cold"], runs["warm"]
+        print(f"    {question[:50]:<50} frio {cold['wall_seconds'] * 1000:8.1f} ms "
+              f"(contexto {cold['context_seconds'] * 1000:.1f}, geração {cold['generation_seconds'] * 1000:.1f}, "
+              f"execução {cold['execution_seconds'] * 1000:.1f}) | quente {warm['wall_seconds'] * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000, 10000000],
+                        help="Quantidade de linhas de itens de cada cenário.")
+    parser.add_argument("--output", default="bench_end_to_end.json", help="Arquivo JSON com os resultados.")
+    parser.add_argument("--pipeline", choices=["direct", "crew"], default="direct",
+                        help="Modo de geração: 'direct' (uma chamada ao LLM) ou 'crew' (agentes da CrewAI).")
+    parser.add_argument("--dir", default=None, help="Diretório dos arquivos temporários (padrão: o do sistema).")
+    parser.add_argument("--scenario", type=int, default=None, help=argparse.SUPPRESS) # Uso interno (subprocesso)
+    args = parser.parse_args()
+
+    if args.scenario is not None:
+        # Subprocesso: o diretório de trabalho já é o do cenário. O resultado vai em um arquivo, e não na
+        # saída padrão, onde a CrewAI também escreve (inclusive depois do fim do cenário)
+        with open(SCENARIO_RESULT_FILE, "w", encoding="utf-8") as f:
+            json.dump(run_scenario(args.scenario, args.pipeline), f)
+        return
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    scenarios = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+            # UPLOAD_DIR é relativo ("./tmp"): cada cenário roda com um banco e caches vazios
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [project_root, os.getenv("PYTHONPATH")])))
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_end_to_end", "--scenario", str(rows), "--pipeline", args.pipeline],
+                cwd=workdir, env=env, capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                print(completed.stderr, file=sys.stderr)
+                raise SystemExit(f"Cenário com {rows} linhas falhou (código {completed.returncode}).")
+            with open(os.path.join(workdir, SCENARIO_RESULT_FILE), encoding="utf-8") as f:
+                scenario = json.load(f)
+        scenarios.append(scenario)
+        print_scenario(scenario)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "scenarios": scenarios,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# ./benchmarks/bench_sqlite_bulk_write.py
+#
+# Compara a gravação no SQLite pelo caminho antigo (df.to_sql com as configurações padrão, um
+# bloco de 'chunk_size' linhas por chamada, como na carga de CSV) com o caminho de escrita em
+# massa de tools/sqlite_bulk_loader.py, usando um conjunto sintético com o layout de itens de NF-e.
+#
+# Execução (a partir da raiz do projeto):
+#   python -m benchmarks.bench_sqlite_bulk_write --rows 1000000
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from tools.sqlite_bulk_loader import bulk_load_profile, create_table, insert_dataframe
+
+
+def build_nfe_items(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Gera um DataFrame sintético com colunas típicas de '*_nfs_itens'."""
+    rng = np.random.default_rng(seed)
+    ufs = np.array(["SP", "RJ", "MG", "SC", "PR", "GO", "BA", "PE"], dtype=object)
+    municipios = np.array(["SAO PAULO", "CAJAMAR", "RIBEIRAO PRETO", "JUNDIAI", "FLORIANOPOLIS"], dtype=object)
+    return pd.DataFrame({
+        "chave_de_acesso": [f"{i:044d}" for i in rng.integers(0, rows // 4 + 1, rows)],
+        "data_emissao": "2024-01-15 10:32:00",
+        "uf_emitente": ufs[rng.integers(0, len(ufs), rows)],
+        "municipio_emitente": municipios[rng.integers(0, len(municipios), rows)],
+        "cfop": rng.choice([5102, 5405, 6102, 6108], rows),
+        "codigo_ncm_sh": rng.integers(10000000, 99999999, rows),
+        "descricao_do_produto_servico": "PRODUTO GENERICO DE TESTE",
+        "quantidade": rng.integers(1, 100, rows).astype(float),
+        "valor_unitario": rng.random(rows) * 1000,
+        "valor_total": rng.random(rows) * 10000,
+    })
+
+
+def write_with_to_sql(db_path: str, df: pd.DataFrame, chunk_size: int):
+    """Caminho antigo: um df.to_sql por bloco, com os PRAGMAs padrão do SQLite."""
+    conn = sqlite3.connect(db_path)
+    try:
+        for start in range(0, len(df), chunk_size):
+            df.iloc[start:start + chunk_size].to_sql("nfs_itens", conn, if_exists="replace" if start == 0 else "append",
+                                                     index=False, chunksize=chunk_size)
+    finally:
+        conn.close()
+
+
+def write_with_bulk_loader(db_path: str, df: pd.DataFrame, chunk_size: int):
+    """Caminho novo: blocos gravados com executemany em uma transação, com o perfil de carga."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        with bulk_load_profile(conn):
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            create_table(cursor, "nfs_itens", df.dtypes.to_dict())
+            for start in range(0, len(df), chunk_size):
+                insert_dataframe(cursor, "nfs_itens", df.iloc[start:start + chunk_size])
+            cursor.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas do conjunto sintético.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Linhas por bloco, como na carga de CSV.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições; é reportado o melhor tempo.")
+    parser.add_argument("--dir", default=None, help="Diretório dos bancos temporários (use o disco real da implantação).")
+    args = parser.parse_args()
+
+    df = build_nfe_items(args.rows)
+    print(f"{'caminho':<16}{'segundos':>12}{'linhas/s':>16}")
+    timings = {}
+    for name, writer in (("to_sql", write_with_to_sql), ("bulk_loader", write_with_bulk_loader)):
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+                db_path = os.path.join(temp_dir, "bench.sqlite")
+                start = time.perf_counter()
+                writer(db_path, df, args.chunk_size)
+                elapsed = time.perf_counter() - start
+                timings[name] = min(elapsed, timings.get(name, elapsed))
+
+                conn = sqlite3.connect(db_path)
+                row_count = conn.execute("SELECT COUNT(*) FROM nfs_itens").fetchone()[0]
+                conn.close()
+                if row_count != args.rows:
+                    raise AssertionError(f"{name}: {row_count} linhas gravadas, esperado {args.rows}.")
+        print(f"{name:<16}{timings[name]:>12.2f}{args.rows / timings[name]:>16,.0f}")
+    print(f"ganho: {timings['to_sql'] / timings['bulk_loader']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
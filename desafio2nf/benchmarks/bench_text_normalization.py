@@ -0,0 +1,67 @@
+# ./benchmarks/bench_text_normalization.py
+#
+# Compara a normalização de texto antiga (lambda célula a célula) com a normalização
+# vetorizada de services/text_normalizer.py, em uma coluna sintética no formato NF-e.
+#
+# Execução (a partir da raiz do projeto):
+#   python -m benchmarks.bench_text_normalization --rows 1000000
+
+import argparse
+import time
+import unicodedata
+import numpy as np
+import pandas as pd
+
+from services.text_normalizer import normalize_text_series
+
+MUNICIPIOS = ["São Paulo", "Cajamar", "Ribeirão Preto", "Jundiaí", "Florianópolis",
+              "Goiânia", "Maceió", "Belém", "São José dos Campos", "Niterói"]
+RAZOES_SOCIAIS = [f"Comércio de Alimentos Ação {i} Ltda " for i in range(2000)]
+
+
+def legacy_normalize(series: pd.Series) -> pd.Series:
+    """
+    Normalização original do carregador de CSV, mantida aqui como referência.
+    map(str) equivale ao astype(str) do pandas 2 (NaN -> 'nan') também no pandas 3.
+    """
+    return series.map(str).apply(
+        lambda x: unicodedata.normalize('NFKD', x).encode('ascii', 'ignore').decode('utf-8').upper().strip()
+    )
+
+
+def build_column(values: list, rows: int, seed: int) -> pd.Series:
+    """Gera uma coluna de texto repetitivo com alguns valores nulos."""
+    rng = np.random.default_rng(seed)
+    column = pd.Series(np.array(values, dtype=object)[rng.integers(0, len(values), rows)], dtype=object)
+    column[rng.random(rows) < 0.01] = np.nan
+    return column
+
+
+def measure(func, series: pd.Series):
+    start = time.perf_counter()
+    result = func(series)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas por coluna sintética.")
+    args = parser.parse_args()
+
+    columns = {
+        "municipio_emitente": build_column(MUNICIPIOS, args.rows, seed=1),
+        "razao_social_emitente": build_column(RAZOES_SOCIAIS, args.rows, seed=2),
+    }
+
+    print(f"{'coluna':<24}{'antes (linhas/s)':>20}{'depois (linhas/s)':>20}{'ganho':>10}")
+    for name, series in columns.items():
+        expected, legacy_seconds = measure(legacy_normalize, series)
+        result, new_seconds = measure(normalize_text_series, series)
+        if not expected.astype(object).equals(result):
+            raise AssertionError(f"Resultado divergente na coluna '{name}'.")
+        print(f"{name:<24}{args.rows / legacy_seconds:>20,.0f}{args.rows / new_seconds:>20,.0f}"
+              f"{legacy_seconds / new_seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
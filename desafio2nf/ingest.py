@@ -0,0 +1,56 @@
+# ./ingest.py
+#
+# Carga de arquivos ZIP (ou diretórios) de CSVs pela linha de comando, sem a interface e sem LLM,
+# usando o mesmo pipeline do app (services/ingestion_pipeline.py). Útil em jobs em lote e em
+# ambientes sem rede; as tabelas carregadas ficam disponíveis para o app no mesmo ./tmp/db.sqlite.
+#
+# Execução (a partir da raiz do projeto):
+#   python ingest.py notas_2024.zip [outro.zip ...] --storage-backend sqlite --workers 4
+
+import argparse
+import os
+import sys
+
+from services.settings import (UPLOAD_DIR, CSV_CHUNK_SIZE, LOAD_WORKERS, INCREMENTAL_LOAD, STORAGE_BACKEND,
+                               DICTIONARY_ENCODING, CONSOLIDATE_MONTHLY_TABLES)
+from services.ingestion_pipeline import ingest_zip, ingest_directory, STORAGE_BACKENDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carrega arquivos ZIP ou diretórios de CSVs no banco do app.")
+    parser.add_argument("paths", nargs="+", help="Arquivos .zip ou diretórios com arquivos .csv.")
+    parser.add_argument("--storage-backend", choices=STORAGE_BACKENDS, default=STORAGE_BACKEND)
+    parser.add_argument("--chunk-size", type=int, default=CSV_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    parser.add_argument("--full", action="store_true",
+                        help="Recarrega tudo, ignorando o manifesto de carga incremental.")
+    parser.add_argument("--dictionary-encoding", action=argparse.BooleanOptionalAction, default=DICTIONARY_ENCODING,
+                        help="Codifica por dicionário as colunas de texto repetitivas (apenas no SQLite).")
+    parser.add_argument("--consolidate-monthly", action=argparse.BooleanOptionalAction,
+                        default=CONSOLIDATE_MONTHLY_TABLES,
+                        help="Consolida os arquivos mensais AAAAMM_<layout> em uma tabela por layout (apenas no SQLite).")
+    args = parser.parse_args()
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    incremental = INCREMENTAL_LOAD and not args.full
+    failed = False
+    for path in args.paths:
+        if os.path.isdir(path):
+            result = ingest_directory(path, args.chunk_size, args.workers, incremental, args.storage_backend,
+                                      dictionary_encoding=args.dictionary_encoding,
+                                      consolidate_monthly=args.consolidate_monthly)
+        else:
+            result = ingest_zip(path, args.chunk_size, args.workers, incremental, args.storage_backend,
+                                dictionary_encoding=args.dictionary_encoding,
+                                consolidate_monthly=args.consolidate_monthly)
+        print(f"[{path}] {result.message}")
+        print(f"[{path}] {result.rows_loaded} linhas; tempo por etapa: {result.timings_summary()}")
+        failed = failed or not result.ok
+        # Cada arquivo seguinte é somado aos anteriores, como no modo incremental
+        incremental = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# ./services/column_glossary.py
+
+# Glossário das colunas das notas fiscais eletrônicas (cabeçalho e itens), usado no contexto do
+# esquema enviado ao LLM. Antes ficava inteiro no backstory do QueryAnalyzerAgent; agora apenas as
+# entradas das colunas selecionadas para a pergunta entram no prompt (ver services/schema_index.py).
+
+COLUMN_GLOSSARY = {
+    "chave_de_acesso": "valor único na tabela nfs_cabecalho (ou 202401_nfs_cabecalho) e, utilizado como chave estrangeira na tabela nfs_itens (ou 202401_nfs_itens)",
+    "modelo": "define o modelo do documento",
+    "serie": "é um número de classificação de documento, portanto, não utilizado para cálculo, somente para busca, ordenação ou identificação",
+    "numero": "é um número de identificação de documento, portanto, não utilizado para cálculo, somente para busca, ordenação ou identificação",
+    "natureza_da_operacao": "categorias relacionadas ao motivo da emissão do documento",
+    "data_emissao": "campo de data e hora do momento em que o documento foi gerado",
+    "evento_mais_recente": "campo de categorização do evento relacionado a emissão do documento",
+    "data_hora_evento_mais_recente": "campo de data e hora do evento relacionado a emissão do documento",
+    "cpf_cnpj_emitente": "dígitos de documento de pessoa física (CPF) ou pessoa jurídica (CNPJ) que emitiu o documento, campo não utilizado para cálculo, somente para busca, ordenação ou identificação",
+    "razao_social_emitente": "nome ou descrição relacionado a quem emitiu o documento",
+    "inscricao_estadual_emitente": "número da inscrição estadual do emissor do documento, não utilizado para cálculo, somente para busca, ordenação ou identificação",
+    "uf_emitente": "estado brasileiro onde foi emitido o documento",
+    "municipio_emitente": "cidade brasileira onde foi emitido o documento",
+    "cnpj_destinatario": "dígitos de documento de pessoa jurídica (CNPJ) para a qual foi emitido e entregue o documento, campo não utilizado para cálculo, somente para busca, ordenação ou identificação",
+    "nome_destinatario": "nome ou descrição para a qual foi emitido e entregue o documento",
+    "uf_destinatario": "estado brasileiro para a qual foi emitido e entregue o documento",
+    "indicador_ie_destinatario": "classificação da inscrição estadual para a qual foi emitido e entregue o documento",
+    "destino_da_operacao": "classificação do tipo de operação, se foi dentro do próprio estado ou não, para fins de tributos fiscais",
+    "consumidor_final": "classificação do tipo de utilização dos itens presentes no documento, se são para uso de consumidor final, se são para transformação, para fins de análise de retenções, subsídios e até mesmo proibições",
+    "presenca_do_comprador": "classificação da presença do comprador na emissão do documento",
+    "valor_nota_fiscal": "valor monetário total do documento na moeda Real do Brasil",
+    "numero_produto": "número de ordem do produto no documento, não utilizado para cálculo, somente para busca, ordenação ou identificação",
+    "descricao_do_produto_servico": "nome ou descrição relacionado ao produto ou serviço adquirido pelo destinatário do documento",
+    "codigo_ncm_sh": "código de classificação do tipo de produto ou serviço para fins fiscais (NCM - Nomenclatura Comum do Mercosul ou SH – Sistema Harmonizado), não utilizado para cálculo, somente para busca, ordenação ou identificação",
+    "ncm_sh_tipo_de_produto": "descrição do tipo de produto ou serviço para fins fiscais (NCM - Nomenclatura Comum do Mercosul ou SH – Sistema Harmonizado)",
+    "cfop": "o Código Fiscal de Operações e Prestações (CFOP) trata-se de um sistema de códigos usado no Brasil para identificar e classificar as diversas naturezas de operações e prestações de serviços sujeitas à incidência do Imposto sobre Circulação de Mercadorias e Serviços (ICMS), não utilizado para cálculo, somente para busca, ordenação ou identificação",
+    "quantidade": "valor numérico para cálculo, tendo como dimensão o campo UNIDADE",
+    "unidade": "dimensão relacionada ao valor do campo QUANTIDADE",
+    "valor_unitario": "valor monetário da unidade (quantidade = 1) do produto ou serviço especificado, na moeda Real do Brasil",
+    "valor_total": "valor total calculado do produto ou serviço, multiplicando os campos QUANTIDADE e VALOR UNITÁRIO, resultando  em valor monetário na moeda Real do Brasil",
+    "mes_referencia": "mês de referência (AAAA-MM) do arquivo mensal de origem da linha, coluna de partição das tabelas consolidadas (ex: nfs_itens), utilizada para filtrar ou agrupar por mês",
+}
+
+
+def glossary_entry(column_name: str) -> str:
+    """
+    Retorna a entrada do glossário de uma coluna (ex: "cfop: o Código Fiscal ..."), ou None.
+    """
+    description = COLUMN_GLOSSARY.get(column_name)
+    return f"{column_name}: {description}" if description is not None else None
+
+
+def format_glossary(entries: list) -> str:
+    """
+    Junta entradas do glossário em uma linha do contexto do esquema (string vazia se não houver).
+    """
+    return "Glossário das colunas: " + "; ".join(entries) + "." if entries else ""
@@ -0,0 +1,209 @@
+# ./services/column_types.py
+
+import numpy as np
+import pandas as pd
+
+# Tipos das colunas do layout das notas fiscais eletrônicas (cabeçalho e itens). Sem este registro,
+# o tipo de cada coluna dependia da inferência do pandas em cada bloco: datas ficavam como texto no
+# formato do arquivo, valores com vírgula decimal ('1.234,56') viravam texto e códigos como cfop ou
+# cpf_cnpj_emitente eram inteiros em um mês e texto em outro (perdendo zeros à esquerda).
+# Com o registro, cada coluna conhecida tem o mesmo tipo em todos os arquivos mensais:
+# - COLUMN_DATE: data/hora, gravada como texto ISO 'AAAA-MM-DD HH:MM:SS' (o formato nativo das funções
+#   de data do SQLite e que ordena corretamente em filtros por período). Aceita ISO, 'DD/MM/AAAA' e epoch.
+# - COLUMN_DECIMAL: valores e quantidades (float64), aceitando vírgula decimal e ponto de milhar.
+# - COLUMN_INTEGER: números de documento/ordem, com o tipo inteiro mais estreito que comporta o layout.
+# - COLUMN_CODE: códigos de identificação, sempre texto (lidos como texto do CSV, sem inferência).
+# Colunas fora do registro continuam com a inferência do pandas (ver csv_loader.iter_normalized_chunks).
+
+COLUMN_DATE = "data"
+COLUMN_DECIMAL = "decimal"
+COLUMN_INTEGER = "inteiro"
+COLUMN_CODE = "codigo"
+
+# Versão das regras de tipos, gravada no manifesto de carga: arquivos carregados com outra versão
+# são relidos na próxima carga incremental, para que todos os meses tenham os mesmos tipos.
+COLUMN_TYPES_VERSION = 1
+
+# Coluna -> (tipo, dtype declarado). Os inteiros usam o menor dtype que comporta o campo no layout
+# da NF-e (modelo: 2 dígitos; série: 3; número: 9; número do item: até 990).
+NFE_COLUMN_TYPES = {
+    "data_emissao": (COLUMN_DATE, "object"),
+    "data_hora_evento_mais_recente": (COLUMN_DATE, "object"),
+    "valor_nota_fiscal": (COLUMN_DECIMAL, "float64"),
+    "quantidade": (COLUMN_DECIMAL, "float64"),
+    "valor_unitario": (COLUMN_DECIMAL, "float64"),
+    "valor_total": (COLUMN_DECIMAL, "float64"),
+    "modelo": (COLUMN_INTEGER, "int8"),
+    "serie": (COLUMN_INTEGER, "int16"),
+    "numero": (COLUMN_INTEGER, "int32"),
+    "numero_produto": (COLUMN_INTEGER, "int16"),
+    "chave_de_acesso": (COLUMN_CODE, "object"),
+    "cpf_cnpj_emitente": (COLUMN_CODE, "object"),
+    "cnpj_destinatario": (COLUMN_CODE, "object"),
+    "inscricao_estadual_emitente": (COLUMN_CODE, "object"),
+    "codigo_ncm_sh": (COLUMN_CODE, "object"),
+    "cfop": (COLUMN_CODE, "object"),
+}
+
+# Colunas fora do registro reconhecidas pelo prefixo do nome (ex: data_autorizacao, valor_icms)
+PREFIX_COLUMN_TYPES = (
+    ("data_", (COLUMN_DATE, "object")),
+    ("valor_", (COLUMN_DECIMAL, "float64")),
+)
+
+# Formatos de data tentados, em ordem, nos valores que não estão em ISO 8601
+DAYFIRST_DATE_FORMATS = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+ISO_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Epochs acima deste valor estão em milissegundos (em segundos, seria depois do ano 5000)
+EPOCH_MILLISECONDS_THRESHOLD = 1e11
+
+
+def column_type(column_name: str):
+    """
+    Retorna o (tipo, dtype declarado) de uma coluna já normalizada, ou None se a coluna não
+    constar no registro (o tipo fica a cargo da inferência do pandas).
+    """
+    if column_name in NFE_COLUMN_TYPES:
+        return NFE_COLUMN_TYPES[column_name]
+    return next((types for prefix, types in PREFIX_COLUMN_TYPES if column_name.startswith(prefix)), None)
+
+
+def code_columns(column_names) -> list:
+    """
+    Das colunas (já normalizadas), as de códigos de identificação, lidas do CSV como texto.
+    """
+    return [col for col in column_names if (column_type(col) or (None,))[0] == COLUMN_CODE]
+
+
+def _map_uniques(series: pd.Series, convert) -> np.ndarray:
+    """
+    Aplica 'convert' apenas aos valores distintos da coluna (os CSVs repetem muito os mesmos
+    valores) e expande o resultado de volta para todas as linhas. Nulos continuam nulos.
+    """
+    codes, uniques = pd.factorize(series)
+    converted = convert(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    result = converted[codes] if len(converted) else np.empty(len(codes), dtype=object)
+    result[codes < 0] = None
+    return result
+
+
+def _epoch_to_datetime(numbers: pd.Series) -> pd.Series:
+    unit = "ms" if numbers.abs().max() > EPOCH_MILLISECONDS_THRESHOLD else "s"
+    return pd.to_datetime(numbers, unit=unit, errors="coerce")
+
+
+def _parse_date_uniques(values: pd.Series) -> pd.Series:
+    """
+    Converte valores distintos de data/hora (texto ou epoch) em texto ISO; inválidos viram None.
+    """
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.notna().all():
+        parsed = _epoch_to_datetime(numbers)
+    else:
+        text = values.astype(str).str.strip()
+        parsed = pd.to_datetime(text, format="ISO8601", errors="coerce")
+        for date_format in DAYFIRST_DATE_FORMATS:
+            missing = parsed.isna()
+            if not missing.any():
+                break
+            parsed = parsed.fillna(pd.to_datetime(text[missing], format=date_format, errors="coerce"))
+        missing = parsed.isna() & numbers.notna()
+        if missing.any():
+            parsed = parsed.fillna(_epoch_to_datetime(numbers[missing]))
+    return parsed.dt.strftime(ISO_DATE_FORMAT).astype(object).where(parsed.notna(), None)
+
+
+def parse_dates(series: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de datas (ISO, 'DD/MM/AAAA[ HH:MM[:SS]]' ou epoch em segundos/milissegundos)
+    em texto ISO 'AAAA-MM-DD HH:MM:SS'. Valores que não são datas viram nulos.
+    """
+    return pd.Series(_map_uniques(series, _parse_date_uniques), index=series.index, name=series.name, dtype=object)
+
+
+def _parse_decimal_uniques(values: pd.Series) -> pd.Series:
+    text = values.astype(str).str.strip()
+    has_comma = text.str.contains(",", regex=False)
+    # '1.234,56' -> '1234.56'; valores sem vírgula usam o ponto como separador decimal
+    text = text.where(~has_comma, text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(text, errors="coerce")
+
+
+def parse_decimals(series: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de valores em float64, aceitando vírgula decimal e ponto de milhar
+    ('1.234,56'). Colunas que o pandas já leu como números são apenas convertidas.
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.astype("float64")
+    parsed = _map_uniques(series, _parse_decimal_uniques)
+    return pd.Series(parsed, index=series.index, name=series.name).astype("float64")
+
+
+def parse_integers(series: pd.Series, declared_dtype: str) -> pd.Series:
+    """
+    Converte uma coluna de inteiros no dtype declarado (o mais estreito do layout). Valores que não
+    são inteiros viram nulos; blocos com nulos ficam em float64 e valores fora da faixa do dtype,
+    em int64 (ver declared_dtype).
+    """
+    if pd.api.types.is_float_dtype(series.dtype) or not pd.api.types.is_numeric_dtype(series.dtype):
+        series = parse_decimals(series)
+        series = series.where(series == np.floor(series)) # Valores fracionários não são inteiros do layout
+        if series.isna().any():
+            return series
+        series = series.astype("int64")
+    limits = np.iinfo(declared_dtype)
+    if len(series) and (series.min() < limits.min or series.max() > limits.max):
+        return series.astype("int64")
+    return series.astype(declared_dtype)
+
+
+def apply_column_types(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte as colunas do registro de um bloco (com nomes já normalizados) nos seus tipos.
+    As colunas de código já chegam como texto e são normalizadas junto com as demais colunas de texto.
+    """
+    for col in chunk.columns:
+        types = column_type(col)
+        if types is None:
+            continue
+        kind, dtype = types
+        if kind == COLUMN_DATE:
+            chunk[col] = parse_dates(chunk[col])
+        elif kind == COLUMN_DECIMAL:
+            chunk[col] = parse_decimals(chunk[col])
+        elif kind == COLUMN_INTEGER:
+            chunk[col] = parse_integers(chunk[col], dtype)
+    return chunk
+
+
+def is_typed_column(column_name: str) -> bool:
+    """
+    Indica se a coluna tem tipo não textual no registro (data, valor ou inteiro): estas não passam
+    pela normalização de texto (maiúsculas e sem acentos).
+    """
+    types = column_type(column_name)
+    return types is not None and types[0] != COLUMN_CODE
+
+
+def declared_dtype(column_name: str, chunk_dtype):
+    """
+    O dtype de uma coluna para o esquema da tabela (afinidade no SQLite, tipos do Parquet e catálogo).
+    Colunas do registro usam o dtype declarado, alargado apenas se os dados não couberem nele
+    (ex: int64 para um número fora da faixa); um bloco de inteiros em float64 por causa de nulos
+    não muda o tipo declarado.
+    """
+    types = column_type(column_name)
+    if types is None:
+        return chunk_dtype
+    kind, dtype = types
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if kind == COLUMN_INTEGER and pd.api.types.is_integer_dtype(chunk_dtype) \
+       and np.dtype(chunk_dtype).itemsize > dtype.itemsize:
+        return np.dtype(chunk_dtype)
+    return dtype
+
+
+def declared_dtypes(chunk: pd.DataFrame) -> dict:
+    """Nome da coluna -> declared_dtype, para as colunas de um bloco."""
+    return {col: declared_dtype(col, dtype) for col, dtype in chunk.dtypes.items()}
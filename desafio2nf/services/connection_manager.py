@@ -0,0 +1,118 @@
+# ./services/connection_manager.py
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from services.settings import DB_PATH, READ_POOL_SIZE, SQLITE_MMAP_SIZE, SQLITE_READ_CACHE_KIB
+
+
+class SQLiteConnectionManager:
+    """
+    Gerencia as conexões com o banco SQLite compartilhadas por todo o processo (Singleton):
+    - Um pool pequeno de conexões somente leitura (URI 'mode=ro'), mantidas abertas entre as
+      perguntas para reaproveitar o cache de páginas e o mmap do arquivo.
+    - Uma única conexão de escrita, usada pelo carregador de CSV e serializada por um lock.
+
+    O banco é mantido em journal_mode=WAL, de modo que várias sessões do Streamlit consultam ao
+    mesmo tempo sem bloquear umas às outras, inclusive durante uma carga.
+    """
+    _instance = None # Armazena a única instância da classe
+
+    def __new__(cls):
+        """
+        Garante que apenas uma instância de SQLiteConnectionManager seja criada (Singleton).
+        """
+        if cls._instance is None:
+            cls._instance = super(SQLiteConnectionManager, cls).__new__(cls)
+            cls._instance._init_state()
+        return cls._instance
+
+    def _init_state(self):
+        self._db_path = os.path.abspath(DB_PATH)
+        self._pool_lock = threading.Lock()
+        self._idle_readers = queue.LifoQueue() # LIFO: reutiliza primeiro as conexões com cache mais "quente"
+        self._reader_slots = threading.BoundedSemaphore(READ_POOL_SIZE)
+        self._generation = 0 # Incrementado em close_all(); conexões de gerações antigas são descartadas
+        self._writer = None
+        self._writer_lock = threading.RLock()
+
+    # --- Conexões de leitura ---
+    def _open_reader(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{self._db_path}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{SQLITE_READ_CACHE_KIB}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def read_connection(self):
+        """
+        Empresta uma conexão somente leitura do pool. Se todas estiverem em uso, aguarda
+        até que uma seja devolvida (no máximo READ_POOL_SIZE conexões abertas).
+
+        Raises:
+            FileNotFoundError: Se o banco de dados ainda não existir.
+        """
+        if not os.path.exists(self._db_path):
+            raise FileNotFoundError(f"Banco de dados SQLite não encontrado em '{self._db_path}'.")
+
+        self._reader_slots.acquire()
+        with self._pool_lock:
+            generation = self._generation
+        conn = None
+        try:
+            try:
+                conn, conn_generation = self._idle_readers.get_nowait()
+                if conn_generation != generation:
+                    conn.close()
+                    conn = None
+            except queue.Empty:
+                pass
+            if conn is None:
+                conn = self._open_reader()
+            yield conn
+        finally:
+            if conn is not None:
+                with self._pool_lock:
+                    if generation == self._generation:
+                        self._idle_readers.put((conn, generation))
+                    else:
+                        conn.close()
+            self._reader_slots.release()
+
+    # --- Conexão de escrita ---
+    @contextmanager
+    def write_connection(self):
+        """
+        Fornece a conexão de escrita exclusiva (isolation_level=None: transações explícitas).
+        Apenas um chamador por vez a utiliza; os demais aguardam o lock.
+        """
+        with self._writer_lock:
+            if self._writer is None:
+                os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
+                self._writer = sqlite3.connect(self._db_path, isolation_level=None, check_same_thread=False)
+                # WAL é persistente no arquivo: leitores não bloqueiam o escritor e vice-versa
+                self._writer.execute("PRAGMA journal_mode = WAL")
+            yield self._writer
+
+    def close_all(self):
+        """
+        Fecha todas as conexões (ex: antes de apagar o arquivo do banco). Conexões de leitura
+        emprestadas no momento são fechadas quando forem devolvidas.
+        """
+        with self._pool_lock:
+            self._generation += 1
+            while True:
+                try:
+                    conn, _ = self._idle_readers.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
@@ -0,0 +1,562 @@
+# ./services/csv_loader.py
+
+import io
+import multiprocessing
+import queue as queue_module
+import re          # Para substituir caracteres não alfanuméricos
+import sqlite3
+import time
+import unicodedata # Para lidar com acentos e caracteres especiais
+import zipfile
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from services.settings import STATS_DISTINCT_LIMIT, PROFILE_TOP_K, PROFILE_LOW_CARDINALITY_LIMIT
+from services.text_normalizer import normalize_text_series
+from services.column_types import apply_column_types, code_columns, declared_dtype, declared_dtypes, is_typed_column
+from services.load_progress import IngestionCancelled, LoadProgress
+from services.fact_tables import start_partition, write_partition_chunk, finish_partition, discard_partition
+from tools.sqlite_bulk_loader import create_table as create_sqlite_table, insert_dataframe, drop_table
+
+# Este módulo concentra a leitura, normalização e gravação de CSVs no SQLite.
+# Fica fora de tools/ para que os processos de carga paralela não precisem importar o CrewAI.
+
+
+# --- Função auxiliar para normalizar nomes de colunas e tabelas ---
+def normalize_name(name: str) -> str:
+    """
+    Normaliza um nome (de coluna ou tabela) para ser compatível com SQL:
+    - Converte para minúsculas.
+    - Remove acentos.
+    - Substitui espaços e caracteres especiais por underscores.
+    - Remove múltiplos underscores e underscores no início/fim.
+    """
+    # 1. Converte para minúsculas
+    name = name.lower()
+    # 2. Remove acentos
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('utf-8')
+    # 3. Substitui caracteres não alfanuméricos (exceto underscore) por underscore
+    name = re.sub(r'[^a-z0-9_]+', '_', name)
+    # 4. Remove múltiplos underscores
+    name = re.sub(r'_+', '_', name)
+    # 5. Remove underscores no início e no fim
+    name = name.strip('_')
+    return name
+
+
+# --- Tempo de cada etapa da carga ---
+# Etapas do pipeline de carga (services/ingestion_pipeline.py), na ordem em que ocorrem
+LOAD_STAGES = ("unzip", "parse", "normalize", "profile", "write", "consolidate", "encode", "index", "register")
+
+
+class StageTimer:
+    """
+    Acumula o tempo (em segundos) gasto em cada etapa da carga. Os tempos ficam em um dict simples,
+    que os processos de leitura devolvem junto com o resumo do arquivo ('stage_seconds').
+
+    Exemplo:
+        timer = StageTimer()
+        with timer.stage("parse"):
+            ...
+    """
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def merge(self, seconds: dict):
+        for name, value in (seconds or {}).items():
+            self.add(name, value)
+
+
+# --- Funções auxiliares para a carga em blocos (chunks) ---
+def _normalize_text_columns(df: pd.DataFrame, text_columns: set) -> pd.DataFrame:
+    """
+    Normaliza (maiúsculas e sem acentos) as colunas de texto de um bloco do CSV.
+    Colunas já vistas como texto em blocos anteriores (text_columns) também são
+    normalizadas, mesmo que neste bloco o pandas tenha inferido outro tipo.
+    Datas, valores e inteiros do registro de tipos (services/column_types.py) não são texto.
+    """
+    for col in df.columns:
+        if is_typed_column(col):
+            continue
+        # Verifica se a coluna é de tipo objeto ou string
+        if df[col].dtype == 'object' or pd.api.types.is_string_dtype(df[col].dtype) or col in text_columns:
+            text_columns.add(col)
+            # Aplica a normalização vetorizada (maiúsculas e sem acentos)
+            df[col] = normalize_text_series(df[col])
+    return df
+
+
+def merge_dtype(current_dtype, chunk_dtype):
+    """
+    Combina o tipo acumulado de uma coluna com o tipo inferido em um novo bloco,
+    seguindo as mesmas regras de promoção do pandas (ex: int64 + float64 = float64,
+    qualquer tipo + object = object). Assim o tipo final reflete o arquivo inteiro.
+    """
+    if current_dtype is None or current_dtype == chunk_dtype:
+        return chunk_dtype
+    return pd.concat([
+        pd.Series([], dtype=current_dtype),
+        pd.Series([], dtype=chunk_dtype)
+    ]).dtype
+
+
+class CountingReader(io.RawIOBase):
+    """
+    Fluxo binário que conta os bytes lidos (já descompactados, no caso de membros de ZIP),
+    usado para informar o progresso da leitura de cada CSV.
+    """
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        return size
+
+
+@contextmanager
+def open_csv_source(source):
+    """
+    Abre a origem de um CSV para leitura pelo pandas, como um CountingReader.
+
+    Args:
+        source: O caminho de um arquivo CSV no disco, ou uma tupla (zip_file_path, member_name)
+                indicando um membro dentro de um arquivo ZIP. Neste caso o membro é lido
+                diretamente do ZIP, como um fluxo, sem ser extraído para o disco.
+    """
+    if isinstance(source, tuple):
+        zip_file_path, member_name = source
+        with zipfile.ZipFile(zip_file_path, 'r') as zip_ref, zip_ref.open(member_name) as member:
+            yield CountingReader(member)
+    else:
+        with open(source, "rb") as csv_file:
+            yield CountingReader(csv_file)
+
+
+def list_zip_csv_members(zip_file_path: str) -> list:
+    """
+    Lista os membros .csv de um arquivo ZIP (inclusive em subpastas), ignorando
+    diretórios e metadados do macOS ('__MACOSX/').
+    """
+    with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+        return [
+            info.filename for info in zip_ref.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith(".csv")
+            and not info.filename.startswith("__MACOSX/")
+        ]
+
+
+def iter_normalized_chunks(source, chunk_size: int, timer: StageTimer = None, on_chunk=None):
+    """
+    Lê um CSV em blocos de até 'chunk_size' linhas, normalizando nomes de colunas,
+    convertendo as colunas do registro de tipos (datas, valores, inteiros e códigos, ver
+    services/column_types.py) e normalizando os dados de texto de cada bloco.
+
+    Args:
+        source: Caminho do CSV ou tupla (zip_file_path, member_name); ver open_csv_source.
+        chunk_size (int): Quantidade máxima de linhas por bloco.
+        timer (StageTimer): Opcional; recebe o tempo de leitura ('parse', inclui a descompactação
+                            do membro do ZIP) e de normalização ('normalize') de cada bloco.
+        on_chunk: Opcional; chamado como on_chunk(linhas, bytes_lidos) antes de cada bloco ser
+                  entregue (progresso e cancelamento, ver services/load_progress.py).
+
+    Yields:
+        pd.DataFrame: Cada bloco já normalizado.
+    """
+    timer = timer or StageTimer()
+    text_columns = set()
+    with timer.stage("parse"):
+        # Lê só o cabeçalho, para que os códigos de identificação sejam lidos como texto
+        # (sem inferência, preservando zeros à esquerda) em todos os blocos
+        with open_csv_source(source) as csv_input:
+            raw_columns = pd.read_csv(csv_input, nrows=0).columns
+        normalized_columns = {normalize_name(col): col for col in raw_columns}
+        text_dtypes = {normalized_columns[col]: str for col in code_columns(normalized_columns)}
+
+    with open_csv_source(source) as csv_input, \
+         pd.read_csv(csv_input, chunksize=chunk_size, dtype=text_dtypes) as reader:
+        chunks = iter(reader)
+        while True:
+            with timer.stage("parse"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+
+            with timer.stage("normalize"):
+                # Normaliza os nomes das colunas do bloco
+                chunk.columns = [normalize_name(col) for col in chunk.columns]
+
+                # Converte datas, valores e inteiros nos tipos do registro
+                chunk = apply_column_types(chunk)
+
+                # Normaliza dados de colunas de texto
+                chunk = _normalize_text_columns(chunk, text_columns)
+            if on_chunk is not None:
+                on_chunk(len(chunk), csv_input.bytes_read)
+            yield chunk
+
+
+def write_chunk(cursor, table_name: str, chunk: pd.DataFrame, create_table: bool):
+    """
+    Grava um bloco no SQLite pelo caminho de escrita em massa. No primeiro bloco a tabela
+    é recriada com as afinidades dos tipos do bloco (os declarados no registro de tipos, para
+    as colunas conhecidas); nos demais as linhas são apenas inseridas.
+    """
+    if create_table:
+        create_sqlite_table(cursor, table_name, declared_dtypes(chunk))
+    insert_dataframe(cursor, table_name, chunk)
+
+
+def _to_python(value):
+    """
+    Converte escalares do numpy/pandas em tipos nativos do Python (serializáveis em JSON).
+    """
+    return value.item() if hasattr(value, "item") else value
+
+
+class FileLoadSummary:
+    """
+    Acumula, bloco a bloco, o resumo de um CSV carregado: tipos das colunas (considerando o
+    arquivo inteiro), quantidade de linhas e o perfil de cada coluna (nulos, valores distintos,
+    mínimo/máximo e valores mais frequentes), usado depois da carga para decidir quais colunas
+    indexar e para montar o contexto do esquema enviado ao LLM.
+    """
+    def __init__(self):
+        self.column_dtypes = {}
+        self.row_count = 0
+        self._value_counts = {} # coluna -> Counter de valores, ou None quando passa de STATS_DISTINCT_LIMIT
+        self._null_counts = {}
+        self._min_values = {}
+        self._max_values = {}
+        self._unordered_columns = set() # Colunas cujos valores não podem ser comparados (sem mínimo/máximo)
+
+    def _update_min_max(self, col, values: pd.Series):
+        try:
+            chunk_min, chunk_max = values.min(), values.max()
+            if pd.isna(chunk_min):
+                return # Bloco sem valores
+            if col not in self._min_values or chunk_min < self._min_values[col]:
+                self._min_values[col] = chunk_min
+            if col not in self._max_values or chunk_max > self._max_values[col]:
+                self._max_values[col] = chunk_max
+        except TypeError:
+            # Números e textos na mesma coluna (no bloco ou entre blocos): sem mínimo/máximo
+            self._unordered_columns.add(col)
+            self._min_values.pop(col, None)
+            self._max_values.pop(col, None)
+
+    def update(self, chunk: pd.DataFrame):
+        self.row_count += len(chunk)
+        for col in chunk.columns:
+            self.column_dtypes[col] = merge_dtype(self.column_dtypes.get(col), declared_dtype(col, chunk[col].dtype))
+            self._null_counts[col] = self._null_counts.get(col, 0) + int(chunk[col].isna().sum())
+            if col not in self._unordered_columns:
+                self._update_min_max(col, chunk[col])
+
+            value_counts = self._value_counts.setdefault(col, Counter())
+            if value_counts is not None:
+                value_counts.update(chunk[col].value_counts(dropna=True).to_dict())
+                if len(value_counts) > STATS_DISTINCT_LIMIT:
+                    self._value_counts[col] = None # Alta cardinalidade: para de contar
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: {'column_dtypes': {coluna: dtype}, 'row_count': int,
+                   'column_stats': {coluna: {'distinct_count': int ou None, 'null_count': int,
+                                             'min': valor ou None, 'max': valor ou None,
+                                             'top_values': [[valor, contagem], ...] ou None,
+                                             'avg_length': float ou None}}}.
+                  distinct_count None indica mais de STATS_DISTINCT_LIMIT valores distintos.
+                  top_values (os PROFILE_TOP_K mais frequentes) só é preenchido em colunas com até
+                  PROFILE_LOW_CARDINALITY_LIMIT valores distintos (ex: uf_emitente, cfop).
+                  avg_length (tamanho médio do texto, por linha) só é preenchido em colunas de texto
+                  com até STATS_DISTINCT_LIMIT valores distintos (ver tools/sqlite_dictionary_encoder.py).
+                  Todos os valores são tipos nativos do Python, serializáveis em JSON.
+        """
+        column_stats = {}
+        for col, value_counts in self._value_counts.items():
+            top_values = None
+            avg_length = None
+            if value_counts and all(isinstance(value, str) for value in value_counts):
+                avg_length = sum(len(value) * count for value, count in value_counts.items()) / sum(value_counts.values())
+            if value_counts is not None and len(value_counts) <= PROFILE_LOW_CARDINALITY_LIMIT:
+                top_values = [[_to_python(value), count] for value, count in value_counts.most_common(PROFILE_TOP_K)]
+            column_stats[col] = {
+                "distinct_count": None if value_counts is None else len(value_counts),
+                "null_count": self._null_counts[col],
+                "min": _to_python(self._min_values.get(col)),
+                "max": _to_python(self._max_values.get(col)),
+                "top_values": top_values,
+                "avg_length": avg_length,
+            }
+        return {
+            "column_dtypes": self.column_dtypes,
+            "row_count": self.row_count,
+            "column_stats": column_stats,
+        }
+
+
+def _start_file(cursor, table_name: str, chunk: pd.DataFrame, consolidate_monthly: bool,
+                created_fact_tables: set, result: dict):
+    """
+    Destino de um arquivo, decidido no primeiro bloco: com consolidate_monthly, um arquivo mensal é
+    gravado direto na tabela consolidada (ver services/fact_tables.start_partition). Se não puder ser
+    consolidado, vira uma tabela própria, e o motivo fica em result['consolidation_error'].
+
+    Returns:
+        dict: A partição de start_partition, ou None para gravar a tabela própria.
+    """
+    if not consolidate_monthly:
+        return None
+    try:
+        return start_partition(cursor, table_name, chunk, created_fact_tables)
+    except ValueError as e:
+        result["consolidation_error"] = str(e)
+        return None
+
+
+def _finish_file(cursor, table_name: str, partition: dict, result: dict):
+    """
+    Conclui a gravação de um arquivo consolidado (ver _start_file) e registra a tabela consolidada no resumo.
+    """
+    finish_partition(cursor, table_name, partition, result["row_count"])
+    result["fact_table"] = partition["fact_table"]
+
+
+def load_csv_file(conn: sqlite3.Connection, source, table_name: str, chunk_size: int,
+                  progress: LoadProgress = None, consolidate_monthly: bool = False) -> dict:
+    """
+    Carrega um único CSV (do disco ou de dentro de um ZIP, ver open_csv_source) no SQLite
+    em blocos de até 'chunk_size' linhas, dentro de uma única transação. Se qualquer bloco
+    falhar, ou se a carga for cancelada (progress), a transação é desfeita e a tabela anterior
+    (se existir) permanece intacta.
+    Com consolidate_monthly=True, um arquivo mensal ('AAAAMM_<layout>') é gravado direto na tabela
+    consolidada do layout, substituindo a versão anterior do mês (ver services/fact_tables.py).
+    A conexão deve ter sido aberta com isolation_level=None (transações explícitas).
+
+    Returns:
+        dict: O resumo do arquivo (ver FileLoadSummary.to_dict), com os tipos das colunas
+              considerando o arquivo inteiro, e o tempo de cada etapa em 'stage_seconds'.
+              Um arquivo consolidado tem a tabela consolidada em 'fact_table'; um arquivo mensal
+              que não pôde ser consolidado tem o motivo em 'consolidation_error'.
+    """
+    summary = FileLoadSummary()
+    timer = StageTimer()
+    result = {}
+    partition = None
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        on_chunk = (lambda rows, bytes_read: progress.advance(table_name, rows, bytes_read)) if progress else None
+        for chunk_index, chunk in enumerate(iter_normalized_chunks(source, chunk_size, timer, on_chunk)):
+            with timer.stage("profile"):
+                summary.update(chunk)
+            with timer.stage("write"):
+                if chunk_index == 0:
+                    partition = _start_file(cursor, table_name, chunk, consolidate_monthly, set(), result)
+                if partition is not None:
+                    write_partition_chunk(cursor, partition, chunk)
+                else:
+                    write_chunk(cursor, table_name, chunk, create_table=(chunk_index == 0))
+        result.update(summary.to_dict())
+        if partition is not None:
+            with timer.stage("consolidate"):
+                _finish_file(cursor, table_name, partition, result)
+        with timer.stage("write"):
+            cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    result["stage_seconds"] = timer.seconds
+    return result
+
+
+# --- Carga paralela: vários processos leem e normalizam, um único escritor grava ---
+_worker_queue = None # Fila de saída de cada processo de leitura (definida no initializer)
+_worker_cancel_event = None # Evento de cancelamento da carga (LoadProgress.cancel_event), se houver
+
+def _init_parse_worker(output_queue, cancel_event=None):
+    global _worker_queue
+    _worker_queue = output_queue
+    init_cancel_event(cancel_event)
+
+
+def init_cancel_event(cancel_event):
+    """
+    Initializer dos processos de carga: guarda o evento de cancelamento da carga em andamento.
+    """
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def check_worker_cancelled():
+    """
+    Nos processos de carga, interrompe a leitura no próximo bloco se a carga foi cancelada.
+    """
+    if _worker_cancel_event is not None and _worker_cancel_event.is_set():
+        raise IngestionCancelled()
+
+
+def _parse_file_worker(file_index: int, source, chunk_size: int):
+    """
+    Executado em um processo do pool: lê e normaliza um CSV e envia os blocos ao escritor.
+    Sempre termina com uma mensagem 'done' (com o resumo do arquivo) ou 'error'.
+    Exceções são enviadas como texto, pois nem toda exceção pode ser serializada entre processos.
+    """
+    summary = FileLoadSummary()
+    timer = StageTimer()
+    position = {"bytes_read": 0}
+    def on_chunk(rows, bytes_read):
+        check_worker_cancelled()
+        position["bytes_read"] = bytes_read
+    try:
+        for chunk in iter_normalized_chunks(source, chunk_size, timer, on_chunk):
+            with timer.stage("profile"):
+                summary.update(chunk)
+            # O escritor informa o progresso (e verifica o cancelamento) ao gravar o bloco
+            _worker_queue.put(("chunk", file_index, (chunk, position["bytes_read"])))
+        result = summary.to_dict()
+        result["stage_seconds"] = timer.seconds # Tempos deste processo; o de gravação é somado pelo escritor
+        _worker_queue.put(("done", file_index, result))
+    except Exception as e:
+        _worker_queue.put(("error", file_index, (isinstance(e, pd.errors.EmptyDataError), str(e))))
+
+
+def load_csv_files_parallel(conn: sqlite3.Connection, files: list, chunk_size: int, workers: int,
+                            progress: LoadProgress = None, consolidate_monthly: bool = False) -> list:
+    """
+    Carrega vários CSVs usando um pool de 'workers' processos para leitura e normalização,
+    enquanto o processo atual é o único escritor no SQLite (o SQLite não aceita escritas concorrentes).
+
+    Cada arquivo é gravado em uma tabela temporária de staging e só substitui a tabela final
+    quando todos os seus blocos foram gravados; um arquivo com erro não altera a tabela existente.
+    Com consolidate_monthly=True, os arquivos mensais são gravados direto na tabela consolidada, e a
+    versão anterior do mês só é removida quando o arquivo termina (ver load_csv_file).
+    Toda a carga ocorre em uma única transação: se for cancelada (progress), nada é gravado e
+    IngestionCancelled é propagada.
+    A conexão deve ter sido aberta com isolation_level=None (transações explícitas).
+
+    Args:
+        conn (sqlite3.Connection): Conexão de escrita.
+        files (list): Lista de tuplas (source, table_name); source segue open_csv_source.
+        chunk_size (int): Quantidade máxima de linhas por bloco.
+        workers (int): Quantidade de processos de leitura.
+        progress (LoadProgress): Opcional; recebe as linhas e os bytes de cada bloco gravado.
+        consolidate_monthly (bool): Se True, consolida os arquivos mensais (ver load_csv_file).
+
+    Returns:
+        list: Para cada arquivo, na mesma ordem de 'files', o resumo do arquivo
+              (ver FileLoadSummary.to_dict e load_csv_file) ou a exceção que impediu a carga.
+              Em 'stage_seconds', os tempos de leitura e normalização são somados entre os
+              processos (tempo de CPU, não de relógio); o de gravação é o do escritor.
+    """
+    results = [None] * len(files)
+    write_seconds = [0.0] * len(files)
+    started = set() # Arquivos cuja tabela de staging (ou partição) já foi criada
+    partitions = [None] * len(files) # Partição de cada arquivo gravado direto na tabela consolidada
+    consolidation = [{} for _ in files] # Motivo de cada arquivo mensal não consolidado, se houver
+    created_fact_tables = set()
+    context = multiprocessing.get_context()
+    # Fila limitada: mantém no máximo alguns blocos em memória, independentemente do tamanho dos arquivos
+    output_queue = context.Queue(maxsize=max(2, workers * 2))
+    cursor = conn.cursor()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_parse_worker,
+                             initargs=(output_queue, progress.cancel_event if progress else None)) as executor:
+        futures = [
+            executor.submit(_parse_file_worker, file_index, source, chunk_size)
+            for file_index, (source, _) in enumerate(files)
+        ]
+        cursor.execute("BEGIN")
+        try:
+            remaining = len(files)
+            while remaining:
+                try:
+                    kind, file_index, payload = output_queue.get(timeout=0.5)
+                except queue_module.Empty:
+                    # Um processo que morreu (ex: falta de memória) nunca enviará 'done'/'error'
+                    for file_index, future in enumerate(futures):
+                        if future.done() and future.exception() and results[file_index] is None:
+                            results[file_index] = future.exception()
+                            remaining -= 1
+                    continue
+
+                if results[file_index] is not None:
+                    continue # Arquivo já finalizado com erro; descarta blocos restantes
+
+                table_name = files[file_index][1]
+                staging_table = f"__staging_{table_name}"
+                try:
+                    if kind == "chunk":
+                        chunk, bytes_read = payload
+                        start = time.perf_counter()
+                        if file_index not in started:
+                            partitions[file_index] = _start_file(cursor, table_name, chunk, consolidate_monthly,
+                                                                 created_fact_tables, consolidation[file_index])
+                        if partitions[file_index] is not None:
+                            write_partition_chunk(cursor, partitions[file_index], chunk)
+                        else:
+                            write_chunk(cursor, staging_table, chunk, create_table=file_index not in started)
+                        write_seconds[file_index] += time.perf_counter() - start
+                        started.add(file_index)
+                        if progress is not None:
+                            progress.advance(table_name, len(chunk), bytes_read)
+                        continue
+                    if kind == "done":
+                        payload.update(consolidation[file_index])
+                        if partitions[file_index] is not None:
+                            start = time.perf_counter()
+                            _finish_file(cursor, table_name, partitions[file_index], payload)
+                            payload["stage_seconds"]["consolidate"] = time.perf_counter() - start
+                        elif file_index in started:
+                            drop_table(cursor, table_name)
+                            cursor.execute(f'ALTER TABLE "{staging_table}" RENAME TO "{table_name}"')
+                        payload["stage_seconds"]["write"] = write_seconds[file_index]
+                        results[file_index] = payload
+                        if progress is not None:
+                            progress.finish_file(table_name, "concluído", payload["row_count"])
+                    else:
+                        is_empty_data, message = payload
+                        raise pd.errors.EmptyDataError(message) if is_empty_data else RuntimeError(message)
+                except IngestionCancelled:
+                    raise # Desfaz a carga inteira (ver o tratamento abaixo)
+                except Exception as e:
+                    if partitions[file_index] is not None:
+                        discard_partition(cursor, partitions[file_index])
+                    cursor.execute(f'DROP TABLE IF EXISTS "{staging_table}"')
+                    results[file_index] = e
+                remaining -= 1
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            for future in futures:
+                future.cancel()
+            # Esvazia a fila para que nenhum processo fique bloqueado em put() no encerramento do pool
+            while not all(future.done() for future in futures):
+                try:
+                    output_queue.get(timeout=0.1)
+                except queue_module.Empty:
+                    pass
+            raise
+    return results
@@ -1,10 +1,67 @@
 # ./services/dataframe_store.py
 
+import os
+import sqlite3
+import threading
 import pandas as pd
+from services.connection_manager import SQLiteConnectionManager
+from services.metadata_catalog import read_catalog, read_stored_data_version, bump_stored_data_version
+from services.settings import DB_PATH
+
+METADATA_COLUMNS = ['table_name', 'column_name', 'data_type', 'source_file', 'storage_backend']
+
+
+class ColumnMetadata:
+    """
+    Metadados de uma coluna. Registro compacto (__slots__) e tratado como imutável.
+    """
+    __slots__ = ('table_name', 'column_name', 'data_type', 'source_file', 'storage_backend', 'stats')
+
+    def __init__(self, table_name: str, column_name: str, data_type: str, source_file: str, storage_backend: str,
+                 stats: dict = None):
+        self.table_name = table_name
+        self.column_name = column_name
+        self.data_type = data_type
+        self.source_file = source_file
+        self.storage_backend = storage_backend
+        self.stats = stats or {} # Estatísticas da carga (ver csv_loader.FileLoadSummary)
+
+    def as_tuple(self) -> tuple:
+        return (self.table_name, self.column_name, self.data_type, self.source_file, self.storage_backend)
+
+
+class TableMetadata:
+    """
+    Metadados de uma tabela: suas colunas, na ordem do CSV, e um índice nome da coluna -> registro.
+    Nunca é alterado depois de criado; uma nova carga da tabela cria um novo TableMetadata.
+    """
+    __slots__ = ('table_name', 'columns', 'column_index', 'storage_backend', 'row_count')
+
+    def __init__(self, table_name: str, columns: tuple, storage_backend: str, row_count: int = None):
+        self.table_name = table_name
+        self.columns = columns
+        self.column_index = {column.column_name: column for column in columns}
+        self.storage_backend = storage_backend
+        self.row_count = row_count
+
+    def column_names(self) -> list:
+        return [column.column_name for column in self.columns]
+
 
 class DataFrameStore:
+    """
+    Catálogo em memória das tabelas carregadas (Singleton), compartilhado por todas as sessões do Streamlit.
+
+    As tabelas ficam em um dict table_name -> TableMetadata. Cada atualização cria um novo dict
+    (copy-on-write) sob um lock, então os leitores nunca precisam de lock nem de cópia: eles leem
+    sempre um estado completo. get_all_metadata devolve um DataFrame montado uma única vez por
+    versão dos metadados e reaproveitado até a próxima atualização.
+
+    Na primeira utilização, o store é reconstruído a partir do catálogo gravado no banco a cada
+    carga (ver services/metadata_catalog.py), de modo que um servidor reiniciado já enxerga as
+    tabelas carregadas anteriormente.
+    """
     _instance = None # Armazena a única instância da classe
-    _metadata_store = pd.DataFrame(columns=['table_name', 'column_name', 'data_type', 'source_file'])
 
     def __new__(cls):
         """
@@ -12,8 +69,93 @@ class DataFrameStore:
         """
         if cls._instance is None:
             cls._instance = super(DataFrameStore, cls).__new__(cls)
+            cls._instance._init_state()
         return cls._instance
 
+    def _init_state(self):
+        self._lock = threading.RLock()
+        self._state = (0, {}) # (versão dos metadados, dict table_name -> TableMetadata)
+        self._snapshot = (None, None) # (versão dos metadados, DataFrame com todos os metadados)
+        self._index_store = {} # table_name -> tupla de índices criados após a carga
+        self._hydrated = False # Se o catálogo do banco já foi lido
+
+    def _ensure_hydrated(self):
+        """
+        Carrega o catálogo do banco na primeira utilização do store (se houver banco e catálogo).
+        Se o banco ainda não existir ou a leitura falhar, a carga é tentada de novo na próxima utilização.
+        """
+        if self._hydrated:
+            return
+        with self._lock:
+            if self._hydrated:
+                return
+            try:
+                with SQLiteConnectionManager().read_connection() as conn:
+                    catalog = read_catalog(conn)
+            except FileNotFoundError:
+                return # Nenhuma carga ainda: o banco é criado pela primeira carga
+            except sqlite3.Error as e:
+                print(f"[DataFrameStore] Catálogo do banco não carregado: {e}")
+                return
+            self._hydrated = True
+            if not catalog:
+                return
+
+            tables = dict(self._state[1])
+            index_store = dict(self._index_store)
+            for entry in catalog:
+                table_name = entry["table_name"]
+                if table_name in tables:
+                    continue # Metadados registrados nesta execução são mais recentes que o catálogo
+                columns = tuple(
+                    ColumnMetadata(table_name, column["column_name"], column["data_type"], entry["source_file"],
+                                   entry["storage_backend"], column["stats"])
+                    for column in entry["columns"]
+                )
+                tables[table_name] = TableMetadata(table_name, columns, entry["storage_backend"], entry["row_count"])
+                index_store[table_name] = tuple(entry["indexes"])
+            self._index_store = index_store
+            self._replace_tables(tables)
+        print(f"[DataFrameStore] Metadados de {len(catalog)} tabelas carregados do catálogo do banco.")
+
+    def _tables(self) -> dict:
+        """
+        Retorna o dict de tabelas atual (nunca alterado depois de publicado).
+        """
+        self._ensure_hydrated()
+        return self._state[1]
+
+    def _replace_tables(self, tables: dict):
+        """
+        Publica um novo dict de tabelas (chamado com o lock adquirido).
+        """
+        self._state = (self._state[0] + 1, tables)
+
+    def set_table_metadata(self, table_name: str, column_dtypes: dict, source_file: str,
+                           storage_backend: str = "sqlite", row_count: int = None, column_stats: dict = None):
+        """
+        Registra (ou substitui) os metadados de uma tabela.
+
+        Args:
+            table_name (str): O nome da tabela.
+            column_dtypes (dict): Nome da coluna -> tipo (dtype do pandas ou texto), na ordem do CSV.
+            source_file (str): O arquivo CSV de origem.
+            storage_backend (str): "sqlite" ou "parquet".
+            row_count (int): Quantidade de linhas carregadas (opcional).
+            column_stats (dict): Nome da coluna -> estatísticas da carga (opcional).
+        """
+        column_stats = column_stats or {}
+        columns = tuple(
+            ColumnMetadata(table_name, col, str(dtype), source_file, storage_backend, column_stats.get(col))
+            for col, dtype in column_dtypes.items()
+        )
+        self._ensure_hydrated() # Mescla com as tabelas de cargas anteriores
+        with self._lock:
+            tables = dict(self._state[1])
+            tables[table_name] = TableMetadata(table_name, columns, storage_backend, row_count)
+            self._replace_tables(tables)
+        print(f"[DataFrameStore] Metadados para a tabela '{table_name}' adicionados/atualizados.")
+
     def add_metadata(self, table_name: str, metadata_df: pd.DataFrame):
         """
         Adiciona metadados de uma nova tabela ao store.
@@ -23,28 +165,45 @@ class DataFrameStore:
         Args:
             table_name (str): O nome da tabela à qual os metadados pertencem.
             metadata_df (pd.DataFrame): Um DataFrame contendo as colunas:
-                                        'column_name', 'data_type', 'table_name', 'source_file'.
+                                        'column_name', 'data_type', 'table_name', 'source_file'
+                                        e, opcionalmente, 'storage_backend' ("sqlite" ou "parquet").
         """
         # Garante que o DataFrame de entrada tenha as colunas esperadas
         expected_columns = ['column_name', 'data_type', 'table_name', 'source_file']
         if not all(col in metadata_df.columns for col in expected_columns):
             raise ValueError(f"metadata_df deve conter as colunas: {expected_columns}")
 
-        # Remove entradas antigas para a mesma tabela
-        self._metadata_store = self._metadata_store[self._metadata_store['table_name'] != table_name]
-
-        # Concatena os novos metadados
-        self._metadata_store = pd.concat([self._metadata_store, metadata_df], ignore_index=True)
-        print(f"[DataFrameStore] Metadados para a tabela '{table_name}' adicionados/atualizados.")
+        storage_backend = "sqlite"
+        if 'storage_backend' in metadata_df.columns and metadata_df['storage_backend'].notna().any():
+            storage_backend = metadata_df['storage_backend'].dropna().iloc[0]
+        source_file = metadata_df['source_file'].iloc[0] if not metadata_df.empty else None
+        self.set_table_metadata(
+            table_name,
+            dict(zip(metadata_df['column_name'], metadata_df['data_type'])),
+            source_file,
+            storage_backend
+        )
 
     def get_all_metadata(self) -> pd.DataFrame:
         """
         Retorna um DataFrame consolidado com todos os metadados de todas as tabelas.
+        O DataFrame é montado uma vez por versão dos metadados; cada chamada recebe uma cópia
+        rasa (sem copiar os dados), de modo que adicionar ou remover colunas no resultado não
+        afeta os demais leitores. Os valores devem ser tratados como somente leitura.
 
         Returns:
             pd.DataFrame: Um DataFrame contendo os metadados.
         """
-        return self._metadata_store.copy() # Retorna uma cópia para evitar modificações externas diretas
+        self._ensure_hydrated()
+        version, tables = self._state
+        snapshot_version, snapshot = self._snapshot
+        if snapshot_version != version:
+            snapshot = pd.DataFrame(
+                [column.as_tuple() for table in tables.values() for column in table.columns],
+                columns=METADATA_COLUMNS
+            )
+            self._snapshot = (version, snapshot)
+        return snapshot.copy(deep=False)
 
     def get_metadata_by_table(self, table_name: str) -> pd.DataFrame:
         """
@@ -56,18 +215,133 @@ class DataFrameStore:
         Returns:
             pd.DataFrame: Um DataFrame com os metadados da tabela especificada.
         """
-        return self._metadata_store[self._metadata_store['table_name'] == table_name].copy()
+        table = self._tables().get(table_name)
+        return pd.DataFrame(
+            [column.as_tuple() for column in table.columns] if table is not None else [],
+            columns=METADATA_COLUMNS
+        )
+
+    def get_table(self, table_name: str) -> TableMetadata:
+        """
+        Retorna os metadados de uma tabela (TableMetadata) ou None se ela não estiver registrada.
+        """
+        return self._tables().get(table_name)
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name in self._tables()
+
+    def remove_table(self, table_name: str):
+        """
+        Remove os metadados e os índices de uma tabela (ex: um mês incorporado a uma tabela consolidada).
+        """
+        self._ensure_hydrated()
+        with self._lock:
+            if table_name not in self._state[1] and table_name not in self._index_store:
+                return
+            tables = dict(self._state[1])
+            tables.pop(table_name, None)
+            self._index_store = {name: indexes for name, indexes in self._index_store.items() if name != table_name}
+            self._replace_tables(tables)
+        print(f"[DataFrameStore] Metadados da tabela '{table_name}' removidos.")
 
     def clear(self):
         """
         Limpa todos os metadados armazenados no store.
         Útil para reiniciar o estado entre diferentes uploads de ZIP.
         """
-        self._metadata_store = pd.DataFrame(columns=['table_name', 'column_name', 'data_type', 'source_file'])
+        with self._lock:
+            self._hydrated = True # O catálogo do banco não deve reaparecer depois de uma limpeza
+            self._replace_tables({})
+            self._index_store = {}
+        # Fora do lock do store: a carga registra metadados com a conexão de escrita em uso
+        self.bump_data_version()
         print("[DataFrameStore] Todos os metadados foram limpos.")
 
     def get_table_names(self) -> list:
         """
         Retorna uma lista de todos os nomes de tabelas únicos atualmente armazenados.
         """
-        return self._metadata_store['table_name'].unique().tolist()
\ No newline at end of file
+        return list(self._tables())
+
+    def get_storage_backend(self, table_name: str) -> str:
+        """
+        Retorna o backend de armazenamento escolhido na carga da tabela ("sqlite" ou "parquet").
+        """
+        table = self._tables().get(table_name)
+        return table.storage_backend if table is not None else "sqlite"
+
+    def get_tables_by_backend(self, storage_backend: str) -> dict:
+        """
+        Retorna as tabelas armazenadas em um backend, com a lista de colunas de cada uma.
+
+        Returns:
+            dict: table_name -> lista de nomes de colunas.
+        """
+        return {
+            table_name: table.column_names()
+            for table_name, table in self._tables().items()
+            if table.storage_backend == storage_backend
+        }
+
+    def set_indexes(self, table_name: str, indexes: list):
+        """
+        Registra os índices existentes no SQLite para uma tabela, substituindo os anteriores.
+
+        Args:
+            table_name (str): O nome da tabela.
+            indexes (list): Lista de dicts com as chaves 'index_name', 'column_name' e 'reason'.
+        """
+        self._ensure_hydrated()
+        with self._lock:
+            self._index_store = {**self._index_store, table_name: tuple(indexes)}
+            self._replace_tables(self._state[1]) # Nova versão dos metadados (o contexto do esquema cita os índices)
+
+    def get_indexes(self, table_name: str) -> list:
+        """
+        Retorna os índices registrados para uma tabela (lista vazia se não houver).
+        """
+        self._ensure_hydrated()
+        return list(self._index_store.get(table_name, ()))
+
+    def get_indexed_columns(self, table_name: str) -> list:
+        """
+        Retorna os nomes das colunas indexadas de uma tabela.
+        """
+        self._ensure_hydrated()
+        return [index["column_name"] for index in self._index_store.get(table_name, ())]
+
+    def bump_data_version(self) -> int:
+        """
+        Incrementa a versão dos dados, gravada no banco (ver metadata_catalog.bump_stored_data_version).
+        Deve ser chamado sempre que tabelas do SQLite forem criadas, substituídas ou removidas,
+        invalidando resultados em cache neste e nos demais processos que usam o banco. Sem banco,
+        não há o que invalidar: a versão não muda (e o banco criado depois começa de outra versão).
+
+        Returns:
+            int: A nova versão.
+        """
+        if not os.path.exists(DB_PATH):
+            return self.get_data_version()
+        with SQLiteConnectionManager().write_connection() as conn:
+            return bump_stored_data_version(conn)
+
+    def get_metadata_version(self) -> int:
+        """
+        Retorna a versão atual dos metadados (incrementada a cada tabela ou índice registrado).
+        """
+        self._ensure_hydrated()
+        return self._state[0]
+
+    def get_data_version(self) -> int:
+        """
+        Retorna a versão atual dos dados carregados, lida do banco a cada chamada: uma carga feita
+        por outro processo muda a versão e invalida os caches deste processo (0 se não houver banco).
+        """
+        try:
+            with SQLiteConnectionManager().read_connection() as conn:
+                return read_stored_data_version(conn)
+        except FileNotFoundError:
+            return 0
+        except sqlite3.Error as e:
+            print(f"[DataFrameStore] Versão dos dados não lida do banco: {e}")
+            return 0
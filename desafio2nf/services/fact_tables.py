@@ -0,0 +1,295 @@
+# ./services/fact_tables.py
+
+import re
+import sqlite3
+from collections import Counter
+import pandas as pd
+from services.column_types import declared_dtypes
+from services.settings import PROFILE_TOP_K
+from tools.sqlite_bulk_loader import create_table, drop_table, insert_dataframe
+
+# Tabelas fato consolidadas: os CSVs mensais de um mesmo layout ('202401_nfs_itens', '202402_nfs_itens',
+# ...) são gravados em uma única tabela por layout ('nfs_itens'), com a coluna de partição
+# PARTITION_COLUMN ('AAAA-MM', derivada do nome do arquivo). Perguntas sobre o ano inteiro viram uma
+# consulta a uma só tabela, sem UNION ALL, e o contexto do esquema não cresce com a quantidade de meses.
+# Os blocos de cada arquivo mensal vão direto para a tabela consolidada (ver start_partition, usado pelo
+# csv_loader), sem tabela mensal intermediária. Os meses ficam registrados em FACT_PARTITIONS_TABLE; a view
+# de cada mês (com o nome e as colunas do arquivo original, mantida por compatibilidade) e a remoção de
+# um mês filtram pela coluna de partição, que tem índice.
+# Vale apenas para o SQLite (as tabelas Parquet já são particionadas por mês de emissão).
+
+FACT_PARTITIONS_TABLE = "_fact_partitions"
+PARTITION_COLUMN = "mes_referencia"
+
+# Nome de tabela mensal: AAAAMM_<layout> (ex: 202401_nfs_cabecalho)
+MONTHLY_TABLE_PATTERN = re.compile(r"^(\d{4})(0[1-9]|1[0-2])_([a-z0-9_]+)$")
+
+
+def monthly_table_layout(table_name: str):
+    """
+    Para uma tabela mensal (ex: '202401_nfs_itens'), retorna (tabela consolidada, partição),
+    ex: ('nfs_itens', '2024-01'); None se o nome não segue o padrão AAAAMM_<layout>.
+    """
+    match = MONTHLY_TABLE_PATTERN.match(table_name)
+    if match is None:
+        return None
+    year, month, layout = match.groups()
+    return layout, f"{year}-{month}"
+
+
+def ensure_partitions_table(conn: sqlite3.Connection):
+    """
+    Cria o registro dos meses consolidados. Um registro da versão anterior (com as faixas de rowid de
+    cada mês) é convertido, e as views dos meses passam a filtrar pela coluna de partição.
+    Deve ser chamado fora de transações.
+    """
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{FACT_PARTITIONS_TABLE}")')]
+    if "first_rowid" in columns:
+        conn.execute("BEGIN")
+        partitions = conn.execute(
+            f'SELECT table_name, fact_table, partition, row_count FROM "{FACT_PARTITIONS_TABLE}"'
+        ).fetchall()
+        conn.execute(f'DROP TABLE "{FACT_PARTITIONS_TABLE}"')
+        _create_partitions_table(conn)
+        for table_name, fact_table, partition, row_count in partitions:
+            drop_table(conn, table_name)
+            _create_partition_view(conn, table_name, fact_table, partition)
+            _register_partition(conn, table_name, fact_table, partition, row_count)
+        conn.execute("COMMIT")
+    else:
+        _create_partitions_table(conn)
+
+
+def _create_partitions_table(conn: sqlite3.Connection):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{FACT_PARTITIONS_TABLE}" (
+            table_name TEXT PRIMARY KEY,
+            fact_table TEXT NOT NULL,
+            partition TEXT NOT NULL,
+            row_count INTEGER NOT NULL
+        )
+    """)
+
+
+def _register_partition(cursor, table_name: str, fact_table: str, partition: str, row_count: int):
+    cursor.execute(
+        f'INSERT OR REPLACE INTO "{FACT_PARTITIONS_TABLE}" (table_name, fact_table, partition, row_count) '
+        "VALUES (?, ?, ?, ?)", (table_name, fact_table, partition, row_count)
+    )
+
+
+def _create_partition_view(cursor, table_name: str, fact_table: str, partition: str):
+    """
+    A view do mês: as colunas do arquivo original, lidas da tabela consolidada pelo índice da partição.
+    """
+    columns_sql = ", ".join(f'"{row[1]}"' for row in cursor.execute(f'PRAGMA table_info("{fact_table}")').fetchall()
+                            if row[1] != PARTITION_COLUMN)
+    # A partição vem do nome do arquivo (AAAA-MM, ver monthly_table_layout); views não aceitam parâmetros
+    cursor.execute(f'CREATE VIEW "{table_name}" AS SELECT {columns_sql} FROM "{fact_table}" '
+                   f"WHERE \"{PARTITION_COLUMN}\" = '{partition}'")
+
+
+def fact_table_names(conn: sqlite3.Connection) -> list:
+    return [row[0] for row in conn.execute(f'SELECT DISTINCT fact_table FROM "{FACT_PARTITIONS_TABLE}" ORDER BY fact_table')]
+
+
+def fact_partitions(conn: sqlite3.Connection, fact_table: str) -> list:
+    """
+    Returns:
+        list: Um dict por mês da tabela consolidada, em ordem de mês, com as chaves 'table_name'
+              (a view do mês), 'partition' e 'row_count'.
+    """
+    rows = conn.execute(
+        f'SELECT table_name, partition, row_count FROM "{FACT_PARTITIONS_TABLE}" '
+        "WHERE fact_table = ? ORDER BY partition", (fact_table,)
+    ).fetchall()
+    return [dict(zip(("table_name", "partition", "row_count"), row)) for row in rows]
+
+
+def partition_fact_table(conn: sqlite3.Connection, table_name: str) -> str:
+    """
+    A tabela consolidada da qual 'table_name' é a view de um mês, ou None.
+    """
+    row = conn.execute(f'SELECT fact_table FROM "{FACT_PARTITIONS_TABLE}" WHERE table_name = ?',
+                       (table_name,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def _object_type(conn: sqlite3.Connection, name: str) -> str:
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def _drop_if_unused(cursor, fact_table: str):
+    """
+    Remove a tabela consolidada sem meses registrados e sem linhas (ex: criada por um arquivo que falhou).
+    """
+    if fact_table not in fact_table_names(cursor) \
+       and cursor.execute(f'SELECT 1 FROM "{fact_table}" LIMIT 1').fetchone() is None:
+        cursor.execute(f'DROP TABLE "{fact_table}"')
+
+
+def remove_partition(conn: sqlite3.Connection, table_name: str) -> str:
+    """
+    Remove o mês 'table_name' da sua tabela consolidada: as linhas (pela coluna de partição), o registro
+    da partição e a view do mês (se ainda for uma view). A tabela consolidada é removida quando fica
+    sem meses. Deve ser chamado dentro de uma transação.
+
+    Returns:
+        str: A tabela consolidada afetada, ou None se 'table_name' não era um mês consolidado.
+    """
+    row = conn.execute(
+        f'SELECT fact_table, partition FROM "{FACT_PARTITIONS_TABLE}" WHERE table_name = ?', (table_name,)
+    ).fetchone()
+    if row is None:
+        return None
+    fact_table, partition = row
+    conn.execute(f'DELETE FROM "{fact_table}" WHERE "{PARTITION_COLUMN}" = ?', (partition,))
+    conn.execute(f'DELETE FROM "{FACT_PARTITIONS_TABLE}" WHERE table_name = ?', (table_name,))
+    if _object_type(conn, table_name) == "view":
+        conn.execute(f'DROP VIEW "{table_name}"')
+    if not fact_partitions(conn, fact_table):
+        conn.execute(f'DROP TABLE IF EXISTS "{fact_table}"')
+    return fact_table
+
+
+def start_partition(cursor, table_name: str, chunk: pd.DataFrame, created_fact_tables: set) -> dict:
+    """
+    Prepara a gravação de um arquivo mensal direto na tabela consolidada do seu layout (criada no
+    primeiro mês, com as afinidades do primeiro bloco e o índice da partição). Os blocos do arquivo
+    são gravados por write_partition_chunk; finish_partition troca a versão anterior do mês pela nova
+    e discard_partition descarta as linhas gravadas, se o arquivo falhar.
+    Deve ser chamado dentro da transação da carga, antes de gravar o primeiro bloco.
+
+    Args:
+        cursor: Cursor da conexão de escrita.
+        table_name (str): O nome da tabela mensal (ex: '202401_nfs_itens').
+        chunk (pd.DataFrame): O primeiro bloco do arquivo.
+        created_fact_tables (set): Tabelas consolidadas criadas na transação atual (ainda sem meses
+                                   registrados); recebe a tabela, se ela for criada aqui.
+
+    Returns:
+        dict: {'fact_table', 'partition', 'first_rowid'}, ou None se o nome não é de uma tabela mensal.
+              first_rowid separa as linhas da versão anterior do mês (abaixo dele) das novas.
+
+    Raises:
+        ValueError: Se as colunas não são as da tabela consolidada (outro layout) ou se já existe uma
+                    tabela não consolidada com o nome do layout. Nada é gravado.
+    """
+    layout = monthly_table_layout(table_name)
+    if layout is None:
+        return None
+    fact_table, partition = layout
+    columns = list(chunk.columns)
+
+    fact_type = _object_type(cursor, fact_table)
+    if fact_type is not None and fact_table not in created_fact_tables and fact_table not in fact_table_names(cursor):
+        raise ValueError(f"já existe a tabela '{fact_table}', que não é uma tabela consolidada.")
+    if fact_type is not None:
+        fact_columns = [row[1] for row in cursor.execute(f'PRAGMA table_info("{fact_table}")').fetchall()]
+        if fact_columns != columns + [PARTITION_COLUMN]:
+            raise ValueError(f"as colunas de '{table_name}' não são as da tabela consolidada '{fact_table}'.")
+    else:
+        create_table(cursor, fact_table, {**declared_dtypes(chunk), PARTITION_COLUMN: pd.api.types.pandas_dtype("object")})
+        cursor.execute(f'CREATE INDEX "idx_{fact_table}_{PARTITION_COLUMN}" ON "{fact_table}" ("{PARTITION_COLUMN}")')
+        created_fact_tables.add(fact_table)
+
+    # Sem AUTOINCREMENT, as novas linhas recebem rowids acima do maior rowid atual
+    first_rowid = cursor.execute(f'SELECT COALESCE(MAX(rowid), 0) + 1 FROM "{fact_table}"').fetchone()[0]
+    return {"fact_table": fact_table, "partition": partition, "first_rowid": first_rowid}
+
+
+def write_partition_chunk(cursor, partition: dict, chunk: pd.DataFrame):
+    """
+    Grava um bloco do arquivo mensal na tabela consolidada (ver start_partition), com a coluna de partição.
+    """
+    insert_dataframe(cursor, partition["fact_table"], chunk.assign(**{PARTITION_COLUMN: partition["partition"]}))
+
+
+def finish_partition(cursor, table_name: str, partition: dict, row_count: int):
+    """
+    Conclui a gravação de um arquivo mensal (ver start_partition): remove as linhas da versão anterior
+    do mês, troca a tabela mensal anterior (se o mês não era consolidado) pela view do mês e registra a
+    partição. Deve ser chamado na mesma transação em que os blocos foram gravados.
+    """
+    fact_table = partition["fact_table"]
+    cursor.execute(f'DELETE FROM "{fact_table}" WHERE "{PARTITION_COLUMN}" = ? AND rowid < ?',
+                   (partition["partition"], partition["first_rowid"]))
+    drop_table(cursor, table_name) # View da versão anterior, ou tabela própria (inclusive codificada)
+    _create_partition_view(cursor, table_name, fact_table, partition["partition"])
+    _register_partition(cursor, table_name, fact_table, partition["partition"], row_count)
+
+
+def discard_partition(cursor, partition: dict):
+    """
+    Descarta as linhas gravadas de um arquivo mensal que falhou (ver start_partition); a versão
+    anterior do mês permanece. A tabela consolidada criada para o arquivo é removida se ficou vazia.
+    """
+    fact_table = partition["fact_table"]
+    cursor.execute(f'DELETE FROM "{fact_table}" WHERE "{PARTITION_COLUMN}" = ? AND rowid >= ?',
+                   (partition["partition"], partition["first_rowid"]))
+    _drop_if_unused(cursor, fact_table)
+
+
+def _merge_column_stats(stats_list: list) -> dict:
+    """
+    Combina as estatísticas de uma coluna em vários meses. distinct_count passa a ser o maior entre
+    os meses (um limite inferior do total); top_values soma as contagens dos valores mais frequentes.
+    """
+    merged = {"distinct_count": None, "null_count": sum(stats.get("null_count") or 0 for stats in stats_list),
+              "min": None, "max": None, "top_values": None, "avg_length": None}
+    if all(stats.get("distinct_count") is not None for stats in stats_list):
+        merged["distinct_count"] = max(stats["distinct_count"] for stats in stats_list)
+    try:
+        minimums = [stats["min"] for stats in stats_list if stats.get("min") is not None]
+        maximums = [stats["max"] for stats in stats_list if stats.get("max") is not None]
+        merged["min"] = min(minimums) if minimums else None
+        merged["max"] = max(maximums) if maximums else None
+    except TypeError:
+        pass # Números e textos na mesma coluna: sem mínimo/máximo
+    if all(stats.get("top_values") is not None for stats in stats_list):
+        counts = Counter()
+        for stats in stats_list:
+            counts.update({value: count for value, count in stats["top_values"]})
+        merged["top_values"] = [[value, count] for value, count in counts.most_common(PROFILE_TOP_K)]
+    if all(stats.get("avg_length") is not None for stats in stats_list):
+        weights = [max(stats.get("row_count", 1), 1) for stats in stats_list]
+        merged["avg_length"] = sum(stats["avg_length"] * weight for stats, weight in zip(stats_list, weights)) / sum(weights)
+    return merged
+
+
+def merge_partition_summaries(partitions: list) -> dict:
+    """
+    Monta o resumo da tabela consolidada (no formato de FileLoadSummary.to_dict) a partir dos
+    resumos de carga de cada mês, acrescentando a coluna de partição.
+
+    Args:
+        partitions (list): Tuplas (partition, summary), onde summary é o resumo gravado no manifesto
+                           de carga do mês (tipos das colunas como texto).
+
+    Returns:
+        dict: {'column_dtypes', 'row_count', 'column_stats'}.
+    """
+    from services.csv_loader import merge_dtype # Import local: csv_loader grava os meses por este módulo
+
+    column_dtypes = {}
+    stats_by_column = {}
+    row_count = 0
+    for _, summary in partitions:
+        row_count += summary["row_count"]
+        for col, dtype in summary["column_dtypes"].items():
+            column_dtypes[col] = merge_dtype(column_dtypes.get(col), pd.api.types.pandas_dtype(str(dtype)))
+            stats = dict(summary["column_stats"].get(col) or {}, row_count=summary["row_count"])
+            stats_by_column.setdefault(col, []).append(stats)
+
+    column_dtypes[PARTITION_COLUMN] = pd.api.types.pandas_dtype("object")
+    column_stats = {col: _merge_column_stats(stats_list) for col, stats_list in stats_by_column.items()}
+    months = [partition for partition, _ in partitions]
+    column_stats[PARTITION_COLUMN] = {
+        "distinct_count": len(months), "null_count": 0,
+        "min": min(months) if months else None, "max": max(months) if months else None,
+        # Todos os meses, para que o contexto do esquema mostre os valores válidos de filtro
+        "top_values": [[partition, summary["row_count"]] for partition, summary in partitions],
+        "avg_length": None,
+    }
+    return {"column_dtypes": column_dtypes, "row_count": row_count, "column_stats": column_stats}
@@ -0,0 +1,139 @@
+# ./services/ingestion_jobs.py
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from services.ingestion_pipeline import ingest_zip, IngestionResult
+from services.load_progress import LoadProgress
+from services.logger_config import app_logger
+from services.settings import CSV_CHUNK_SIZE, LOAD_WORKERS, INCREMENTAL_LOAD, STORAGE_BACKEND
+
+# Cargas em segundo plano: o app envia o ZIP ao IngestionJobRunner e o script do Streamlit termina
+# imediatamente; a barra lateral consulta o progresso do job a cada segundo e pode cancelá-lo.
+# Os jobs rodam em uma única thread (o SQLite tem um único escritor), em fila, fora de qualquer
+# sessão: uma nova execução do script ou a troca de página não interrompem nem repetem a carga.
+# Enquanto a carga roda, as consultas continuam usando as conexões de leitura (WAL) e os metadados
+# anteriores, que só são substituídos na etapa de registro.
+
+MAX_RECORDED_JOBS = 20
+
+JOB_QUEUED = "na fila"
+JOB_RUNNING = "em andamento"
+JOB_DONE = "concluído"
+JOB_FAILED = "falhou"
+JOB_CANCELLED = "cancelado"
+FINISHED_JOB_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class IngestionJob:
+    """
+    Uma carga de ZIP em segundo plano.
+
+    Attributes:
+        job_id (int): Identificador do job no processo.
+        zip_file_path (str): O ZIP carregado.
+        storage_backend (str): "sqlite" ou "parquet".
+        progress (LoadProgress): Progresso por arquivo e cancelamento.
+        status (str): JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED ou JOB_CANCELLED.
+        result (IngestionResult): O resultado da carga, ao final.
+        error (str): A mensagem de uma exceção inesperada, se houver.
+    """
+    def __init__(self, job_id: int, zip_file_path: str, storage_backend: str):
+        self.job_id = job_id
+        self.zip_file_path = zip_file_path
+        self.storage_backend = storage_backend
+        self.progress = LoadProgress()
+        self.status = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_JOB_STATES
+
+    def cancel(self):
+        """
+        Solicita o cancelamento. Um job na fila não chega a carregar nada; um job em andamento
+        para no próximo bloco, desfazendo o arquivo em andamento.
+        """
+        self.progress.cancel()
+
+    def message(self) -> str:
+        if self.result is not None:
+            return self.result.message
+        return self.error or ""
+
+
+class IngestionJobRunner:
+    """
+    Executa as cargas em segundo plano (Singleton), uma de cada vez, e mantém os últimos jobs
+    para que qualquer sessão do Streamlit consulte o progresso.
+    """
+    _instance = None # Armazena a única instância da classe
+
+    def __new__(cls):
+        """
+        Garante que apenas uma instância de IngestionJobRunner seja criada (Singleton).
+        """
+        if cls._instance is None:
+            cls._instance = super(IngestionJobRunner, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._jobs = OrderedDict() # job_id -> IngestionJob
+            cls._instance._job_ids = itertools.count(1)
+            cls._instance._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion")
+        return cls._instance
+
+    def submit(self, zip_file_path: str, storage_backend: str = STORAGE_BACKEND, chunk_size: int = CSV_CHUNK_SIZE,
+               workers: int = LOAD_WORKERS, incremental: bool = INCREMENTAL_LOAD) -> IngestionJob:
+        """
+        Enfileira a carga de um ZIP e retorna o job imediatamente.
+        """
+        with self._lock:
+            job = IngestionJob(next(self._job_ids), zip_file_path, storage_backend)
+            self._jobs[job.job_id] = job
+            # Descarta os jobs finalizados mais antigos
+            while len(self._jobs) > MAX_RECORDED_JOBS:
+                oldest_id = next((job_id for job_id, old_job in self._jobs.items() if old_job.finished), None)
+                if oldest_id is None:
+                    break
+                del self._jobs[oldest_id]
+        self._executor.submit(self._run, job, chunk_size, workers, incremental)
+        app_logger.info(f"Carga em segundo plano #{job.job_id} enfileirada: '{zip_file_path}'.")
+        return job
+
+    def _run(self, job: IngestionJob, chunk_size: int, workers: int, incremental: bool):
+        if job.progress.cancelled:
+            job.status = JOB_CANCELLED
+            job.result = IngestionResult("Carga cancelada antes de começar.", cancelled=True)
+            job.finished_at = time.time()
+            return
+        job.status = JOB_RUNNING
+        try:
+            job.result = ingest_zip(job.zip_file_path, chunk_size, workers, incremental, job.storage_backend,
+                                    progress=job.progress)
+            if job.result.cancelled:
+                job.status = JOB_CANCELLED
+            else:
+                job.status = JOB_DONE if job.result.ok else JOB_FAILED
+        except Exception as e:
+            job.error = f"Erro no processo de carga: {e}"
+            job.status = JOB_FAILED
+            app_logger.error(f"Carga em segundo plano #{job.job_id} falhou: {e}", exc_info=True)
+        job.finished_at = time.time()
+        app_logger.info(f"Carga em segundo plano #{job.job_id} {job.status}: {job.message()}")
+
+    def get(self, job_id: int) -> IngestionJob:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        """Os jobs registrados, do mais antigo ao mais recente."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def active_jobs(self) -> list:
+        return [job for job in self.jobs() if not job.finished]
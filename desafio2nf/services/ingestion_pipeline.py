@@ -0,0 +1,696 @@
+# ./services/ingestion_pipeline.py
+
+import os
+import time
+import zipfile
+from dataclasses import dataclass, field
+import pandas as pd
+from services.dataframe_store import DataFrameStore
+from services.schema_context import SchemaContext
+from services.settings import (CSV_CHUNK_SIZE, LOAD_WORKERS, INCREMENTAL_LOAD, STORAGE_BACKEND, DICTIONARY_ENCODING,
+                               CONSOLIDATE_MONTHLY_TABLES)
+from services.connection_manager import SQLiteConnectionManager
+from services.csv_loader import (normalize_name, load_csv_file, load_csv_files_parallel, list_zip_csv_members,
+                                 StageTimer, LOAD_STAGES)
+from services.load_progress import IngestionCancelled, LoadProgress
+from services.logger_config import app_logger
+from tools.sqlite_bulk_loader import bulk_load_profile, drop_table
+from tools.sqlite_index_builder import build_indexes, analyze_database
+from tools.sqlite_dictionary_encoder import encode_table, encoded_table_name, table_size_bytes
+from services.column_types import COLUMN_TYPES_VERSION
+from services.load_manifest import ensure_manifest_table, fingerprint_source, get_manifest_entry, record_manifest_entry
+from services.metadata_catalog import ensure_catalog_tables, save_table_catalog, remove_table_catalog, clear_catalog
+from services.fact_tables import (ensure_partitions_table, fact_table_names, fact_partitions, monthly_table_layout,
+                                  remove_partition, merge_partition_summaries, PARTITION_COLUMN)
+from services.parquet_store import load_csv_files_to_parquet, remove_parquet_table, require_pyarrow
+
+# Pipeline de carga determinístico, sem LLM: descompactação (ou listagem dos CSVs do ZIP), leitura,
+# normalização, gravação, consolidação dos arquivos mensais (services/fact_tables.py), codificação por
+# dicionário (opcional), índices e registro dos metadados, com o tempo de cada etapa (LOAD_STAGES).
+# É usado pelo app.py, pela linha de comando (ingest.py) e pelas ferramentas de carga da CrewAI
+# (tools/load_csv_tool.py); o DataLoaderAgent é apenas um invólucro opcional.
+# Não importa o CrewAI, portanto roda em jobs em lote sem rede.
+
+STORAGE_BACKENDS = ("sqlite", "parquet")
+
+
+@dataclass
+class IngestionResult:
+    """
+    Resultado de uma carga.
+
+    Attributes:
+        message (str): A mensagem de status (a mesma devolvida pelas ferramentas de carga).
+        files_loaded (int): Arquivos CSV carregados.
+        files_unchanged (int): Arquivos inalterados desde a última carga (modo incremental).
+        rows_loaded (int): Linhas gravadas.
+        errors (list): Erros e avisos por arquivo.
+        stage_seconds (dict): Tempo de cada etapa (ver LOAD_STAGES). Com LOAD_WORKERS > 1, leitura,
+                              normalização e perfil são somados entre os processos.
+        wall_seconds (float): Tempo total da carga.
+        cancelled (bool): Se a carga foi cancelada. Os arquivos concluídos antes do cancelamento
+                          ficam carregados e registrados; o arquivo em andamento é desfeito.
+        dictionary_encoding (dict): Tabela -> resultado da codificação por dicionário (colunas,
+                                    tamanho e tempo de varredura antes e depois; ver
+                                    tools/sqlite_dictionary_encoder.encode_table).
+    """
+    message: str
+    files_loaded: int = 0
+    files_unchanged: int = 0
+    rows_loaded: int = 0
+    errors: list = field(default_factory=list)
+    stage_seconds: dict = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    cancelled: bool = False
+    dictionary_encoding: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.cancelled and not self.message.startswith(("Erro", "Aviso"))
+
+    def timings_summary(self) -> str:
+        stages = [f"{stage} {self.stage_seconds[stage]:.2f} s" for stage in LOAD_STAGES if stage in self.stage_seconds]
+        return f"{', '.join(stages)} (total {self.wall_seconds:.2f} s)"
+
+
+def _encoding_summary(dictionary_encoding: dict, dimension_bytes: int) -> str:
+    """
+    Economia da codificação por dicionário (IngestionResult.dictionary_encoding), somada entre as tabelas.
+    O tamanho depois da codificação inclui as tabelas de dimensão usadas (dimension_bytes), contadas uma vez.
+    """
+    encoded = dictionary_encoding.values()
+    column_count = sum(len(encoding["columns"]) for encoding in encoded)
+    scan_before = sum(encoding["scan_seconds_before"] for encoding in encoded)
+    scan_after = sum(encoding["scan_seconds_after"] for encoding in encoded)
+    summary = f"Codificação por dicionário: {len(encoded)} tabelas, {column_count} colunas"
+    if dimension_bytes is not None:
+        bytes_before = sum(encoding["bytes_before"] for encoding in encoded)
+        bytes_after = sum(encoding["bytes_after"] for encoding in encoded) + dimension_bytes
+        summary += (f"; tamanho {bytes_before / 1e6:.1f} MB -> {bytes_after / 1e6:.1f} MB "
+                    f"({_percent_change(bytes_before, bytes_after)})")
+    summary += (f"; varredura completa {scan_before * 1000:.0f} ms -> {scan_after * 1000:.0f} ms "
+                f"({_percent_change(scan_before, scan_after)}).")
+    return summary
+
+
+def _percent_change(before: float, after: float) -> str:
+    return f"{(after - before) / before * 100:+.0f}%" if before else "n/d"
+
+
+def _register_table_metadata(store: DataFrameStore, table_name: str, filename: str,
+                             summary: dict, indexes: list, storage_backend: str):
+    """
+    Registra no DataFrameStore os metadados (colunas, tipos, estatísticas da carga e backend de
+    armazenamento) e os índices de uma tabela, a partir do resumo da carga (FileLoadSummary.to_dict).
+    """
+    # Nomes de colunas já normalizados. Podemos adicionar uma 'description' aqui se tivermos um LLM
+    # para inferir mais tarde; por enquanto a descrição de cada campo está em services/column_glossary.py
+    store.set_table_metadata(table_name, summary["column_dtypes"], filename, storage_backend,
+                             summary.get("row_count"), summary.get("column_stats"))
+    store.set_indexes(table_name, indexes)
+
+
+def _build_fact_table_metadata(conn, fact_table: str):
+    """
+    Monta o resumo (a partir dos resumos de cada mês gravados no manifesto), os índices e a descrição
+    da origem de uma tabela consolidada, e grava o catálogo. Deve ser chamado fora de transações.
+
+    Returns:
+        tuple: (source_file, summary, indexes, quantidade de meses), ou None se a tabela não tem meses.
+    """
+    partitions = []
+    source_files = []
+    for partition in fact_partitions(conn, fact_table):
+        manifest_entry = get_manifest_entry(conn, partition["table_name"])
+        if manifest_entry is not None:
+            partitions.append((partition["partition"], manifest_entry["summary"]))
+            source_files.append(manifest_entry["source_file"])
+    if not partitions:
+        return None
+    summary = merge_partition_summaries(partitions)
+    summary["storage_backend"] = "sqlite"
+    indexes = build_indexes(conn, fact_table, summary)
+    if all(index["column_name"] != PARTITION_COLUMN for index in indexes):
+        indexes.append({"index_name": f"idx_{fact_table}_{PARTITION_COLUMN}", "column_name": PARTITION_COLUMN,
+                        "reason": "particao"}) # Criado junto com a tabela (ver start_partition)
+    source_file = source_files[0] if len(source_files) == 1 else \
+                  f"{source_files[0]} ... {source_files[-1]} ({len(source_files)} arquivos)"
+    conn.execute("BEGIN")
+    save_table_catalog(conn, fact_table, source_file, "sqlite", summary, indexes)
+    conn.execute("COMMIT")
+    return source_file, summary, indexes, len(partitions)
+
+
+@dataclass
+class _IngestionRun:
+    """
+    Opções e estado de uma execução de ingest_sources, compartilhados pelas etapas da carga.
+    Os arquivos são identificados pela origem ('source': caminho do CSV ou (zip, membro)), e não
+    pelo nome da tabela, para que membros de mesmo nome em pastas diferentes não se confundam.
+    """
+    storage_backend: str
+    incremental: bool
+    dictionary_encoding: bool
+    consolidate_monthly: bool
+    timer: StageTimer
+    errors: list = field(default_factory=list)
+    fingerprints: dict = field(default_factory=dict) # source -> impressão digital (fingerprint_source)
+    unchanged: dict = field(default_factory=dict) # source -> (table_name, entrada do manifesto)
+    to_load: list = field(default_factory=list) # Tuplas (filename, source, table_name) a carregar
+    results: list = field(default_factory=list) # Resumo ou exceção de cada arquivo de to_load
+    cancelled: bool = False
+    replace_metadata: bool = False # Carga completa: os metadados anteriores são substituídos
+    table_indexes: dict = field(default_factory=dict) # table_name -> índices criados
+    consolidated: dict = field(default_factory=dict) # table_name -> tabela consolidada, para os meses desta carga
+    encoded_tables: dict = field(default_factory=dict) # table_name -> resultado de encode_table
+    dimension_bytes: int = None
+    fact_tables_touched: set = field(default_factory=set) # Tabelas consolidadas cujos meses mudaram
+    fact_metadata: dict = field(default_factory=dict) # tabela consolidada -> (source_file, summary, indexes, meses)
+    partition_views: dict = field(default_factory=dict) # Mês consolidado -> tabela consolidada
+    files_loaded: int = 0
+    rows_loaded: int = 0
+
+    def loaded_files(self):
+        """
+        Itera sobre (filename, source, table_name, resumo) dos arquivos carregados sem erro.
+        """
+        for (filename, source, table_name), result in zip(self.to_load, self.results):
+            if not isinstance(result, Exception):
+                yield filename, source, table_name, result
+
+    def unchanged_tables(self):
+        """
+        Itera sobre (table_name, entrada do manifesto) dos arquivos inalterados.
+        """
+        return self.unchanged.values()
+
+
+def _is_unchanged(run: _IngestionRun, manifest_entry: dict, fingerprint: dict) -> bool:
+    """
+    Se o arquivo pode ser mantido sem recarga: mesma impressão digital e mesmas opções de carga.
+    """
+    if not run.incremental or manifest_entry is None:
+        return False
+    summary = manifest_entry["summary"]
+    return summary.get("storage_backend", "sqlite") == run.storage_backend \
+        and summary.get("column_types_version") == COLUMN_TYPES_VERSION \
+        and bool(summary.get("dictionary_encoding")) == run.dictionary_encoding \
+        and bool(summary.get("consolidate_monthly_tables")) == run.consolidate_monthly \
+        and manifest_entry["file_size"] == fingerprint["file_size"] \
+        and manifest_entry["content_hash"] == fingerprint["content_hash"]
+
+
+def _source_label(filename: str, source) -> str:
+    """
+    Nome do arquivo nas mensagens; para membros de ZIP, o caminho dentro do ZIP.
+    """
+    return source[1] if isinstance(source, tuple) else filename
+
+
+def _plan_sources(conn, run: _IngestionRun, csv_sources: list, existing_fact_tables: set):
+    """
+    Etapa de planejamento: separa os arquivos inalterados (mesma impressão digital no manifesto)
+    dos que precisam de carga. Arquivos cujo nome de tabela coincide com o de outro arquivo da
+    mesma carga (ex: 'a/notas.csv' e 'b/notas.csv') ou com uma tabela consolidada (já existente ou dos
+    arquivos mensais desta carga, que são gravados direto nela) não são carregados.
+    """
+    if run.consolidate_monthly:
+        existing_fact_tables = existing_fact_tables | {
+            monthly_table_layout(table_name)[0] for _, _, table_name in csv_sources
+            if monthly_table_layout(table_name) is not None
+        }
+    table_sources = {} # table_name -> filename do primeiro arquivo da carga com esse nome
+    for filename, source, table_name in csv_sources:
+        if table_name in existing_fact_tables:
+            run.errors.append(f"O arquivo '{filename}' não foi carregado: '{table_name}' "
+                              "é o nome de uma tabela consolidada de arquivos mensais.")
+            continue
+        if table_name in table_sources:
+            run.errors.append(f"O arquivo '{_source_label(filename, source)}' não foi carregado: a tabela "
+                              f"'{table_name}' já corresponde ao arquivo '{table_sources[table_name]}' desta carga.")
+            continue
+        try:
+            run.fingerprints[source] = fingerprint_source(source)
+        except Exception as e:
+            run.errors.append(f"Falha ao ler '{filename}': {e}")
+            continue
+        table_sources[table_name] = _source_label(filename, source)
+        manifest_entry = get_manifest_entry(conn, table_name)
+        if _is_unchanged(run, manifest_entry, run.fingerprints[source]):
+            run.unchanged[source] = (table_name, manifest_entry)
+        else:
+            run.to_load.append((filename, source, table_name))
+
+
+def _load_files(conn, run: _IngestionRun, chunk_size: int, workers: int, progress: LoadProgress):
+    """
+    Etapa de carga: leitura, normalização, perfil e gravação, bloco a bloco (tempos devolvidos em
+    cada resumo). Com cancelamento, o arquivo em andamento e os seguintes recebem IngestionCancelled.
+    Os carregadores marcam cada arquivo concluído assim que termina; aqui só são marcados os
+    arquivos com erro ou cancelados, de modo que cada arquivo é finalizado uma única vez.
+    """
+    if progress is not None:
+        progress.start([(table_name, filename, run.fingerprints[source]["file_size"])
+                        for filename, source, table_name in run.to_load])
+
+    files = [(source, table_name) for _, source, table_name in run.to_load]
+    if run.storage_backend == "parquet":
+        # Cada tabela é gravada em seu próprio diretório, fora do banco
+        results = load_csv_files_to_parquet(files, chunk_size, workers, progress)
+    elif workers > 1 and len(files) > 1:
+        try:
+            results = load_csv_files_parallel(conn, files, chunk_size, workers, progress, run.consolidate_monthly)
+        except IngestionCancelled as e:
+            results = [e] * len(files) # Transação única: nenhum arquivo foi gravado
+    else:
+        results = []
+        for file_index, (source, table_name) in enumerate(files):
+            try:
+                results.append(load_csv_file(conn, source, table_name, chunk_size, progress, run.consolidate_monthly))
+                if progress is not None:
+                    progress.finish_file(table_name, "concluído", results[-1]["row_count"])
+            except IngestionCancelled as e:
+                results.extend([e] * (len(files) - file_index))
+                break
+            except Exception as e:
+                results.append(e)
+
+    for (_, table_name), result in zip(files, results):
+        if not isinstance(result, Exception):
+            run.timer.merge(result.pop("stage_seconds", None))
+        elif progress is not None:
+            progress.finish_file(table_name, "cancelado" if isinstance(result, IngestionCancelled) else "erro")
+    run.results = results
+    run.cancelled = any(isinstance(result, IngestionCancelled) for result in results)
+
+
+def _finish_parquet_table(conn, run: _IngestionRun, table_name: str):
+    """
+    Remove a versão SQLite da tabela (ou o mês da tabela consolidada), se existir, para que o
+    nome não fique ambíguo. Tabelas Parquet não têm índices.
+    """
+    conn.execute("BEGIN")
+    previous_fact_table = remove_partition(conn, table_name)
+    drop_table(conn, table_name)
+    conn.execute("COMMIT")
+    if previous_fact_table is not None:
+        run.fact_tables_touched.add(previous_fact_table)
+    run.table_indexes[table_name] = []
+
+
+def _finish_sqlite_table(conn, run: _IngestionRun, filename: str, table_name: str, result: dict):
+    """
+    Codificação por dicionário e índices nas colunas de junção e filtro de uma tabela carregada no
+    SQLite. Arquivos mensais consolidados já foram gravados na tabela consolidada pelo carregador.
+    """
+    timer = run.timer
+    remove_parquet_table(table_name)
+    index_table = table_name
+    result["dictionary_encoding"] = run.dictionary_encoding
+    result["consolidate_monthly_tables"] = run.consolidate_monthly
+    fact_table = result.pop("fact_table", None)
+    consolidation_error = result.pop("consolidation_error", None)
+    if consolidation_error is not None:
+        run.errors.append(f"O arquivo '{filename}' não foi consolidado: {consolidation_error}")
+    if fact_table is not None:
+        run.consolidated[table_name] = fact_table
+        run.fact_tables_touched.add(fact_table)
+        run.table_indexes[table_name] = [] # Os índices ficam na tabela consolidada (ver _refresh_fact_tables)
+        return
+
+    # Mês carregado como tabela própria: sai da tabela consolidada, se fazia parte de uma
+    conn.execute("BEGIN")
+    previous_fact_table = remove_partition(conn, table_name)
+    conn.execute("COMMIT")
+    if previous_fact_table is not None:
+        run.fact_tables_touched.add(previous_fact_table)
+    if run.dictionary_encoding:
+        try:
+            with timer.stage("encode"):
+                encoding = encode_table(conn, table_name, result)
+            if encoding is not None:
+                run.encoded_tables[table_name] = encoding
+                index_table = encoded_table_name(table_name) # Índices na tabela física
+        except Exception as e:
+            run.errors.append(f"Falha na codificação por dicionário de '{filename}': {e}")
+    try:
+        with timer.stage("index"):
+            run.table_indexes[table_name] = build_indexes(conn, index_table, result)
+    except Exception as e:
+        run.table_indexes[table_name] = []
+        run.errors.append(f"Falha ao criar índices para '{filename}': {e}")
+
+
+def _finish_loaded_tables(conn, run: _IngestionRun):
+    """
+    Etapa pós-carga de cada tabela carregada (ver _finish_parquet_table e _finish_sqlite_table),
+    com o manifesto e o catálogo da tabela gravados juntos.
+    """
+    # Carga completa: os metadados anteriores são substituídos pelos desta carga. Uma carga
+    # cancelada preserva os anteriores e apenas acrescenta os arquivos já concluídos.
+    run.replace_metadata = not run.incremental and not run.cancelled
+    if run.replace_metadata:
+        with run.timer.stage("register"):
+            clear_catalog(conn) # O catálogo acompanha o DataFrameStore, limpo em _register_metadata
+
+    for filename, source, table_name, result in run.loaded_files():
+        result["storage_backend"] = run.storage_backend
+        if run.storage_backend == "parquet":
+            _finish_parquet_table(conn, run, table_name)
+        else:
+            _finish_sqlite_table(conn, run, filename, table_name, result)
+        with run.timer.stage("register"):
+            conn.execute("BEGIN")
+            record_manifest_entry(conn, table_name, filename, run.fingerprints[source],
+                                  result, run.table_indexes[table_name])
+            if table_name in run.consolidated:
+                remove_table_catalog(conn, table_name) # Só a tabela consolidada entra no catálogo
+            else:
+                save_table_catalog(conn, table_name, filename, run.storage_backend, result,
+                                   run.table_indexes[table_name])
+            conn.execute("COMMIT")
+
+
+def _refresh_fact_tables(conn, run: _IngestionRun, store: DataFrameStore):
+    """
+    Etapa de consolidação: uma carga completa remove das tabelas consolidadas os meses que não
+    fazem parte dela, e as tabelas consolidadas cujos meses mudaram têm índices, resumo e
+    catálogo refeitos.
+    """
+    timer = run.timer
+    if run.dictionary_encoding and run.consolidated:
+        # A tabela consolidada recebe e remove meses a cada carga, o que não é possível na view de uma
+        # tabela codificada: os meses consolidados ficam sem codificação, e o usuário é avisado
+        warning = (f"A codificação por dicionário não foi aplicada a {len(run.consolidated)} arquivos mensais "
+                   f"consolidados ({', '.join(sorted(set(run.consolidated.values())))}); para codificá-los, "
+                   "desative a consolidação dos arquivos mensais (CONSOLIDATE_MONTHLY_TABLES=0).")
+        app_logger.warning(warning)
+        run.errors.append(warning)
+    with timer.stage("consolidate"):
+        for fact_table in fact_table_names(conn):
+            for partition in fact_partitions(conn, fact_table):
+                if run.replace_metadata and partition["table_name"] not in run.consolidated:
+                    conn.execute("BEGIN")
+                    remove_partition(conn, partition["table_name"])
+                    conn.execute("COMMIT")
+                    run.fact_tables_touched.add(fact_table)
+                else:
+                    run.partition_views[partition["table_name"]] = fact_table
+    # Meses inalterados cuja tabela consolidada não está nos metadados (ex: após uma carga completa)
+    run.fact_tables_touched.update(
+        run.partition_views[table_name] for table_name, _ in run.unchanged_tables()
+        if table_name in run.partition_views and not store.has_table(run.partition_views[table_name])
+    )
+    for fact_table in sorted(run.fact_tables_touched):
+        try:
+            with timer.stage("index"):
+                run.fact_metadata[fact_table] = _build_fact_table_metadata(conn, fact_table)
+                run.table_indexes[fact_table] = (run.fact_metadata[fact_table] or (None, None, []))[2]
+        except Exception as e:
+            run.fact_metadata[fact_table] = None
+            run.errors.append(f"Falha ao registrar a tabela consolidada '{fact_table}': {e}")
+        if run.fact_metadata[fact_table] is None:
+            with timer.stage("register"):
+                remove_table_catalog(conn, fact_table)
+
+
+def _finish_database(conn, run: _IngestionRun, store: DataFrameStore):
+    """
+    Estatísticas do otimizador, tamanho das tabelas de dimensão e catálogo das tabelas inalteradas.
+    """
+    index_names = [index["index_name"] for indexes in run.table_indexes.values() for index in indexes]
+    if index_names:
+        with run.timer.stage("index"):
+            analyze_database(conn, index_names) # Só os índices desta carga, não o banco inteiro
+    if run.encoded_tables:
+        dimensions = sorted({dim for encoding in run.encoded_tables.values() for dim in encoding["dimensions"]})
+        run.dimension_bytes = table_size_bytes(conn, dimensions)
+
+    # Tabelas inalteradas ausentes do catálogo (ex: banco de uma versão anterior): completa o catálogo pelo manifesto
+    with run.timer.stage("register"):
+        for table_name, manifest_entry in run.unchanged_tables():
+            if not store.has_table(table_name) and table_name not in run.partition_views:
+                summary = manifest_entry["summary"]
+                save_table_catalog(conn, table_name, manifest_entry["source_file"],
+                                   summary.get("storage_backend", "sqlite"), summary, summary["indexes"])
+
+
+def _register_metadata(run: _IngestionRun, store: DataFrameStore):
+    """
+    Etapa de registro: metadados das tabelas carregadas, inalteradas e consolidadas no DataFrameStore.
+    """
+    if run.replace_metadata:
+        store.clear() # Limpa metadados de execuções anteriores, se houver.
+
+    # Metadados e erros são registrados na ordem dos arquivos, igual nos modos sequencial e paralelo
+    for (filename, _, table_name), result in zip(run.to_load, run.results):
+        if isinstance(result, IngestionCancelled):
+            run.errors.append(f"O arquivo CSV '{filename}' não foi carregado (carga cancelada).")
+            continue
+        if isinstance(result, pd.errors.EmptyDataError):
+            run.errors.append(f"O arquivo CSV '{filename}' está vazio e foi ignorado.")
+            continue
+        if isinstance(result, Exception):
+            run.errors.append(f"Falha ao processar '{filename}': {result}")
+            continue
+
+        if table_name in run.consolidated:
+            store.remove_table(table_name) # Registrado antes como tabela própria, se for o caso
+        else:
+            _register_table_metadata(store, table_name, filename, result, run.table_indexes[table_name],
+                                     run.storage_backend)
+        run.files_loaded += 1
+        run.rows_loaded += result.get("row_count") or 0
+
+    # Arquivos inalterados: os metadados só são registrados se ainda não estiverem no store
+    # (normalmente já vieram do catálogo do banco), a partir do resumo gravado no manifesto
+    for table_name, manifest_entry in run.unchanged_tables():
+        if not store.has_table(table_name) and table_name not in run.partition_views:
+            summary = manifest_entry["summary"]
+            _register_table_metadata(store, table_name, manifest_entry["source_file"], summary,
+                                     summary["indexes"], summary.get("storage_backend", "sqlite"))
+
+    # Tabelas consolidadas cujos meses mudaram (ou que ficaram sem meses)
+    for fact_table, metadata in run.fact_metadata.items():
+        if metadata is None:
+            store.remove_table(fact_table)
+            continue
+        source_file, summary, indexes, _ = metadata
+        _register_table_metadata(store, fact_table, source_file, summary, indexes, "sqlite")
+
+
+def _status_message(run: _IngestionRun) -> str:
+    destino = "no SQLite" if run.storage_backend == "sqlite" else "como arquivos Parquet"
+    status_message = "Carga cancelada. " if run.cancelled else ""
+    status_message += f"{run.files_loaded} arquivos CSV carregados com sucesso {destino} e metadados atualizados."
+    if run.unchanged:
+        status_message += f" {len(run.unchanged)} arquivos inalterados desde a última carga foram mantidos sem reprocessamento."
+    if run.consolidated:
+        status_message += f" {len(run.consolidated)} arquivos mensais consolidados em: " + ", ".join(
+            f"{fact_table} ({metadata[3]} meses)" for fact_table, metadata in run.fact_metadata.items()
+            if metadata is not None and fact_table in run.consolidated.values()
+        ) + "."
+    if run.encoded_tables:
+        status_message += " " + _encoding_summary(run.encoded_tables, run.dimension_bytes)
+    if run.errors:
+        status_message += "\n\nErros/Avisos durante o processo:\n" + "\n".join(run.errors)
+    return status_message
+
+
+def ingest_sources(csv_sources: list, chunk_size: int = CSV_CHUNK_SIZE, workers: int = LOAD_WORKERS,
+                   incremental: bool = INCREMENTAL_LOAD, storage_backend: str = STORAGE_BACKEND,
+                   timer: StageTimer = None, progress: LoadProgress = None,
+                   dictionary_encoding: bool = DICTIONARY_ENCODING,
+                   consolidate_monthly: bool = CONSOLIDATE_MONTHLY_TABLES) -> IngestionResult:
+    """
+    Carrega uma lista de CSVs no SQLite e registra seus metadados no DataFrameStore.
+    Implementação comum às cargas a partir de diretório e a partir de ZIP.
+
+    No modo incremental, cada CSV tem sua impressão digital (tamanho + CRC32) comparada com o
+    manifesto de carga gravado no banco: arquivos inalterados (e carregados com a versão atual do
+    registro de tipos, ver services/column_types.py) não são relidos, apenas as tabelas
+    cuja origem mudou são substituídas, e os metadados são mesclados aos já existentes.
+
+    Cada arquivo é identificado pela sua origem (caminho ou membro do ZIP); arquivos que resultariam
+    no mesmo nome de tabela (ex: 'a/notas.csv' e 'b/notas.csv' no mesmo ZIP) não são sobrescritos
+    em silêncio: o primeiro é carregado e os demais são informados nos erros/avisos.
+    As etapas (planejamento, carga, pós-carga, tabelas consolidadas e registro) ficam nas funções
+    _plan_sources, _load_files, _finish_loaded_tables, _refresh_fact_tables e _register_metadata.
+
+    Com storage_backend="parquet", as tabelas são gravadas como arquivos Parquet particionados
+    por mês de emissão (ver services/parquet_store.py) em vez de tabelas do SQLite.
+
+    Com dictionary_encoding=True (apenas no SQLite), as colunas de texto repetitivas de cada tabela
+    carregada passam a códigos inteiros em tabelas de dimensão, com uma view de mesmo nome
+    (ver tools/sqlite_dictionary_encoder.py); a economia de espaço e de varredura vai na mensagem.
+
+    Com consolidate_monthly=True (apenas no SQLite), cada arquivo mensal 'AAAAMM_<layout>' é acrescentado
+    à tabela consolidada '<layout>', com a coluna de partição 'mes_referencia', e vira uma view do mês
+    (ver services/fact_tables.py). Só as tabelas consolidadas entram nos metadados; meses consolidados
+    não são codificados por dicionário (a combinação das duas opções gera um aviso, ver _refresh_fact_tables).
+
+    Args:
+        csv_sources (list): Tuplas (filename, source, table_name), onde 'source' é o caminho
+                            do CSV ou uma tupla (zip_file_path, member_name).
+        chunk_size (int): Quantidade máxima de linhas lidas e gravadas por bloco.
+        workers (int): Quantidade de processos de leitura (1 = carga sequencial).
+        incremental (bool): Se True, ignora arquivos já carregados e preserva as demais tabelas.
+        storage_backend (str): "sqlite" ou "parquet".
+        timer (StageTimer): Tempos das etapas anteriores (ex: 'unzip'), aos quais os desta carga são somados.
+        progress (LoadProgress): Opcional; recebe o progresso de cada arquivo e permite cancelar a carga.
+        dictionary_encoding (bool): Se True, codifica por dicionário as colunas de texto repetitivas.
+        consolidate_monthly (bool): Se True, consolida os arquivos mensais de um mesmo layout.
+
+    Returns:
+        IngestionResult: A mensagem de status, as contagens e o tempo de cada etapa.
+    """
+    start = time.perf_counter()
+    timer = timer or StageTimer()
+
+    def finish(result: IngestionResult) -> IngestionResult:
+        result.stage_seconds = timer.seconds
+        result.wall_seconds = time.perf_counter() - start
+        return result
+
+    if storage_backend not in STORAGE_BACKENDS:
+        return finish(IngestionResult(
+            f"Erro: backend de armazenamento '{storage_backend}' inválido. Use um de: {', '.join(STORAGE_BACKENDS)}."
+        ))
+
+    if storage_backend == "parquet":
+        try:
+            require_pyarrow()
+        except ImportError as e:
+            return finish(IngestionResult(f"Erro: {e}"))
+
+    store = DataFrameStore()
+    # Os metadados de cargas anteriores só são limpos (carga completa) na etapa de registro, para que
+    # as tabelas já carregadas continuem consultáveis enquanto os novos arquivos são lidos e gravados
+    run = _IngestionRun(
+        storage_backend=storage_backend,
+        incremental=incremental,
+        dictionary_encoding=dictionary_encoding and storage_backend == "sqlite",
+        consolidate_monthly=consolidate_monthly and storage_backend == "sqlite",
+        timer=timer
+    )
+
+    try:
+        # Conexão de escrita compartilhada (isolation_level=None: as transações são controladas
+        # explicitamente pelo csv_loader). As consultas continuam usando as conexões de leitura.
+        # PRAGMAs de carga (synchronous=OFF, cache maior) valem apenas durante a carga.
+        with SQLiteConnectionManager().write_connection() as conn, bulk_load_profile(conn):
+            with timer.stage("register"):
+                ensure_manifest_table(conn)
+                ensure_catalog_tables(conn)
+                ensure_partitions_table(conn)
+                existing_fact_tables = set(fact_table_names(conn))
+            with timer.stage("unzip"):
+                _plan_sources(conn, run, csv_sources, existing_fact_tables)
+            _load_files(conn, run, chunk_size, workers, progress)
+            _finish_loaded_tables(conn, run)
+            _refresh_fact_tables(conn, run, store)
+            _finish_database(conn, run, store)
+
+        with timer.stage("register"):
+            _register_metadata(run, store)
+
+    except Exception as e:
+        return finish(IngestionResult(f"Erro ao estabelecer conexão com o banco de dados ou listar diretório: {e}",
+                                      errors=run.errors))
+
+    with timer.stage("register"):
+        if run.files_loaded:
+            # Tabelas foram substituídas: invalida os resultados de consultas em cache
+            store.bump_data_version()
+
+        # Monta já na carga o índice do esquema usado para reduzir o contexto de cada pergunta
+        SchemaContext().schema_index()
+
+    result = finish(IngestionResult(_status_message(run), run.files_loaded, len(run.unchanged),
+                                    run.rows_loaded, run.errors, cancelled=run.cancelled,
+                                    dictionary_encoding=run.encoded_tables))
+    app_logger.info(f"Pipeline de carga: {run.files_loaded} arquivos, {run.rows_loaded} linhas; "
+                    f"{result.timings_summary()}.")
+    return result
+
+
+def ingest_directory(directory_path: str, chunk_size: int = CSV_CHUNK_SIZE, workers: int = LOAD_WORKERS,
+                     incremental: bool = INCREMENTAL_LOAD, storage_backend: str = STORAGE_BACKEND,
+                     timer: StageTimer = None, progress: LoadProgress = None,
+                     dictionary_encoding: bool = DICTIONARY_ENCODING,
+                     consolidate_monthly: bool = CONSOLIDATE_MONTHLY_TABLES) -> IngestionResult:
+    """
+    Carrega os arquivos CSV de um diretório (ver ingest_sources).
+    """
+    try:
+        # Normaliza o nome da tabela de cada CSV
+        csv_sources = [
+            (filename, os.path.join(directory_path, filename), normalize_name(os.path.splitext(filename)[0]))
+            for filename in os.listdir(directory_path) if filename.endswith(".csv")
+        ]
+    except Exception as e:
+        return IngestionResult(f"Erro ao estabelecer conexão com o banco de dados ou listar diretório: {e}")
+
+    return ingest_sources(csv_sources, chunk_size, workers, incremental, storage_backend, timer, progress,
+                          dictionary_encoding, consolidate_monthly)
+
+
+def ingest_zip(zip_file_path: str, chunk_size: int = CSV_CHUNK_SIZE, workers: int = LOAD_WORKERS,
+               incremental: bool = INCREMENTAL_LOAD, storage_backend: str = STORAGE_BACKEND,
+               extract_to_disk: bool = False, destination_directory: str = None,
+               progress: LoadProgress = None, dictionary_encoding: bool = DICTIONARY_ENCODING,
+               consolidate_monthly: bool = CONSOLIDATE_MONTHLY_TABLES) -> IngestionResult:
+    """
+    Carrega os arquivos CSV de um ZIP. Por padrão cada CSV é lido diretamente de dentro do ZIP,
+    como um fluxo, sem cópia no disco; com extract_to_disk=True o ZIP é antes descompactado em
+    'destination_directory' e o diretório é carregado.
+
+    Args:
+        zip_file_path (str): O caminho completo para o arquivo ZIP.
+        chunk_size (int): Quantidade máxima de linhas lidas e gravadas por bloco.
+        workers (int): Quantidade de processos de leitura (1 = carga sequencial).
+        incremental (bool): Se True, arquivos já carregados e inalterados não são relidos e as
+                            tabelas de cargas anteriores são preservadas.
+        storage_backend (str): "sqlite" ou "parquet".
+        extract_to_disk (bool): Se True, descompacta o ZIP no disco antes da carga.
+        destination_directory (str): Diretório de extração (obrigatório com extract_to_disk=True).
+        progress (LoadProgress): Opcional; progresso por arquivo e por bloco, e cancelamento (ver
+                                 services/ingestion_jobs.py).
+        dictionary_encoding (bool): Se True, codifica por dicionário as colunas de texto repetitivas
+                                    (apenas no SQLite; ver ingest_sources).
+        consolidate_monthly (bool): Se True, os arquivos mensais de um mesmo layout são consolidados
+                                    em uma tabela por layout (apenas no SQLite; ver ingest_sources).
+
+    Returns:
+        IngestionResult: A mensagem de status, as contagens e o tempo de cada etapa.
+    """
+    if not zip_file_path.endswith(".zip"):
+        return IngestionResult(f"Erro: O arquivo '{zip_file_path}' não é um arquivo ZIP válido.")
+
+    timer = StageTimer()
+    try:
+        with timer.stage("unzip"):
+            if extract_to_disk:
+                os.makedirs(destination_directory, exist_ok=True)
+                with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+                    zip_ref.extractall(destination_directory)
+            else:
+                csv_sources = []
+                for member_name in list_zip_csv_members(zip_file_path):
+                    filename = os.path.basename(member_name)
+                    table_name = normalize_name(os.path.splitext(filename)[0]) # Normaliza o nome da tabela
+                    csv_sources.append((filename, (zip_file_path, member_name), table_name))
+    except zipfile.BadZipFile:
+        return IngestionResult(f"Erro: O arquivo ZIP '{zip_file_path}' está corrompido ou é inválido.")
+    except Exception as e:
+        return IngestionResult(f"Erro inesperado ao ler o ZIP '{zip_file_path}': {e}")
+
+    if extract_to_disk:
+        return ingest_directory(destination_directory, chunk_size, workers, incremental, storage_backend, timer,
+                                progress, dictionary_encoding, consolidate_monthly)
+
+    if not csv_sources:
+        return IngestionResult(f"Aviso: O arquivo ZIP '{zip_file_path}' não contém arquivos CSV.")
+
+    return ingest_sources(csv_sources, chunk_size, workers, incremental, storage_backend, timer, progress,
+                          dictionary_encoding, consolidate_monthly)
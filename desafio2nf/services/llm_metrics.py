@@ -0,0 +1,177 @@
+# ./services/llm_metrics.py
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from services.logger_config import app_logger
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError: # langchain_core acompanha o langchain-openai; sem ele só o uso informado pela CrewAI é contabilizado
+    BaseCallbackHandler = object
+
+# Instrumentação das perguntas: quantidade de chamadas ao LLM, tokens e tempo total de cada pergunta,
+# para comparar os modos de geração (QUERY_PIPELINE "direct" x "crew").
+# As chamadas dos clientes ChatOpenAI são contadas pelo callback llm_usage_callback; as dos agentes
+# da CrewAI, pelo uso que a Crew informa ao final do kickoff (record_crew_usage).
+
+MAX_RECORDED_QUESTIONS = 200
+
+_current_metrics = ContextVar("question_metrics", default=None)
+
+
+@dataclass
+class QuestionMetrics:
+    """
+    Métricas de uma pergunta, do início da geração ao fim da execução.
+
+    Attributes:
+        question (str): A pergunta do usuário.
+        mode (str): O modo de geração usado ('direct' ou 'crew').
+        route (str): No modo direto, o tipo de pergunta decidido pelo roteador ('data' ou 'metadata');
+                     'cache' quando o código veio do cache de perguntas.
+        llm_calls (int): Quantidade de chamadas ao LLM.
+        prompt_tokens (int): Tokens enviados ao LLM.
+        completion_tokens (int): Tokens gerados pelo LLM.
+        wall_seconds (float): Tempo total da pergunta.
+    """
+    question: str
+    mode: str
+    route: str = None
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    wall_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add_usage(self, prompt_tokens: int, completion_tokens: int, calls: int = 1):
+        with self._lock:
+            self.llm_calls += calls
+            self.prompt_tokens += prompt_tokens or 0
+            self.completion_tokens += completion_tokens or 0
+
+    def summary(self) -> str:
+        return (f"{self.llm_calls} chamadas ao LLM, {self.total_tokens} tokens "
+                f"({self.prompt_tokens} enviados, {self.completion_tokens} gerados), {self.wall_seconds:.2f} s")
+
+
+def current_question_metrics() -> QuestionMetrics:
+    """
+    Retorna as métricas da pergunta em andamento no contexto atual (None fora de track_question).
+    """
+    return _current_metrics.get()
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """
+    Callback do LangChain que soma, na pergunta em andamento, cada chamada ao LLM e seus tokens.
+    """
+
+    def on_llm_end(self, response, **kwargs):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        if prompt_tokens is None:
+            # Versões mais novas do langchain-openai informam o uso na própria mensagem gerada
+            for generations in response.generations:
+                for generation in generations:
+                    usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt_tokens = (prompt_tokens or 0) + usage_metadata.get("input_tokens", 0)
+                    completion_tokens = (completion_tokens or 0) + usage_metadata.get("output_tokens", 0)
+        metrics.add_usage(prompt_tokens, completion_tokens)
+
+
+llm_usage_callback = LLMUsageCallback() # Passado em callbacks=[...] de todos os clientes ChatOpenAI
+
+
+def record_crew_usage(crew_output):
+    """
+    Soma, na pergunta em andamento, o uso de LLM informado pela Crew (CrewOutput.token_usage).
+    """
+    metrics = _current_metrics.get()
+    usage = getattr(crew_output, "token_usage", None)
+    if metrics is None or usage is None:
+        return
+    metrics.add_usage(getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0),
+                      calls=getattr(usage, "successful_requests", 0))
+
+
+@contextmanager
+def track_question(question: str, mode: str):
+    """
+    Mede uma pergunta: as chamadas ao LLM feitas dentro do bloco são atribuídas a ela.
+    Ao final, registra as métricas no QuestionMetricsLog e no log da aplicação.
+
+    Exemplo:
+        with track_question(question, "direct") as metrics:
+            ...
+        st.caption(metrics.summary())
+    """
+    metrics = QuestionMetrics(question=question, mode=mode)
+    token = _current_metrics.set(metrics)
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_seconds = time.perf_counter() - start
+        _current_metrics.reset(token)
+        QuestionMetricsLog().add(metrics)
+        app_logger.info(f"Métricas da pergunta (modo {mode}, rota {metrics.route}): {metrics.summary()}.")
+
+
+class QuestionMetricsLog:
+    """
+    Histórico em memória (Singleton) das métricas das últimas perguntas, com médias por modo.
+    """
+    _instance = None # Armazena a única instância da classe
+
+    def __new__(cls):
+        """
+        Garante que apenas uma instância de QuestionMetricsLog seja criada (Singleton).
+        """
+        if cls._instance is None:
+            cls._instance = super(QuestionMetricsLog, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._records = deque(maxlen=MAX_RECORDED_QUESTIONS)
+        return cls._instance
+
+    def add(self, metrics: QuestionMetrics):
+        with self._lock:
+            self._records.append(metrics)
+
+    def recent(self) -> list:
+        with self._lock:
+            return list(self._records)
+
+    def summary_by_mode(self) -> dict:
+        """
+        Retorna as médias por modo de geração.
+
+        Returns:
+            dict: modo -> {'questions', 'avg_llm_calls', 'avg_tokens', 'avg_seconds'}.
+        """
+        by_mode = {}
+        for metrics in self.recent():
+            by_mode.setdefault(metrics.mode, []).append(metrics)
+        return {
+            mode: {
+                "questions": len(records),
+                "avg_llm_calls": sum(m.llm_calls for m in records) / len(records),
+                "avg_tokens": sum(m.total_tokens for m in records) / len(records),
+                "avg_seconds": sum(m.wall_seconds for m in records) / len(records),
+            }
+            for mode, records in by_mode.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
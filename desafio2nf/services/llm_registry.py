@@ -0,0 +1,59 @@
+# ./services/llm_registry.py
+
+import os
+import threading
+from dotenv import load_dotenv
+from services.llm_metrics import llm_usage_callback
+from services.llm_stub import StubChatLLM
+from services.settings import LLM_PROVIDER, LLM_MODEL, LLM_STUB_RESPONSES
+
+load_dotenv()
+
+# Registro, no processo, dos clientes de LLM. Cada ChatOpenAI mantém o seu pool de conexões HTTP;
+# reaproveitar o cliente evita um novo handshake TLS e a reconstrução do cliente a cada pergunta.
+# Os clientes são criados na primeira utilização e compartilhados por todas as sessões do Streamlit.
+# O provedor é escolhido por LLM_PROVIDER: "openai" (ChatOpenAI) ou "stub" (services/llm_stub.py).
+
+LLM_PROVIDERS = ("openai", "stub")
+
+_clients = {} # (provedor, temperatura, track_usage) -> cliente
+_clients_lock = threading.Lock()
+
+
+def _create_client(provider: str, temperature: float, callbacks: list):
+    if provider == "stub":
+        return StubChatLLM(temperature=temperature, callbacks=callbacks, responses_path=LLM_STUB_RESPONSES or None)
+    if provider != "openai":
+        raise ValueError(f"LLM_PROVIDER inválido: '{provider}'. Use um destes: {', '.join(LLM_PROVIDERS)}.")
+    from langchain_openai import ChatOpenAI # Import local: o provedor 'stub' funciona sem o pacote
+    return ChatOpenAI(
+        model=LLM_MODEL,
+        temperature=temperature,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        callbacks=callbacks
+    )
+
+
+def get_chat_llm(temperature: float = 0, track_usage: bool = True, provider: str = LLM_PROVIDER):
+    """
+    Retorna o cliente de LLM compartilhado para o provedor e a temperatura informados.
+
+    Args:
+        temperature (float): Temperatura do modelo (0 para geração de código determinística).
+        track_usage (bool): Se True, as chamadas são contabilizadas nas métricas da pergunta pelo
+                            llm_usage_callback. Use False nos LLMs dos agentes da CrewAI, cujo uso
+                            é informado pela própria Crew (ver services/llm_metrics.py).
+        provider (str): "openai" ou "stub".
+
+    Returns:
+        O cliente (ChatOpenAI ou StubChatLLM), com o método predict(prompt).
+    """
+    key = (provider, temperature, track_usage)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _create_client(provider, temperature, [llm_usage_callback] if track_usage else None)
+                _clients[key] = client
+    return client
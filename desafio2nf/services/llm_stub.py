@@ -0,0 +1,249 @@
+# ./services/llm_stub.py
+
+import json
+import os
+import re
+import threading
+from types import SimpleNamespace
+from services.question_cache import normalize_question
+from services.question_router import route_question, METADATA_ROUTE
+
+try:
+    from crewai import BaseLLM
+except ImportError: # Versão da CrewAI sem LLMs customizados: o stub atende apenas às chamadas diretas (predict)
+    BaseLLM = object
+
+# Backend de LLM local e determinístico (LLM_PROVIDER=stub), para medir latência e vazão e rodar
+# testes de regressão sem rede e sem chave de API. Substitui apenas o LLM: as ferramentas e os
+# agentes da CrewAI são os mesmos do provedor real.
+# - Chamadas diretas (predict) do sql_generator_tool e do metadata_query_tool recebem o código
+#   cadastrado para a pergunta (respostas enlatadas); perguntas desconhecidas recebem uma consulta
+#   padrão sobre a primeira tabela do contexto.
+# - Nos agentes (call), o stub segue o formato ReAct da CrewAI: chama a ferramenta da tarefa com os
+#   argumentos extraídos da descrição da tarefa e devolve a observação da ferramenta como resposta final.
+
+# A pergunta aparece no fim dos prompts, entre aspas, antes de "SQL:" ou "Código Python:"
+_PROMPT_QUESTION_PATTERN = re.compile(r'"([^"\n]*)"\s*(SQL|Código Python):\s*$')
+_CONTEXT_TABLE_PATTERN = re.compile(r"Tabela '([^']+)'")
+
+# Trechos das descrições das tarefas dos agentes (agents/*.py), já com os inputs do kickoff interpolados
+_TOOL_NAME_PATTERN = re.compile(r"^Tool Name: (\w+)", re.MULTILINE)
+# Resultado da ferramenta: vem depois da ação do próprio stub (Action Input em JSON, em uma linha). As
+# instruções de formato da CrewAI também citam "Observation:", mas sem um JSON antes
+_OBSERVATION_PATTERN = re.compile(r"^Action Input: \{[^\n]*\}[ \t]*\nObservation:", re.MULTILINE)
+# Lembrete da lista de ferramentas que a CrewAI às vezes acrescenta ao fim do resultado da ferramenta
+_TOOLS_REMINDER_PATTERN = re.compile(r"\n\s*You ONLY have access to the following tools")
+_TASK_QUESTION_PATTERN = re.compile(r'pergunta do usuário: "(.*)"\.[ \t]*$', re.MULTILINE)
+_TASK_CONTEXT_PATTERN = re.compile(r"esquemas:\*\*\s*(.*?)\s*Com base nesta pergunta", re.DOTALL)
+_TASK_CODE_PATTERN = re.compile(r"código gerado:\s*```[ \t]*\n(.*)\n\s*```\s*\*\*Sua tarefa", re.DOTALL)
+_TASK_ZIP_PATTERN = re.compile(r"ZIP (?:localizado em )?'([^']+)'")
+_TASK_DESTINATION_PATTERN = re.compile(r"diretório de destino '([^']+)'")
+_TASK_DIRECTORY_PATTERN = re.compile(r"encontrados no diretório '([^']+)'")
+_TASK_BACKEND_PATTERN = re.compile(r"storage_backend='([^']+)'")
+_CODE_FENCE_PATTERN = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+DEFAULT_METADATA_CODE = "all_metadata_df['table_name'].unique().tolist()"
+STUB_MODEL_NAME = "stub"
+
+# Respostas compartilhadas por todas as instâncias. Ficam no módulo, e não na classe: com a CrewAI 1.x
+# o BaseLLM é um modelo pydantic, que trataria atributos de classe com '_' como atributos privados
+_responses = {} # pergunta normalizada -> código
+_responses_lock = threading.Lock()
+_loaded_paths = set()
+
+
+def _task_code(prompt: str) -> str:
+    match = _TASK_CODE_PATTERN.search(prompt)
+    return _CODE_FENCE_PATTERN.sub("", match.group(1).strip()).strip() if match else None
+
+
+def _task_question_route(prompt: str) -> tuple:
+    """
+    Retorna (pergunta, contexto, rota) da tarefa do QueryAnalyzerAgent, ou None em outras tarefas.
+    """
+    question = _TASK_QUESTION_PATTERN.search(prompt)
+    if question is None:
+        return None
+    context = _TASK_CONTEXT_PATTERN.search(prompt)
+    context = context.group(1) if context else ""
+    route, _, _ = route_question(question.group(1), _CONTEXT_TABLE_PATTERN.findall(context))
+    return question.group(1), context, route
+
+
+def _sql_generator_args(prompt: str) -> dict:
+    task = _task_question_route(prompt)
+    if task is None or task[2] == METADATA_ROUTE:
+        return None
+    return {"question": task[0], "table_schemas_context": task[1]}
+
+
+def _metadata_query_args(prompt: str) -> dict:
+    code = _task_code(prompt)
+    if code is not None: # Tarefa do ResponseFormatterAgent: o código de metadados é passado à ferramenta
+        return {"question": code} if "all_metadata_df" in code or "DataFrameStore" in code else None
+    task = _task_question_route(prompt)
+    if task is None or task[2] != METADATA_ROUTE:
+        return None
+    return {"question": task[0]}
+
+
+def _sqlite_query_args(prompt: str) -> dict:
+    code = _task_code(prompt)
+    return {"sql_query": code} if code is not None and code.lower().startswith(("select", "with")) else None
+
+
+def _load_zip_args(prompt: str) -> dict:
+    zip_path = _TASK_ZIP_PATTERN.search(prompt)
+    backend = _TASK_BACKEND_PATTERN.search(prompt)
+    if zip_path is None:
+        return None
+    return {"zip_file_path": zip_path.group(1), **({"storage_backend": backend.group(1)} if backend else {})}
+
+
+def _unzip_args(prompt: str) -> dict:
+    zip_path = _TASK_ZIP_PATTERN.search(prompt)
+    destination = _TASK_DESTINATION_PATTERN.search(prompt)
+    if zip_path is None or destination is None:
+        return None
+    return {"zip_file_path": zip_path.group(1), "destination_directory": destination.group(1)}
+
+
+def _load_csv_args(prompt: str) -> dict:
+    directory = _TASK_DIRECTORY_PATTERN.search(prompt)
+    backend = _TASK_BACKEND_PATTERN.search(prompt)
+    if directory is None:
+        return None
+    return {"directory_path": directory.group(1), **({"storage_backend": backend.group(1)} if backend else {})}
+
+
+# Ferramenta -> argumentos extraídos da tarefa (None se a ferramenta não se aplica à tarefa)
+_TOOL_ARGUMENTS = {
+    "sql_generator_tool": _sql_generator_args,
+    "metadata_query_tool": _metadata_query_args,
+    "sqlite_query_tool": _sqlite_query_args,
+    "load_zip_to_sqlite_tool": _load_zip_args,
+    "unzip_file_tool": _unzip_args,
+    "load_csv_to_sqlite_tool": _load_csv_args,
+}
+
+
+class StubChatLLM(BaseLLM):
+    """
+    Substituto local do ChatOpenAI: atende às ferramentas (predict) e, como LLM customizado da
+    CrewAI (call), conduz os agentes. As respostas são compartilhadas por todas as instâncias e
+    podem vir de um arquivo JSON (LLM_STUB_RESPONSES, pergunta -> código) ou ser cadastradas com
+    register_response.
+    """
+    def __init__(self, temperature: float = 0, callbacks: list = None, responses_path: str = None):
+        if BaseLLM is not object:
+            super().__init__(model=STUB_MODEL_NAME, temperature=temperature)
+        self.temperature = temperature
+        self.callbacks = callbacks or []
+        if responses_path:
+            self.load_responses(responses_path)
+
+    @classmethod
+    def register_response(cls, question: str, code: str):
+        with _responses_lock:
+            _responses[normalize_question(question)] = code
+
+    @classmethod
+    def load_responses(cls, path: str):
+        """
+        Cadastra as respostas de um arquivo JSON no formato {"pergunta": "código", ...} (uma vez por arquivo).
+        """
+        if path in _loaded_paths or not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            responses = json.load(f)
+        for question, code in responses.items():
+            cls.register_response(question, code)
+        _loaded_paths.add(path)
+
+    def _answer(self, prompt: str) -> str:
+        match = _PROMPT_QUESTION_PATTERN.search(prompt.rstrip())
+        if match is None:
+            return "[ERRO] Prompt não reconhecido pelo LLM local."
+        question, kind = match.groups()
+        code = _responses.get(normalize_question(question))
+        if code is not None:
+            return code
+        if kind != "SQL":
+            # O ResponseFormatterAgent passa ao metadata_query_tool o próprio código a executar
+            return question if "all_metadata_df" in question else DEFAULT_METADATA_CODE
+        table = _CONTEXT_TABLE_PATTERN.search(prompt)
+        return f'SELECT COUNT(*) FROM "{table.group(1)}"' if table else "SELECT 1"
+
+    @staticmethod
+    def _observation(text: str) -> str:
+        """
+        Retorna o resultado da última ferramenta chamada pelo stub em 'text', ou None.
+        """
+        matches = list(_OBSERVATION_PATTERN.finditer(text))
+        if not matches:
+            return None
+        observation = text[matches[-1].end():]
+        reminder = _TOOLS_REMINDER_PATTERN.search(observation)
+        return (observation[:reminder.start()] if reminder else observation).strip()
+
+    @staticmethod
+    def _agent_step(conversation: str, observation: str = None) -> str:
+        """
+        Próximo passo do agente no formato ReAct: a ação com a ferramenta da tarefa ou, depois da
+        observação da ferramenta, a resposta final (o resultado da ferramenta, sem alterações).
+        """
+        if observation is not None:
+            return f"Thought: I now know the final answer\nFinal Answer: {observation}"
+        for tool_name in _TOOL_NAME_PATTERN.findall(conversation):
+            arguments = _TOOL_ARGUMENTS.get(tool_name, lambda prompt: None)(conversation)
+            if arguments is not None:
+                return (f"Thought: Vou usar a ferramenta {tool_name}.\nAction: {tool_name}\n"
+                        f"Action Input: {json.dumps(arguments, ensure_ascii=False)}")
+        # Nenhuma ferramenta se aplica (ex: o código recebido é uma mensagem): devolve o próprio código
+        code = _task_code(conversation)
+        final_answer = code if code is not None else "[ERRO] Tarefa não reconhecida pelo LLM local."
+        return f"Thought: I now know the final answer\nFinal Answer: {final_answer}"
+
+    def _report_usage(self, prompt: str, answer: str):
+        # Uso estimado (cerca de 4 caracteres por token), informado aos callbacks como o ChatOpenAI faz
+        response = SimpleNamespace(
+            llm_output={"token_usage": {"prompt_tokens": len(prompt) // 4 + 1, "completion_tokens": len(answer) // 4 + 1}},
+            generations=[]
+        )
+        for callback in self.callbacks:
+            callback.on_llm_end(response)
+
+    def predict(self, prompt: str) -> str:
+        answer = self._answer(prompt)
+        self._report_usage(prompt, answer)
+        return answer
+
+    def call(self, messages, tools: list = None, callbacks: list = None, available_functions: dict = None,
+             **kwargs) -> str:
+        """
+        Chamada da CrewAI (interface BaseLLM): 'messages' é o prompt ou a lista de mensagens do agente.
+        Na lista, as respostas anteriores do agente (com o resultado das ferramentas) são as mensagens
+        'assistant'; as demais formam a descrição da tarefa.
+        """
+        if isinstance(messages, str):
+            conversation = messages
+            observation = self._observation(messages)
+        else:
+            conversation = "\n".join(str(message.get("content", "")) for message in messages
+                                     if message.get("role") != "assistant")
+            observation = None
+            for message in messages:
+                if message.get("role") == "assistant":
+                    observation = self._observation(str(message.get("content", ""))) or observation
+        answer = self._agent_step(conversation, observation)
+        self._report_usage(conversation, answer)
+        return answer
+
+    def supports_function_calling(self) -> bool:
+        return False # Os agentes usam o formato ReAct (Action / Action Input), em texto
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128000
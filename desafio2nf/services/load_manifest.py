@@ -0,0 +1,108 @@
+# ./services/load_manifest.py
+
+import json
+import sqlite3
+import zipfile
+import zlib
+from datetime import datetime
+from services.parquet_store import parquet_table_exists
+from services.column_types import COLUMN_TYPES_VERSION
+
+# Manifesto de carga: uma tabela dentro do próprio banco SQLite que registra, para cada tabela
+# carregada, a impressão digital do CSV de origem (tamanho + CRC32 do conteúdo) e o resumo da carga.
+# Permite recargas incrementais: um CSV cuja impressão digital não mudou não é lido novamente.
+
+MANIFEST_TABLE = "_load_manifest"
+
+
+def ensure_manifest_table(conn: sqlite3.Connection):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{MANIFEST_TABLE}" (
+            table_name TEXT PRIMARY KEY,
+            source_file TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            summary_json TEXT NOT NULL,
+            loaded_at TEXT NOT NULL
+        )
+    """)
+
+
+def fingerprint_source(source) -> dict:
+    """
+    Calcula a impressão digital de um CSV.
+    Para membros de ZIP, usa o tamanho e o CRC32 já gravados no diretório central do ZIP
+    (sem descompactar nada); para arquivos no disco, calcula o CRC32 lendo o arquivo em blocos.
+
+    Args:
+        source: Caminho do CSV ou tupla (zip_file_path, member_name); ver csv_loader.open_csv_source.
+
+    Returns:
+        dict: {'file_size': int, 'content_hash': str}.
+    """
+    if isinstance(source, tuple):
+        zip_file_path, member_name = source
+        with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+            info = zip_ref.getinfo(member_name)
+        return {"file_size": info.file_size, "content_hash": f"crc32:{info.CRC:08x}"}
+
+    crc = 0
+    file_size = 0
+    with open(source, "rb") as csv_file:
+        for block in iter(lambda: csv_file.read(1024 * 1024), b""):
+            crc = zlib.crc32(block, crc)
+            file_size += len(block)
+    return {"file_size": file_size, "content_hash": f"crc32:{crc:08x}"}
+
+
+def get_manifest_entry(conn: sqlite3.Connection, table_name: str):
+    """
+    Retorna o registro do manifesto de uma tabela (dict) ou None, se a tabela não constar
+    no manifesto ou não existir mais no banco.
+    """
+    row = conn.execute(
+        f'SELECT source_file, file_size, content_hash, summary_json FROM "{MANIFEST_TABLE}" WHERE table_name = ?',
+        (table_name,)
+    ).fetchone()
+    if row is None:
+        return None
+    summary = json.loads(row[3])
+    if summary.get("storage_backend", "sqlite") == "parquet":
+        table_exists = parquet_table_exists(table_name)
+    else:
+        table_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?", (table_name,)
+        ).fetchone() is not None
+    if not table_exists:
+        return None
+    return {
+        "source_file": row[0],
+        "file_size": row[1],
+        "content_hash": row[2],
+        "summary": summary,
+    }
+
+
+def record_manifest_entry(conn: sqlite3.Connection, table_name: str, source_file: str,
+                          fingerprint: dict, summary: dict, indexes: list):
+    """
+    Registra (ou substitui) a entrada do manifesto de uma tabela recém-carregada.
+    O resumo da carga é gravado em JSON (tipos das colunas como texto) junto com os índices criados,
+    para que os metadados possam ser registrados novamente sem reler o CSV.
+    """
+    summary_json = json.dumps({
+        "column_dtypes": {col: str(dtype) for col, dtype in summary["column_dtypes"].items()},
+        "row_count": summary["row_count"],
+        "column_stats": summary["column_stats"],
+        "indexes": indexes,
+        "storage_backend": summary.get("storage_backend", "sqlite"),
+        "column_types_version": COLUMN_TYPES_VERSION,
+        "dictionary_encoding": summary.get("dictionary_encoding", False),
+        "consolidate_monthly_tables": summary.get("consolidate_monthly_tables", False),
+    })
+    conn.execute(
+        f'INSERT OR REPLACE INTO "{MANIFEST_TABLE}" '
+        "(table_name, source_file, file_size, content_hash, summary_json, loaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (table_name, source_file, fingerprint["file_size"], fingerprint["content_hash"], summary_json,
+         datetime.now().isoformat(timespec="seconds"))
+    )
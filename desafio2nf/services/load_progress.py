@@ -0,0 +1,120 @@
+# ./services/load_progress.py
+
+import multiprocessing
+import threading
+import time
+
+# Progresso e cancelamento de uma carga em andamento. O pipeline de carga atualiza o LoadProgress a
+# cada bloco lido (linhas e bytes descompactados de cada CSV); a interface lê snapshot() para exibir
+# o andamento e a estimativa de término. O cancelamento é verificado a cada bloco: o arquivo em
+# andamento é desfeito (rollback da transação no SQLite, descarte do diretório temporário no Parquet).
+# Fica fora de tools/ e não importa o CrewAI, pois também é usado pelos processos de leitura.
+
+
+class IngestionCancelled(Exception):
+    """
+    Lançada dentro da carga quando o cancelamento foi solicitado.
+    """
+    def __init__(self, message: str = "Carga cancelada pelo usuário."):
+        super().__init__(message)
+
+
+class LoadProgress:
+    """
+    Progresso de uma carga, compartilhado entre a thread da carga e a interface.
+    O evento de cancelamento é um multiprocessing.Event, repassado aos processos de leitura na
+    sua criação, para que a carga paralela em Parquet também pare no próximo bloco.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cancel_event = multiprocessing.Event()
+        self._files = {} # table_name -> {'filename', 'bytes_total', 'bytes_read', 'rows', 'status'}
+        self._started_at = None
+
+    def start(self, files: list):
+        """
+        Registra os arquivos que serão carregados.
+
+        Args:
+            files (list): Tuplas (table_name, filename, bytes_total), onde bytes_total é o tamanho
+                          descompactado do CSV.
+        """
+        with self._lock:
+            self._started_at = time.monotonic()
+            for table_name, filename, bytes_total in files:
+                self._files[table_name] = {"filename": filename, "bytes_total": bytes_total,
+                                           "bytes_read": 0, "rows": 0, "status": "pendente"}
+
+    def advance(self, table_name: str, rows: int, bytes_read: int = None):
+        """
+        Soma as linhas de um bloco e atualiza os bytes já lidos do arquivo (posição absoluta).
+
+        Raises:
+            IngestionCancelled: Se o cancelamento foi solicitado.
+        """
+        with self._lock:
+            entry = self._files.get(table_name)
+            if entry is not None:
+                entry["status"] = "carregando"
+                entry["rows"] += rows
+                if bytes_read is not None:
+                    entry["bytes_read"] = max(entry["bytes_read"], bytes_read)
+        self.check_cancelled()
+
+    def finish_file(self, table_name: str, status: str, rows: int = None):
+        """
+        Marca o arquivo como 'concluído', 'erro' ou 'cancelado'. Para 'concluído', todos os
+        bytes contam como lidos (e rows, se informado, substitui a contagem de linhas).
+        """
+        with self._lock:
+            entry = self._files.get(table_name)
+            if entry is None:
+                return
+            entry["status"] = status
+            if status == "concluído":
+                entry["bytes_read"] = entry["bytes_total"]
+                if rows is not None:
+                    entry["rows"] = rows
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise IngestionCancelled()
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: {'files_total', 'files_done', 'current_file', 'rows_loaded', 'bytes_read', 'bytes_total',
+                   'fraction' (0 a 1), 'elapsed_seconds', 'eta_seconds' (None sem estimativa), 'cancelled',
+                   'files': [{'filename', 'bytes_total', 'bytes_read', 'rows', 'status'}, ...]}.
+                  A estimativa de término extrapola a vazão (bytes por segundo) observada até agora.
+        """
+        with self._lock:
+            files = [dict(entry) for entry in self._files.values()]
+            started_at = self._started_at
+        bytes_total = sum(entry["bytes_total"] for entry in files)
+        bytes_read = sum(entry["bytes_read"] for entry in files)
+        elapsed_seconds = time.monotonic() - started_at if started_at is not None else 0.0
+        eta_seconds = None
+        if bytes_read and bytes_total and elapsed_seconds > 0:
+            eta_seconds = (bytes_total - bytes_read) * elapsed_seconds / bytes_read
+        current_file = next((entry["filename"] for entry in files if entry["status"] == "carregando"), None)
+        return {
+            "files_total": len(files),
+            "files_done": sum(1 for entry in files if entry["status"] in ("concluído", "erro", "cancelado")),
+            "current_file": current_file,
+            "rows_loaded": sum(entry["rows"] for entry in files),
+            "bytes_read": bytes_read,
+            "bytes_total": bytes_total,
+            "fraction": min(bytes_read / bytes_total, 1.0) if bytes_total else 0.0,
+            "elapsed_seconds": elapsed_seconds,
+            "eta_seconds": eta_seconds,
+            "cancelled": self.cancelled,
+            "files": files,
+        }
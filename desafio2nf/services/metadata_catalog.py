@@ -0,0 +1,160 @@
+# ./services/metadata_catalog.py
+
+import json
+import sqlite3
+import time
+from datetime import datetime
+from services.parquet_store import parquet_table_exists
+
+# Catálogo de metadados gravado dentro do próprio banco SQLite a cada carga: tabelas (arquivo de
+# origem, backend, quantidade de linhas, índices) e colunas (tipo e estatísticas da carga).
+# Permite que o DataFrameStore seja reconstruído após reiniciar o servidor, sem recarregar o ZIP.
+# A versão dos dados (usada nas chaves dos caches) também fica no banco, de modo que uma carga feita
+# por outro processo (ex: ingest.py) invalida os caches do Streamlit.
+
+CATALOG_TABLE = "_catalog_tables"
+CATALOG_COLUMNS_TABLE = "_catalog_columns"
+DATA_VERSION_TABLE = "_data_version"
+
+
+def ensure_catalog_tables(conn: sqlite3.Connection):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{CATALOG_TABLE}" (
+            table_name TEXT PRIMARY KEY,
+            source_file TEXT,
+            storage_backend TEXT NOT NULL,
+            row_count INTEGER,
+            indexes_json TEXT NOT NULL,
+            loaded_at TEXT NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS "{CATALOG_COLUMNS_TABLE}" (
+            table_name TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            column_name TEXT NOT NULL,
+            data_type TEXT NOT NULL,
+            stats_json TEXT NOT NULL,
+            PRIMARY KEY (table_name, position)
+        )
+    """)
+    ensure_data_version_table(conn)
+
+
+def ensure_data_version_table(conn: sqlite3.Connection):
+    """
+    Cria a tabela (de uma única linha) com a versão dos dados. A versão começa do relógio, em
+    milissegundos, e não de zero: um banco recriado (ex: após limpar os dados) não repete as versões
+    do banco anterior, que ainda podem estar nas chaves dos caches de outros processos.
+    """
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{DATA_VERSION_TABLE}" (version INTEGER NOT NULL)')
+    conn.execute(
+        f'INSERT INTO "{DATA_VERSION_TABLE}" (version) SELECT ? '
+        f'WHERE NOT EXISTS (SELECT 1 FROM "{DATA_VERSION_TABLE}")',
+        (time.time_ns() // 1_000_000,)
+    )
+
+
+def bump_stored_data_version(conn: sqlite3.Connection) -> int:
+    """
+    Incrementa a versão dos dados gravada no banco (na conexão de escrita).
+
+    Returns:
+        int: A nova versão.
+    """
+    ensure_data_version_table(conn)
+    conn.execute(f'UPDATE "{DATA_VERSION_TABLE}" SET version = version + 1')
+    return read_stored_data_version(conn)
+
+
+def read_stored_data_version(conn: sqlite3.Connection) -> int:
+    """
+    Lê a versão dos dados gravada no banco (0 se o banco ainda não tiver a tabela).
+    """
+    try:
+        row = conn.execute(f'SELECT version FROM "{DATA_VERSION_TABLE}"').fetchone()
+    except sqlite3.OperationalError:
+        return 0 # Banco criado antes da tabela de versão: ela é criada na próxima carga
+    return row[0] if row else 0
+
+
+def save_table_catalog(conn: sqlite3.Connection, table_name: str, source_file: str, storage_backend: str,
+                       summary: dict, indexes: list):
+    """
+    Registra (ou substitui) uma tabela no catálogo. Deve ser chamado na conexão de escrita,
+    de preferência dentro da mesma transação que registra o manifesto de carga.
+
+    Args:
+        summary (dict): O resumo da carga do arquivo (ver csv_loader.FileLoadSummary.to_dict).
+        indexes (list): Os índices criados para a tabela (ver sqlite_index_builder.build_indexes).
+    """
+    conn.execute(f'DELETE FROM "{CATALOG_COLUMNS_TABLE}" WHERE table_name = ?', (table_name,))
+    conn.execute(
+        f'INSERT OR REPLACE INTO "{CATALOG_TABLE}" '
+        "(table_name, source_file, storage_backend, row_count, indexes_json, loaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (table_name, source_file, storage_backend, summary.get("row_count"), json.dumps(indexes),
+         datetime.now().isoformat(timespec="seconds"))
+    )
+    column_stats = summary.get("column_stats", {})
+    conn.executemany(
+        f'INSERT INTO "{CATALOG_COLUMNS_TABLE}" (table_name, position, column_name, data_type, stats_json) '
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (table_name, position, col, str(dtype), json.dumps(column_stats.get(col, {})))
+            for position, (col, dtype) in enumerate(summary["column_dtypes"].items())
+        ]
+    )
+
+
+def remove_table_catalog(conn: sqlite3.Connection, table_name: str):
+    conn.execute(f'DELETE FROM "{CATALOG_COLUMNS_TABLE}" WHERE table_name = ?', (table_name,))
+    conn.execute(f'DELETE FROM "{CATALOG_TABLE}" WHERE table_name = ?', (table_name,))
+
+
+def clear_catalog(conn: sqlite3.Connection):
+    conn.execute(f'DELETE FROM "{CATALOG_COLUMNS_TABLE}"')
+    conn.execute(f'DELETE FROM "{CATALOG_TABLE}"')
+
+
+def read_catalog(conn: sqlite3.Connection) -> list:
+    """
+    Lê o catálogo, ignorando tabelas que não existem mais no banco (ou no diretório Parquet).
+
+    Returns:
+        list: Um dict por tabela, na ordem em que foram carregadas, com as chaves 'table_name',
+              'source_file', 'storage_backend', 'row_count', 'indexes' e 'columns'
+              (lista de dicts com 'column_name', 'data_type' e 'stats').
+              Lista vazia se o catálogo ainda não existir.
+    """
+    existing_objects = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")
+    }
+    if CATALOG_TABLE not in existing_objects:
+        return []
+
+    columns_by_table = {}
+    for table_name, column_name, data_type, stats_json in conn.execute(
+        f'SELECT table_name, column_name, data_type, stats_json FROM "{CATALOG_COLUMNS_TABLE}" ORDER BY table_name, position'
+    ):
+        columns_by_table.setdefault(table_name, []).append(
+            {"column_name": column_name, "data_type": data_type, "stats": json.loads(stats_json)}
+        )
+
+    catalog = []
+    for table_name, source_file, storage_backend, row_count, indexes_json in conn.execute(
+        f'SELECT table_name, source_file, storage_backend, row_count, indexes_json FROM "{CATALOG_TABLE}" ORDER BY rowid'
+    ):
+        if storage_backend == "parquet":
+            if not parquet_table_exists(table_name):
+                continue
+        elif table_name not in existing_objects:
+            continue
+        catalog.append({
+            "table_name": table_name,
+            "source_file": source_file,
+            "storage_backend": storage_backend,
+            "row_count": row_count,
+            "indexes": json.loads(indexes_json),
+            "columns": columns_by_table.get(table_name, []),
+        })
+    return catalog
@@ -0,0 +1,364 @@
+# ./services/parquet_store.py
+
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from services.csv_loader import (iter_normalized_chunks, FileLoadSummary, StageTimer, init_cancel_event,
+                                 check_worker_cancelled)
+from services.load_progress import IngestionCancelled, LoadProgress
+from services.settings import PARQUET_DIR, PARQUET_COMPRESSION, PARQUET_COLUMN_CACHE_MB
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Dependência opcional: necessária apenas com o backend "parquet"
+    pa = None
+    pq = None
+
+# Backend de armazenamento colunar: cada tabela carregada vira um diretório de arquivos Parquet
+# (compactados e com tipos por coluna), particionado por mês de emissão no formato Hive:
+#   ./tmp/parquet/<tabela>/mes_emissao=2024-01/part-00000.parquet
+# As consultas leem apenas as colunas referenciadas, com os arquivos mapeados em memória pelo Arrow.
+
+PARTITION_COLUMN = "mes_emissao"
+PARTITION_SOURCE_COLUMNS = ("data_emissao",) # Coluna de data preferida para particionar
+DATE_COLUMN_PREFIX = "data_" # Na falta dela, usa a primeira coluna de data
+UNDATED_PARTITION = "sem_data" # Partição das linhas sem data válida
+TABLE_METADATA_FILE = "_table.json"
+
+
+def require_pyarrow():
+    """
+    Raises:
+        ImportError: Se o pyarrow não estiver instalado.
+    """
+    if pa is None:
+        raise ImportError("O backend 'parquet' requer o pacote 'pyarrow' (pip install pyarrow).")
+
+
+def parquet_table_dir(table_name: str) -> str:
+    return os.path.join(PARQUET_DIR, table_name)
+
+
+def parquet_table_exists(table_name: str) -> bool:
+    return os.path.exists(os.path.join(parquet_table_dir(table_name), TABLE_METADATA_FILE))
+
+
+def remove_parquet_table(table_name: str):
+    shutil.rmtree(parquet_table_dir(table_name), ignore_errors=True)
+
+
+def _partition_source_column(columns) -> str:
+    """
+    Escolhe a coluna de data usada para particionar a tabela (None se não houver).
+    """
+    for col in PARTITION_SOURCE_COLUMNS:
+        if col in columns:
+            return col
+    return next((col for col in columns if col.startswith(DATE_COLUMN_PREFIX)), None)
+
+
+def _partition_months(dates: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de datas (texto ISO, ver services/column_types.py) no mês 'AAAA-MM' de cada linha.
+    """
+    return dates.str.slice(0, 7).fillna(UNDATED_PARTITION)
+
+
+class ParquetTableWriter:
+    """
+    Grava os blocos de um CSV como arquivos Parquet em um diretório de staging, que só
+    substitui o diretório da tabela em commit(). Um arquivo com erro (abort) não altera
+    a versão anterior da tabela.
+    Cada partição mantém um pq.ParquetWriter aberto, e cada bloco vira um row group do
+    mesmo arquivo. Um novo arquivo só é aberto na partição quando o esquema inferido do
+    bloco difere do arquivo atual (ex: int64 em um bloco e float64 no seguinte); a leitura
+    converte cada arquivo para os tipos finais da tabela.
+    """
+    def __init__(self, table_name: str):
+        require_pyarrow()
+        self.table_dir = parquet_table_dir(table_name)
+        self.staging_dir = os.path.join(PARQUET_DIR, f"__staging_{table_name}")
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir)
+        self.partition_source = None
+        self._first_chunk = True
+        self._part_number = 0
+        self._writers = {} # Mês da partição (None sem partição) -> pq.ParquetWriter aberto
+
+    def _partition_writer(self, month, schema):
+        """
+        Retorna o writer aberto da partição, abrindo um novo arquivo se ainda não houver
+        um ou se o esquema do bloco for diferente do arquivo atual.
+        """
+        writer = self._writers.get(month)
+        if writer is not None and writer.schema.equals(schema):
+            return writer
+        if writer is not None:
+            writer.close()
+        directory = self.staging_dir if month is None else os.path.join(self.staging_dir, f"{PARTITION_COLUMN}={month}")
+        os.makedirs(directory, exist_ok=True)
+        writer = pq.ParquetWriter(
+            os.path.join(directory, f"part-{self._part_number:05d}.parquet"), schema, compression=PARQUET_COMPRESSION
+        )
+        self._part_number += 1
+        self._writers[month] = writer
+        return writer
+
+    def write_chunk(self, chunk: pd.DataFrame):
+        if self._first_chunk:
+            self.partition_source = _partition_source_column(chunk.columns)
+            self._first_chunk = False
+
+        if self.partition_source is None:
+            partitions = [(None, chunk)]
+        else:
+            partitions = chunk.groupby(_partition_months(chunk[self.partition_source]), sort=False)
+
+        for month, part in partitions:
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            self._partition_writer(month, table.schema).write_table(table)
+
+    def _close_writers(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def commit(self, column_dtypes: dict) -> dict:
+        """
+        Grava os tipos finais das colunas (considerando o arquivo inteiro) e publica a tabela.
+
+        Returns:
+            dict: Os tipos das colunas, incluindo a coluna de partição, se houver.
+        """
+        self._close_writers()
+        column_dtypes = dict(column_dtypes)
+        if self.partition_source is not None:
+            column_dtypes[PARTITION_COLUMN] = pd.api.types.pandas_dtype("object")
+        with open(os.path.join(self.staging_dir, TABLE_METADATA_FILE), "w", encoding="utf-8") as metadata_file:
+            json.dump({
+                "column_dtypes": {col: str(dtype) for col, dtype in column_dtypes.items()},
+                "partition_column": PARTITION_COLUMN if self.partition_source is not None else None,
+                "partition_source": self.partition_source,
+            }, metadata_file)
+        shutil.rmtree(self.table_dir, ignore_errors=True)
+        os.replace(self.staging_dir, self.table_dir)
+        return column_dtypes
+
+    def abort(self):
+        try:
+            self._close_writers()
+        except Exception:
+            pass # Os arquivos do staging são descartados de qualquer forma
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+def load_csv_to_parquet(source, table_name: str, chunk_size: int, progress: LoadProgress = None) -> dict:
+    """
+    Carrega um único CSV (do disco ou de dentro de um ZIP, ver csv_loader.open_csv_source)
+    como uma tabela Parquet particionada, em blocos de até 'chunk_size' linhas.
+    Se falhar ou for cancelada (progress, ou o evento de cancelamento dos processos de carga),
+    o diretório temporário é descartado e a tabela anterior permanece intacta.
+
+    Returns:
+        dict: O resumo do arquivo (ver FileLoadSummary.to_dict); os tipos incluem a coluna de partição.
+              O tempo de cada etapa fica em 'stage_seconds'.
+    """
+    summary = FileLoadSummary()
+    timer = StageTimer()
+    writer = ParquetTableWriter(table_name)
+    try:
+        if progress is not None:
+            on_chunk = lambda rows, bytes_read: progress.advance(table_name, rows, bytes_read)
+        else:
+            on_chunk = lambda rows, bytes_read: check_worker_cancelled()
+        for chunk in iter_normalized_chunks(source, chunk_size, timer, on_chunk):
+            with timer.stage("profile"):
+                summary.update(chunk)
+            with timer.stage("write"):
+                writer.write_chunk(chunk)
+        result = summary.to_dict()
+        with timer.stage("write"):
+            result["column_dtypes"] = writer.commit(result["column_dtypes"])
+    except Exception:
+        writer.abort()
+        raise
+    result["stage_seconds"] = timer.seconds
+    return result
+
+
+def load_csv_files_to_parquet(files: list, chunk_size: int, workers: int, progress: LoadProgress = None) -> list:
+    """
+    Carrega vários CSVs como tabelas Parquet. Como cada tabela é gravada em seu próprio
+    diretório, com 'workers' > 1 os arquivos são carregados inteiramente em paralelo.
+
+    Args:
+        files (list): Lista de tuplas (source, table_name); source segue csv_loader.open_csv_source.
+        chunk_size (int): Quantidade máxima de linhas por bloco.
+        workers (int): Quantidade de processos.
+        progress (LoadProgress): Opcional; progresso por bloco (carga sequencial) ou por arquivo
+                                 concluído (carga paralela), e cancelamento no próximo bloco.
+
+    Returns:
+        list: Para cada arquivo, na mesma ordem de 'files', o resumo do arquivo ou a exceção que impediu
+              a carga (IngestionCancelled para os arquivos interrompidos ou não iniciados por cancelamento).
+    """
+    require_pyarrow()
+    if workers <= 1 or len(files) <= 1:
+        results = []
+        for file_index, (source, table_name) in enumerate(files):
+            try:
+                results.append(load_csv_to_parquet(source, table_name, chunk_size, progress))
+                if progress is not None:
+                    progress.finish_file(table_name, "concluído", results[-1]["row_count"])
+            except IngestionCancelled as e:
+                results.extend([e] * (len(files) - file_index))
+                break
+            except Exception as e:
+                results.append(e)
+        return results
+
+    cancel_event = progress.cancel_event if progress else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_cancel_event, initargs=(cancel_event,)) as executor:
+        futures = [executor.submit(load_csv_to_parquet, source, table_name, chunk_size) for source, table_name in files]
+        results = []
+        for future, (_, table_name) in zip(futures, files):
+            result = future.exception() or future.result()
+            if progress is not None and not isinstance(result, Exception):
+                progress.finish_file(table_name, "concluído", result["row_count"])
+            results.append(result)
+        return results
+
+
+# --- Leitura ---
+def read_parquet_table_metadata(table_name: str) -> dict:
+    """
+    Retorna os metadados gravados em commit() (tipos das colunas e partição) ou None.
+    """
+    try:
+        with open(os.path.join(parquet_table_dir(table_name), TABLE_METADATA_FILE), encoding="utf-8") as metadata_file:
+            return json.load(metadata_file)
+    except FileNotFoundError:
+        return None
+
+
+def _arrow_type(dtype_name: str):
+    """
+    Converte o nome de um dtype do pandas no tipo Arrow usado na leitura.
+    """
+    dtype = pd.api.types.pandas_dtype(dtype_name)
+    if pd.api.types.is_bool_dtype(dtype):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(dtype):
+        return pa.int64()
+    if pd.api.types.is_float_dtype(dtype):
+        return pa.float64()
+    return pa.string()
+
+
+def read_parquet_columns(table_name: str, columns: list):
+    """
+    Lê apenas as colunas pedidas de todas as partições de uma tabela, com os arquivos
+    mapeados em memória. Cada arquivo é convertido para os tipos finais da tabela
+    (um bloco pode ter sido inferido como int64 e outro como float64, por exemplo).
+
+    Returns:
+        pyarrow.Table: As colunas, na ordem pedida, com as linhas sempre na mesma ordem.
+    """
+    require_pyarrow()
+    metadata = read_parquet_table_metadata(table_name)
+    if metadata is None:
+        raise FileNotFoundError(f"Tabela Parquet '{table_name}' não encontrada em '{PARQUET_DIR}'.")
+    column_dtypes = metadata["column_dtypes"]
+    unknown_columns = [col for col in columns if col not in column_dtypes]
+    if unknown_columns:
+        raise KeyError(f"Colunas inexistentes na tabela '{table_name}': {unknown_columns}")
+
+    schema = pa.schema([(col, _arrow_type(column_dtypes[col])) for col in columns])
+    file_columns = [col for col in columns if col != metadata["partition_column"]]
+
+    tables = []
+    table_dir = parquet_table_dir(table_name)
+    for directory, subdirectories, filenames in sorted(os.walk(table_dir)):
+        subdirectories.sort()
+        partition_value = None
+        if metadata["partition_column"] and directory != table_dir:
+            partition_value = os.path.basename(directory).split("=", 1)[1]
+        for filename in sorted(filenames):
+            if not filename.endswith(".parquet"):
+                continue
+            table = pq.read_table(os.path.join(directory, filename), columns=file_columns, memory_map=True)
+            arrays = []
+            for field in schema:
+                if field.name == metadata["partition_column"]:
+                    arrays.append(pa.array([partition_value] * table.num_rows, pa.string()))
+                else:
+                    arrays.append(table.column(field.name).cast(field.type))
+            tables.append(pa.Table.from_arrays(arrays, schema=schema))
+
+    if not tables:
+        return schema.empty_table()
+    return pa.concat_tables(tables)
+
+
+class ParquetColumnCache:
+    """
+    Cache LRU (Singleton) das colunas Parquet já decodificadas, compartilhado entre as consultas.
+    A chave inclui a versão dos dados (ver DataFrameStore.get_data_version), portanto uma nova
+    carga nunca devolve colunas antigas. O limite é dado em memória (PARQUET_COLUMN_CACHE_MB).
+    """
+    _instance = None # Armazena a única instância da classe
+
+    def __new__(cls):
+        """
+        Garante que apenas uma instância de ParquetColumnCache seja criada (Singleton).
+        """
+        if cls._instance is None:
+            cls._instance = super(ParquetColumnCache, cls).__new__(cls)
+            cls._instance._columns = OrderedDict() # (tabela, coluna, versão) -> pyarrow.ChunkedArray
+            cls._instance._size_bytes = 0
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def get_columns(self, table_name: str, columns: list, data_version: int):
+        """
+        Retorna as colunas pedidas como uma pyarrow.Table, lendo do disco apenas as que não estão em cache.
+        """
+        with self._lock:
+            cached = {}
+            for col in columns:
+                key = (table_name, col, data_version)
+                if key in self._columns:
+                    self._columns.move_to_end(key)
+                    cached[col] = self._columns[key]
+
+        missing_columns = [col for col in columns if col not in cached]
+        if missing_columns:
+            table = read_parquet_columns(table_name, missing_columns)
+            with self._lock:
+                for col in missing_columns:
+                    cached[col] = table.column(col)
+                    self._store((table_name, col, data_version), cached[col])
+
+        return pa.table({col: cached[col] for col in columns})
+
+    def _store(self, key, column):
+        if key in self._columns:
+            return
+        budget = PARQUET_COLUMN_CACHE_MB * 1024 * 1024
+        if column.nbytes > budget:
+            return # Coluna maior que o cache inteiro: não é armazenada
+        self._columns[key] = column
+        self._size_bytes += column.nbytes
+        while self._size_bytes > budget:
+            _, evicted = self._columns.popitem(last=False)
+            self._size_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._columns.clear()
+            self._size_bytes = 0
@@ -0,0 +1,89 @@
+# ./services/query_result_cache.py
+
+import re
+import threading
+from collections import OrderedDict
+import pandas as pd
+from services.settings import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_MAX_ROWS
+
+# Separa literais de texto ('...') do restante do SQL, para normalizar apenas fora deles
+_SQL_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+
+def normalize_sql(sql_query: str) -> str:
+    """
+    Normaliza um comando SQL para uso como chave de cache: remove espaços extras e o ';' final
+    e converte para minúsculas tudo que estiver fora de literais de texto (palavras-chave e
+    identificadores não diferenciam maiúsculas no SQLite; os literais sim, e são preservados).
+    """
+    parts = _SQL_STRING_LITERAL.split(sql_query.strip().rstrip(";").strip())
+    normalized_parts = [
+        part if index % 2 else re.sub(r"\s+", " ", part).lower()
+        for index, part in enumerate(parts)
+    ]
+    return "".join(normalized_parts).strip()
+
+
+class QueryResultCache:
+    """
+    Cache LRU (Singleton) dos resultados de SELECTs executados no SQLite.
+    A chave combina o SQL normalizado com a versão dos dados (DataFrameStore.get_data_version),
+    gravada no banco e incrementada a cada carga; assim uma nova carga, mesmo feita por outro
+    processo (ex: ingest.py), invalida naturalmente os resultados antigos.
+    """
+    _instance = None # Armazena a única instância da classe
+
+    def __new__(cls):
+        """
+        Garante que apenas uma instância de QueryResultCache seja criada (Singleton).
+        """
+        if cls._instance is None:
+            cls._instance = super(QueryResultCache, cls).__new__(cls)
+            cls._instance._entries = OrderedDict()
+            cls._instance._lock = threading.Lock()
+            cls._instance._hits = 0
+            cls._instance._misses = 0
+        return cls._instance
+
+    def get(self, sql_query: str, data_version: int):
+        """
+        Retorna uma cópia do resultado em cache para o SQL e a versão dos dados, ou None.
+        """
+        key = (normalize_sql(sql_query), data_version)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key) # Marca como usado mais recentemente
+            self._hits += 1
+        return result.copy()
+
+    def put(self, sql_query: str, data_version: int, result: pd.DataFrame):
+        """
+        Armazena o resultado de um SELECT. Resultados com mais de QUERY_CACHE_MAX_ROWS linhas
+        não são armazenados; ao passar de QUERY_CACHE_MAX_ENTRIES, o menos usado é descartado.
+        """
+        if len(result) > QUERY_CACHE_MAX_ROWS:
+            return
+        key = (normalize_sql(sql_query), data_version)
+        with self._lock:
+            self._entries[key] = result.copy()
+            self._entries.move_to_end(key)
+            while len(self._entries) > QUERY_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: {'hits': int, 'misses': int, 'entries': int}.
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
+
+    def clear(self):
+        """
+        Remove todos os resultados armazenados (as contagens de acertos/falhas são mantidas).
+        """
+        with self._lock:
+            self._entries.clear()
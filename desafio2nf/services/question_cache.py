@@ -0,0 +1,147 @@
+# ./services/question_cache.py
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from services.settings import QUESTION_CACHE_PATH
+from services.text_normalizer import fold_text
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normaliza uma pergunta para uso como chave de cache: sem acentos, em maiúsculas,
+    com espaços colapsados e sem pontuação solta (ex: '?' no fim). Assim
+    "Quantas notas há em São Paulo?" e "quantas  notas ha em sao paulo" têm a mesma chave.
+    """
+    text = fold_text(question)
+    text = re.sub(r"[?!.,;:]+(?=\s|$)", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def schema_hash(table_schemas_context: str) -> str:
+    """
+    Hash do contexto de esquema usado na geração. Mudou o esquema, mudou a chave.
+    """
+    return hashlib.sha256(table_schemas_context.encode("utf-8")).hexdigest()
+
+
+class QuestionCodeCache:
+    """
+    Cache persistente (Singleton) de pergunta -> código gerado (SQL ou Python), gravado em um
+    arquivo SQLite próprio (QUESTION_CACHE_PATH), de modo que sobrevive a reinícios do servidor.
+    A chave é a pergunta normalizada mais o hash do contexto de esquema das tabelas.
+    """
+    _instance = None # Armazena a única instância da classe
+
+    def __new__(cls):
+        """
+        Garante que apenas uma instância de QuestionCodeCache seja criada (Singleton).
+        """
+        if cls._instance is None:
+            cls._instance = super(QuestionCodeCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._hits = 0
+            cls._instance._misses = 0
+        return cls._instance
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexão curta a cada operação: o arquivo pode ser apagado ao limpar o ambiente
+        os.makedirs(os.path.dirname(QUESTION_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(QUESTION_CACHE_PATH)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS question_cache (
+                question_key TEXT NOT NULL,
+                schema_hash TEXT NOT NULL,
+                question TEXT NOT NULL,
+                generated_code TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (question_key, schema_hash)
+            )
+        """)
+        return conn
+
+    def get(self, question: str, table_schemas_context: str):
+        """
+        Retorna o código gerado anteriormente para a mesma pergunta (normalizada) e o mesmo
+        esquema, ou None se não houver.
+        """
+        key = (normalize_question(question), schema_hash(table_schemas_context))
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT generated_code FROM question_cache WHERE question_key = ? AND schema_hash = ?", key
+                ).fetchone()
+                if row is None:
+                    self._misses += 1
+                    return None
+                with conn:
+                    conn.execute(
+                        "UPDATE question_cache SET hits = hits + 1 WHERE question_key = ? AND schema_hash = ?", key
+                    )
+                self._hits += 1
+                return row[0]
+            finally:
+                conn.close()
+
+    def put(self, question: str, table_schemas_context: str, generated_code: str):
+        """
+        Armazena o código gerado para a pergunta e o esquema atuais.
+        """
+        key = (normalize_question(question), schema_hash(table_schemas_context))
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO question_cache "
+                        "(question_key, schema_hash, question, generated_code, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (*key, question, generated_code, datetime.now().isoformat(timespec="seconds"))
+                    )
+            finally:
+                conn.close()
+
+    def invalidate(self, question: str, table_schemas_context: str):
+        """
+        Remove o código armazenado para a pergunta e o esquema atuais (ex: o código falhou ao executar).
+        """
+        key = (normalize_question(question), schema_hash(table_schemas_context))
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM question_cache WHERE question_key = ? AND schema_hash = ?", key)
+            finally:
+                conn.close()
+
+    def clear(self) -> int:
+        """
+        Remove todas as entradas do cache.
+
+        Returns:
+            int: A quantidade de entradas removidas.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return conn.execute("DELETE FROM question_cache").rowcount
+            finally:
+                conn.close()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: {'hits': int, 'misses': int} desde o início do processo e 'entries' (entradas armazenadas).
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                entries = conn.execute("SELECT COUNT(*) FROM question_cache").fetchone()[0]
+            finally:
+                conn.close()
+            return {"hits": self._hits, "misses": self._misses, "entries": entries}
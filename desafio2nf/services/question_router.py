@@ -0,0 +1,65 @@
+# ./services/question_router.py
+
+import re
+from services.text_normalizer import fold_text
+
+# Roteador determinístico do modo de geração direto: decide, sem chamar o LLM, se a pergunta é
+# sobre os DADOS das tabelas (gera SQL) ou sobre os METADADOS/ESTRUTURA (gera código Python).
+# Nomes de tabelas e colunas citados na pergunta são neutros (ex: "Quais tabelas têm a coluna
+# valor_total?" não conta 'valor' e 'total' como indícios de consulta aos dados).
+
+DATA_ROUTE = "data"
+METADATA_ROUTE = "metadata"
+
+# Os padrões são aplicados à pergunta sem acentos e em maiúsculas (ver fold_text)
+METADATA_PATTERNS = [
+    re.compile(r"\b(QUAIS|QUANTAS|QUANTOS|LISTE|LISTAR|LISTA|MOSTRE|MOSTRAR|EXIBA|EXIBIR|CITE)\b( SAO| EXISTEM| HA)?( AS| OS)? (TABELAS?|COLUNAS?|CAMPOS?)\b"),
+    re.compile(r"\b(TABELAS?|COLUNAS?|CAMPOS?) (CARREGAD|EXISTENTE|DISPONIVE)"),
+    re.compile(r"\b(COLUNAS?|CAMPOS?) (DA|DAS|DE|NA|NAS) TABELA"),
+    re.compile(r"\bTIPOS? (DE |DOS |DAS )?(DADOS?|COLUNAS?|CAMPOS?)\b"),
+    re.compile(r"\bMETADADOS?\b"),
+    re.compile(r"\b(ESTRUTURA|ESQUEMA|SCHEMA)\b"),
+    re.compile(r"\bARQUIVOS?( CSV| DE ORIGEM)?\b"),
+    re.compile(r"\b(BACKEND|ARMAZENAMENTO|ARMAZENADAS?|PARQUET)\b"),
+]
+DATA_PATTERNS = [
+    re.compile(r"\b(SOMA|SOMATORIO|TOTAL|TOTAIS|MEDIA|MEDIO|MAIOR|MAIORES|MENOR|MENORES|MAXIMO|MINIMO|RANKING|TOP)\b"),
+    re.compile(r"\bVALOR(ES)?\b"),
+    re.compile(r"\bNOTAS?( FISCA(L|IS))?\b|\bNF-?E?S?\b|\bDOCUMENTOS?\b"),
+    re.compile(r"\b(PRODUTOS?|ITENS|SERVICOS?|EMITENTES?|DESTINATARIOS?|FORNECEDOR(ES)?|CLIENTES?|COMPRADOR(ES)?)\b"),
+    re.compile(r"\bPOR (MES|DIA|ANO|UF|ESTADO|MUNICIPIO|CIDADE|CFOP|NCM)\b"),
+    re.compile(r"\b(JANEIRO|FEVEREIRO|MARCO|ABRIL|MAIO|JUNHO|JULHO|AGOSTO|SETEMBRO|OUTUBRO|NOVEMBRO|DEZEMBRO|20\d{2})\b"),
+    re.compile(r"\b(DISTINT[AO]S?|REGISTROS?|LINHAS?)\b"),
+]
+
+
+def _remove_schema_names(text: str, schema_names: list) -> str:
+    """
+    Remove da pergunta (já normalizada) os nomes de tabelas e colunas citados literalmente.
+    """
+    for name in sorted(schema_names, key=len, reverse=True):
+        folded = fold_text(name)
+        if "_" not in folded and not folded[:1].isdigit():
+            continue # Nomes simples (ex: 'valor') são palavras comuns na pergunta: não são removidos
+        text = re.sub(rf"(?<![A-Z0-9_]){re.escape(folded)}(?![A-Z0-9_])", " ", text)
+    return text
+
+
+def route_question(question: str, table_names: list = (), column_names: list = ()) -> tuple:
+    """
+    Classifica a pergunta como consulta aos dados ou aos metadados.
+    Em caso de empate, a pergunta é tratada como consulta aos dados (o caso mais comum).
+
+    Args:
+        question (str): A pergunta do usuário.
+        table_names (list): Nomes das tabelas carregadas.
+        column_names (list): Nomes das colunas das tabelas carregadas.
+
+    Returns:
+        tuple: (DATA_ROUTE ou METADATA_ROUTE, pontuação de metadados, pontuação de dados).
+    """
+    text = _remove_schema_names(fold_text(question), list(table_names) + list(column_names))
+    metadata_score = sum(1 for pattern in METADATA_PATTERNS if pattern.search(text))
+    data_score = sum(1 for pattern in DATA_PATTERNS if pattern.search(text))
+    route = METADATA_ROUTE if metadata_score > data_score else DATA_ROUTE
+    return route, metadata_score, data_score
@@ -0,0 +1,159 @@
+# ./services/schema_context.py
+
+import threading
+from services.column_glossary import glossary_entry, format_glossary
+from services.dataframe_store import DataFrameStore
+from services.settings import SCHEMA_CONTEXT_TOKEN_BUDGET
+
+# Textos derivados dos metadados que entram nos prompts dos LLMs: o contexto do esquema usado na
+# geração de SQL (completo ou reduzido às tabelas/colunas relevantes para a pergunta) e a tabela
+# Markdown de metadados usada pelo metadata_query_tool.
+# São montados uma única vez por versão dos metadados/dados e reaproveitados em todas as perguntas.
+
+NO_METADATA_CONTEXT = "Não há metadados de tabelas carregados no momento."
+MAX_PROFILE_VALUE_LENGTH = 40 # Textos mais longos são truncados no perfil das colunas
+
+
+def _format_profile_value(value) -> str:
+    """
+    Formata um valor do perfil de uma coluna como literal SQL (textos entre aspas simples).
+    """
+    if isinstance(value, str):
+        if len(value) > MAX_PROFILE_VALUE_LENGTH:
+            value = value[:MAX_PROFILE_VALUE_LENGTH] + "..."
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, float):
+        return str(round(value, 4))
+    return str(value)
+
+
+def format_column_profile(stats: dict) -> str:
+    """
+    Descreve o perfil de uma coluna gerado na carga (ver csv_loader.FileLoadSummary.to_dict).
+    Ex: " [27 distintos; valores: 'SP', 'MG', 'RJ']" ou " [min 0.01, max 5120.0]".
+    """
+    parts = []
+    if stats.get("distinct_count") is not None:
+        parts.append(f"{stats['distinct_count']} distintos")
+    if stats.get("top_values"):
+        parts.append("valores: " + ", ".join(_format_profile_value(value) for value, _ in stats["top_values"]))
+    elif stats.get("min") is not None and stats.get("max") is not None:
+        parts.append(f"min {_format_profile_value(stats['min'])}, max {_format_profile_value(stats['max'])}")
+    return f" [{'; '.join(parts)}]" if parts else ""
+
+
+def format_table_line(store: DataFrameStore, table_name: str, columns: list = None) -> str:
+    """
+    Monta a linha de uma tabela no contexto do esquema.
+
+    Args:
+        store (DataFrameStore): O store com os metadados.
+        table_name (str): O nome da tabela.
+        columns (list): Colunas a incluir, na ordem da tabela (None = todas).
+    """
+    table = store.get_table(table_name)
+    header = f"Tabela '{table_name}'"
+    if table.row_count is not None:
+        header += f" ({table.row_count} linhas)"
+    selected = table.columns if columns is None else [table.column_index[name] for name in columns]
+    line = f"{header}: " + ", ".join(
+        f"{column.column_name} {column.data_type}{format_column_profile(column.stats)}" for column in selected
+    ) + "."
+    indexed_columns = [
+        name for name in store.get_indexed_columns(table_name) if columns is None or name in columns
+    ]
+    if indexed_columns:
+        line += f" Colunas indexadas: {', '.join(indexed_columns)}."
+    return line
+
+
+def build_table_schemas_context(store: DataFrameStore) -> str:
+    """
+    Monta o contexto do esquema: uma linha por tabela com a quantidade de linhas, as colunas,
+    seus tipos e perfis, e as colunas indexadas.
+    Ex: "Tabela 'x' (1000 linhas): uf_emitente object [27 distintos; valores: 'SP', 'MG'], valor float64 [min 0.01, max 10.0]."
+    """
+    lines = [
+        format_table_line(store, table_name)
+        for table_name in store.get_table_names() if store.get_table(table_name) is not None
+    ]
+    return "\n".join(lines) if lines else NO_METADATA_CONTEXT
+
+
+def build_full_schema_context(store: DataFrameStore) -> str:
+    """
+    Contexto completo (sem redução por pergunta): o esquema de todas as tabelas seguido do glossário
+    de todas as colunas carregadas.
+    """
+    context = build_table_schemas_context(store)
+    column_names = dict.fromkeys(
+        name for table_name in store.get_table_names() if store.get_table(table_name) is not None
+        for name in store.get_table(table_name).column_names()
+    )
+    glossary = format_glossary([entry for entry in map(glossary_entry, column_names) if entry is not None])
+    return f"{context}\n{glossary}" if glossary else context
+
+
+class SchemaContext:
+    """
+    Cache (Singleton) dos textos de esquema enviados aos LLMs, recalculados apenas quando a
+    versão dos metadados ou dos dados muda.
+    """
+    _instance = None # Armazena a única instância da classe
+
+    def __new__(cls):
+        """
+        Garante que apenas uma instância de SchemaContext seja criada (Singleton).
+        """
+        if cls._instance is None:
+            cls._instance = super(SchemaContext, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._cache = {} # nome do texto -> (versão, texto)
+        return cls._instance
+
+    def _get(self, name: str, builder):
+        store = DataFrameStore()
+        version = (store.get_metadata_version(), store.get_data_version())
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            text = builder(store)
+            self._cache[name] = (version, text)
+        return text
+
+    def table_schemas_context(self) -> str:
+        """
+        Retorna o contexto do esquema das tabelas para a geração de SQL (ver build_table_schemas_context).
+        """
+        return self._get("table_schemas_context", build_table_schemas_context)
+
+    def full_context(self) -> str:
+        """
+        Retorna o esquema de todas as tabelas mais o glossário completo (ver build_full_schema_context).
+        """
+        return self._get("full_context", build_full_schema_context)
+
+    def schema_index(self):
+        """
+        Retorna o índice léxico do esquema (ver services/schema_index.py), montado uma vez por versão.
+        """
+        from services.schema_index import SchemaIndex # Import local: schema_index usa as funções deste módulo
+        return self._get("schema_index", SchemaIndex)
+
+    def pruned_context(self, question: str, token_budget: int = SCHEMA_CONTEXT_TOKEN_BUDGET) -> str:
+        """
+        Retorna o contexto do esquema apenas com as tabelas e colunas relevantes para a pergunta,
+        limitado a cerca de 'token_budget' tokens, mais o glossário dessas colunas.
+        """
+        return self.schema_index().context_for(question, token_budget)
+
+    def metadata_markdown(self) -> str:
+        """
+        Retorna todos os metadados (tabela, coluna, tipo, arquivo, backend) como tabela Markdown,
+        ou uma string vazia se não houver tabelas carregadas.
+        """
+        return self._get(
+            "metadata_markdown",
+            lambda store: "" if not store.get_table_names() else store.get_all_metadata().to_markdown(index=False)
+        )
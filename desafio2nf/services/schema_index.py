@@ -0,0 +1,204 @@
+# ./services/schema_index.py
+
+import math
+import re
+from services.column_glossary import COLUMN_GLOSSARY, glossary_entry, format_glossary
+from services.schema_context import NO_METADATA_CONTEXT, format_table_line
+from services.text_normalizer import fold_text
+from tools.sqlite_index_builder import KEY_COLUMNS, DATE_COLUMN_PREFIX
+
+# Índice léxico do esquema, usado para enviar ao LLM apenas as tabelas e colunas relevantes
+# para cada pergunta, em vez do esquema completo de todas as tabelas carregadas.
+# Cada coluna é descrita pelos termos do seu nome, do glossário (services/column_glossary.py) e dos
+# valores mais frequentes do perfil da carga; os termos são pesados por IDF entre as colunas.
+# Tabelas com prefixo de período (ex: 202401_nfs_cabecalho) são filtradas pelo mês/ano citado na pergunta.
+
+# Peso dos termos de cada origem na descrição de uma coluna
+NAME_WEIGHT = 3.0
+VALUE_WEIGHT = 2.0
+GLOSSARY_WEIGHT = 1.0
+
+STEM_LENGTH = 5 # Os termos são comparados pelos primeiros caracteres (ex: 'emitente' e 'emitentes')
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "ao", "aos", "as", "com", "da", "das", "de", "do", "dos", "e", "em", "foi", "foram", "ha", "me",
+    "na", "nas", "no", "nos", "o", "os", "ou", "para", "pela", "pelo", "por", "qual", "quais", "quanto",
+    "quantos", "quanta", "quantas", "que", "se", "sao", "ser", "sua", "seu", "tem", "um", "uma", "cada",
+    "campo", "todo", "todos", "toda", "todas", "entre", "sobre",
+}
+
+# Prefixo de período no nome das tabelas (ex: 202401_nfs_itens -> ano 2024, mês 01)
+TABLE_PERIOD_PATTERN = re.compile(r"^(\d{4})(\d{2})_")
+MONTHS = {
+    "janeiro": "01", "fevereiro": "02", "marco": "03", "abril": "04", "maio": "05", "junho": "06",
+    "julho": "07", "agosto": "08", "setembro": "09", "outubro": "10", "novembro": "11", "dezembro": "12",
+}
+YEAR_PATTERN = re.compile(r"\b(20\d{2})\b")
+MONTH_YEAR_PATTERN = re.compile(r"\b(0?[1-9]|1[0-2])[/-](20\d{2})\b|\b(20\d{2})-(0[1-9]|1[0-2])\b")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa da quantidade de tokens de um texto (cerca de 4 caracteres por token).
+    """
+    return len(text) // 4 + 1
+
+
+def tokenize(text: str) -> list:
+    """
+    Quebra um texto em termos comparáveis: sem acentos, em minúsculas, sem palavras vazias e
+    reduzidos aos primeiros STEM_LENGTH caracteres (sem o 's' final).
+    """
+    terms = []
+    for word in TOKEN_PATTERN.findall(fold_text(str(text)).lower()):
+        if word in STOPWORDS:
+            continue
+        if not word.isdigit():
+            if len(word) > 3 and word.endswith("s"):
+                word = word[:-1]
+            word = word[:STEM_LENGTH]
+        terms.append(word)
+    return terms
+
+
+def question_periods(question: str) -> tuple:
+    """
+    Extrai da pergunta os anos e os meses citados.
+    Ex: "notas de janeiro de 2024" -> ({'2024'}, {'01'}); "em 03/2024" -> ({'2024'}, {'03'}).
+
+    Returns:
+        tuple: (conjunto de anos 'AAAA', conjunto de meses 'MM').
+    """
+    text = fold_text(question).lower()
+    years, months = set(YEAR_PATTERN.findall(text)), set()
+    for month, year, iso_year, iso_month in MONTH_YEAR_PATTERN.findall(text):
+        months.add(month.zfill(2) if month else iso_month)
+        years.add(year or iso_year)
+    for word in TOKEN_PATTERN.findall(text):
+        if word in MONTHS:
+            months.add(MONTHS[word])
+    return years, months
+
+
+class SchemaIndex:
+    """
+    Índice do esquema montado a partir do DataFrameStore (nomes das colunas, glossário e perfis
+    da carga). É imutável: o SchemaContext monta um novo índice a cada versão dos metadados/dados.
+    """
+
+    def __init__(self, store):
+        self._tables = [] # (table_name, TableMetadata, (ano, mês) ou None), na ordem de carga
+        self._table_terms = {} # table_name -> termos do nome da tabela (ex: 'nfs', 'itens')
+        self._column_terms = {} # (table_name, column_name) -> {termo: peso}
+        self._table_lines = {} # table_name -> linha completa da tabela no contexto
+        document_terms = {} # column_name -> termos (IDF calculado por nome de coluna, não por tabela)
+
+        for table_name in store.get_table_names():
+            table = store.get_table(table_name)
+            if table is None:
+                continue
+            period = TABLE_PERIOD_PATTERN.match(table_name)
+            self._tables.append((table_name, table, period.groups() if period else None))
+            self._table_lines[table_name] = format_table_line(store, table_name)
+            self._table_terms[table_name] = {term for term in tokenize(table_name.replace("_", " ")) if not term.isdigit()}
+            for column in table.columns:
+                terms = {}
+                sources = [(column.column_name.replace("_", " "), NAME_WEIGHT),
+                           (COLUMN_GLOSSARY.get(column.column_name, ""), GLOSSARY_WEIGHT)]
+                sources += [(value, VALUE_WEIGHT) for value, _ in column.stats.get("top_values") or []]
+                for text, weight in sources:
+                    for term in tokenize(text):
+                        terms[term] = max(terms.get(term, 0.0), weight)
+                self._column_terms[(table_name, column.column_name)] = terms
+                document_terms.setdefault(column.column_name, set()).update(terms)
+
+        document_frequency = {}
+        for terms in document_terms.values():
+            for term in terms:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        total_documents = max(len(document_terms), 1)
+        self._idf = {term: math.log(1 + total_documents / count) for term, count in document_frequency.items()}
+        self._store = store
+
+    def _candidate_tables(self, question: str) -> list:
+        """
+        Tabelas compatíveis com o período citado na pergunta (todas, se nenhuma for compatível).
+        """
+        years, months = question_periods(question)
+        if not years and not months:
+            return self._tables
+        candidates = [
+            entry for entry in self._tables
+            if entry[2] is None or ((not years or entry[2][0] in years) and (not months or entry[2][1] in months))
+        ]
+        return candidates if any(entry[2] is not None for entry in candidates) else self._tables
+
+    def rank(self, question: str) -> list:
+        """
+        Ordena as tabelas pela relevância para a pergunta.
+
+        Returns:
+            list: (table_name, pontuação da tabela, {coluna: pontuação}), da mais para a menos relevante.
+                  Se nenhum termo da pergunta aparecer no esquema, todas as tabelas candidatas com pontuação 0.
+        """
+        question_terms = set(tokenize(question))
+        ranking = []
+        for position, (table_name, table, _) in enumerate(self._candidate_tables(question)):
+            column_scores = {}
+            for column in table.columns:
+                terms = self._column_terms[(table_name, column.column_name)]
+                score = sum(terms[term] * self._idf[term] for term in question_terms if term in terms)
+                if score > 0:
+                    column_scores[column.column_name] = score
+            table_score = sum(column_scores.values())
+            table_score += NAME_WEIGHT * len(question_terms & self._table_terms[table_name])
+            ranking.append((table_name, table_score, column_scores, position))
+        if any(entry[1] > 0 for entry in ranking):
+            ranking = [entry for entry in ranking if entry[1] > 0]
+        ranking.sort(key=lambda entry: (-entry[1], entry[3]))
+        return [entry[:3] for entry in ranking]
+
+    def context_for(self, question: str, token_budget: int) -> str:
+        """
+        Monta o contexto do esquema apenas com as tabelas e colunas relevantes para a pergunta,
+        no mesmo formato de build_table_schemas_context, seguido do glossário das colunas enviadas.
+        As tabelas entram em ordem de relevância enquanto couberem em 'token_budget' (a primeira
+        sempre entra); as entradas do glossário, enquanto houver orçamento.
+        """
+        if not self._tables:
+            return NO_METADATA_CONTEXT
+
+        has_period = any(question_periods(question))
+        lines, used_columns, used_tokens = [], [], 0
+        for table_name, _, column_scores in self.rank(question):
+            if column_scores:
+                # Colunas relevantes, mais as de junção e (se a pergunta cita um período) as de data
+                columns = [
+                    name for name in self._store.get_table(table_name).column_names()
+                    if name in column_scores or name in KEY_COLUMNS
+                    or (has_period and name.startswith(DATE_COLUMN_PREFIX))
+                ]
+                line = format_table_line(self._store, table_name, columns)
+            else: # Nenhuma coluna citada (ou tabela escolhida só pelo nome): envia a tabela inteira
+                columns = self._store.get_table(table_name).column_names()
+                line = self._table_lines[table_name]
+            line_tokens = estimate_tokens(line)
+            if lines and used_tokens + line_tokens > token_budget:
+                continue # Uma tabela menor, mais abaixo no ranking, ainda pode caber
+            lines.append(line)
+            used_tokens += line_tokens
+            used_columns += [name for name in columns if name not in used_columns]
+
+        glossary = []
+        for name in used_columns:
+            entry = glossary_entry(name)
+            if entry is None:
+                continue
+            entry_tokens = estimate_tokens(entry)
+            if used_tokens + entry_tokens > token_budget:
+                break
+            glossary.append(entry)
+            used_tokens += entry_tokens
+        if glossary:
+            lines.append(format_glossary(glossary))
+        return "\n".join(lines)
@@ -0,0 +1,106 @@
+# ./services/settings.py
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv() # Permite sobrescrever as configurações pelo arquivo .env
+
+# --- Caminhos ---
+UPLOAD_DIR = "./tmp"
+DB_PATH = os.path.join(UPLOAD_DIR, "db.sqlite")
+
+# --- Carga de CSV ---
+# Quantidade de linhas lidas por vez de cada CSV. Mantém o pico de memória constante,
+# independentemente do tamanho do arquivo.
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", "100000"))
+
+# Quantidade de processos que leem e normalizam CSVs em paralelo (1 = carga sequencial).
+# A gravação no SQLite continua sendo feita por um único escritor.
+LOAD_WORKERS = int(os.getenv("LOAD_WORKERS", "1"))
+
+# Carga incremental: CSVs com a mesma impressão digital (tamanho + CRC32) da última carga não são
+# relidos, e as tabelas de cargas anteriores são preservadas. Use 0 para sempre recarregar tudo.
+INCREMENTAL_LOAD = os.getenv("INCREMENTAL_LOAD", "1") == "1"
+
+# Quem conduz a carga do ZIP enviado no app: "pipeline" (padrão; pipeline determinístico, sem LLM,
+# ver services/ingestion_pipeline.py) ou "agent" (o DataLoaderAgent da CrewAI escolhe as ferramentas).
+INGESTION_MODE = os.getenv("INGESTION_MODE", "pipeline")
+
+# Linhas por chamada de executemany no caminho de escrita em massa do SQLite (em comandos de
+# várias linhas; ver tools/sqlite_bulk_loader.py).
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "50000"))
+
+# Quantidade máxima de valores distintos contados por coluna durante a carga.
+# Acima deste número a coluna é tratada como de alta cardinalidade.
+STATS_DISTINCT_LIMIT = int(os.getenv("STATS_DISTINCT_LIMIT", "10000"))
+
+# Perfil das colunas enviado ao LLM: os PROFILE_TOP_K valores mais frequentes de cada coluna com
+# até PROFILE_LOW_CARDINALITY_LIMIT valores distintos (ex: uf_emitente, cfop).
+PROFILE_TOP_K = int(os.getenv("PROFILE_TOP_K", "10"))
+PROFILE_LOW_CARDINALITY_LIMIT = int(os.getenv("PROFILE_LOW_CARDINALITY_LIMIT", "100"))
+
+# --- Contexto do esquema enviado ao LLM ---
+# Com 1, cada pergunta recebe apenas as tabelas e colunas relevantes (índice léxico sobre os nomes
+# das colunas, o glossário e os perfis da carga), em vez do esquema completo. Use 0 para enviar tudo.
+SCHEMA_PRUNING = os.getenv("SCHEMA_PRUNING", "1") == "1"
+# Orçamento aproximado, em tokens, do contexto do esquema reduzido (tabelas + glossário).
+SCHEMA_CONTEXT_TOKEN_BUDGET = int(os.getenv("SCHEMA_CONTEXT_TOKEN_BUDGET", "2000"))
+
+# --- Geração de código ---
+# Provedor de LLM: "openai" (padrão) ou "stub" (LLM local determinístico, sem rede, com respostas
+# cadastradas por pergunta; usado em benchmarks e testes de regressão, ver services/llm_stub.py).
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+# Modelo usado por todos os clientes de LLM (criados uma vez por processo, ver services/llm_registry.py).
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+# Arquivo JSON opcional com as respostas do LLM local ({"pergunta": "código", ...}).
+LLM_STUB_RESPONSES = os.getenv("LLM_STUB_RESPONSES", "")
+# Modo de geração do código de cada pergunta: "direct" (padrão; um roteador local decide entre
+# dados e metadados e o código é gerado com uma única chamada ao LLM) ou "crew" (o agente da
+# CrewAI escolhe a ferramenta, o que custa chamadas adicionais ao LLM).
+QUERY_PIPELINE = os.getenv("QUERY_PIPELINE", "direct")
+
+# --- Armazenamento ---
+# Backend padrão das tabelas carregadas: "sqlite" (tabelas no banco) ou "parquet" (arquivos Parquet
+# colunares particionados por mês de emissão, lidos via Arrow; requer o pacote pyarrow).
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+# Codificação por dicionário das colunas de texto repetitivas das tabelas SQLite (tabelas de dimensão
+# '_dim_<coluna>' e views com os nomes originais; ver tools/sqlite_dictionary_encoder.py). Padrão: 0.
+DICTIONARY_ENCODING = os.getenv("DICTIONARY_ENCODING", "0") == "1"
+# Consolidação dos arquivos mensais de um mesmo layout ('202401_nfs_itens', '202402_nfs_itens', ...) em
+# uma tabela por layout ('nfs_itens') com a coluna 'mes_referencia', mantendo views por mês (apenas no
+# SQLite; ver services/fact_tables.py). Padrão: 1.
+CONSOLIDATE_MONTHLY_TABLES = os.getenv("CONSOLIDATE_MONTHLY_TABLES", "1") == "1"
+PARQUET_DIR = os.path.join(UPLOAD_DIR, "parquet")
+# Compressão dos arquivos Parquet ("zstd", "snappy", "gzip" ou "none").
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+# Memória máxima (MiB) das colunas Parquet já decodificadas mantidas em cache entre consultas.
+PARQUET_COLUMN_CACHE_MB = int(os.getenv("PARQUET_COLUMN_CACHE_MB", "512"))
+
+# --- Execução de consultas ---
+# Motor que executa os SELECTs gerados: "sqlite" (padrão) ou "duckdb" (vetorizado e multithread;
+# requer o pacote duckdb). Consultas que o DuckDB rejeita são reexecutadas no SQLite.
+QUERY_ENGINE = os.getenv("QUERY_ENGINE", "sqlite")
+# Threads usadas pelo DuckDB (0 = padrão do DuckDB, uma por núcleo).
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "0"))
+
+# --- Índices ---
+# Quantidade máxima de índices criados automaticamente por tabela após a carga.
+MAX_AUTO_INDEXES_PER_TABLE = int(os.getenv("MAX_AUTO_INDEXES_PER_TABLE", "6"))
+
+# --- Conexões SQLite ---
+# Quantidade máxima de conexões somente leitura abertas ao mesmo tempo (consultas concorrentes).
+READ_POOL_SIZE = int(os.getenv("READ_POOL_SIZE", "4"))
+# Bytes do arquivo do banco mapeados em memória por conexão de leitura (0 desativa o mmap).
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(1024 * 1024 * 1024)))
+# Cache de páginas de cada conexão de leitura, em KiB.
+SQLITE_READ_CACHE_KIB = int(os.getenv("SQLITE_READ_CACHE_KIB", "65536"))
+
+# --- Cache de resultados de consultas ---
+# Quantidade máxima de resultados de SELECT mantidos em memória (LRU).
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+# Resultados com mais linhas do que isto não são armazenados no cache.
+QUERY_CACHE_MAX_ROWS = int(os.getenv("QUERY_CACHE_MAX_ROWS", "10000"))
+
+# --- Cache de pergunta -> código gerado ---
+# Arquivo SQLite próprio, separado do banco de dados, para sobreviver a reinícios do servidor.
+QUESTION_CACHE_PATH = os.getenv("QUESTION_CACHE_PATH", os.path.join(UPLOAD_DIR, "question_cache.sqlite"))
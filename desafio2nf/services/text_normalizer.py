@@ -0,0 +1,74 @@
+# ./services/text_normalizer.py
+
+import unicodedata
+import numpy as np
+import pandas as pd
+
+
+def fold_text(value: str) -> str:
+    """
+    Normalização de referência de um único valor de texto: remove acentos (NFKD + ASCII),
+    converte para maiúsculas e remove espaços no início e no fim.
+    É a mesma regra aplicada historicamente célula a célula pelo carregador de CSV.
+    """
+    return unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('utf-8').upper().strip()
+
+
+def _build_accent_fold_table(last_code_point: int = 0x3000) -> dict:
+    """
+    Pré-calcula uma tabela de tradução (para str.translate) que leva cada caractere não ASCII
+    até 'last_code_point' ao seu equivalente ASCII após NFKD (ou remove o caractere, se não houver).
+    A decomposição NFKD é feita caractere a caractere e não depende dos vizinhos, portanto
+    traduzir com esta tabela produz exatamente o mesmo resultado que normalizar a string inteira.
+    """
+    table = {}
+    for code_point in range(0x80, last_code_point):
+        char = chr(code_point)
+        table[code_point] = unicodedata.normalize('NFKD', char).encode('ascii', 'ignore').decode('utf-8')
+    return table
+
+# Calculada uma única vez ao importar o módulo
+_ACCENT_FOLD_TABLE = _build_accent_fold_table()
+
+
+def _fold_uniques(uniques: pd.Series) -> pd.Series:
+    """
+    Aplica a normalização a um conjunto de valores distintos, usando a tabela de tradução
+    e operações vetorizadas do acessor .str. Valores com caracteres fora da tabela (ex: emojis)
+    caem na normalização de referência, garantindo resultado idêntico.
+    """
+    folded = uniques.str.translate(_ACCENT_FOLD_TABLE)
+    residual = ~folded.map(str.isascii).astype(bool)
+    if residual.any():
+        folded[residual] = uniques[residual].map(
+            lambda x: unicodedata.normalize('NFKD', x).encode('ascii', 'ignore').decode('utf-8')
+        )
+    return folded.str.upper().str.strip()
+
+
+def normalize_text_series(series: pd.Series) -> pd.Series:
+    """
+    Normaliza uma coluna inteira de texto (maiúsculas e sem acentos) de forma vetorizada.
+    A coluna é fatorada e cada valor distinto é normalizado uma única vez; o resultado é
+    expandido de volta pelos códigos. Em colunas repetitivas como 'municipio_emitente' ou
+    'razao_social_emitente' isso reduz o trabalho ao número de valores distintos.
+
+    O resultado é idêntico a series.astype(str).apply(fold_text) do pandas 2 (NaN vira 'NAN').
+
+    Args:
+        series (pd.Series): A coluna a ser normalizada.
+
+    Returns:
+        pd.Series: Uma nova coluna (dtype object) com os valores normalizados e o mesmo índice.
+    """
+    codes, uniques = pd.factorize(series) # Valores nulos recebem o código -1
+    # str() em cada valor distinto reproduz o astype(str) original
+    uniques_as_text = pd.Series([str(value) for value in uniques], dtype=object)
+    folded = _fold_uniques(uniques_as_text).to_numpy(dtype=object)
+    result = folded[codes] if len(folded) else np.empty(len(codes), dtype=object)
+
+    null_mask = codes == -1
+    if null_mask.any():
+        # Nulos distintos (NaN, None) têm textos distintos ('nan', 'None'); normaliza à parte
+        result[null_mask] = normalize_text_series(series[null_mask].map(str)).to_numpy()
+    return pd.Series(result, index=series.index, name=series.name, dtype=object)
@@ -0,0 +1,164 @@
+# ./tools/execution_engine.py
+
+import os
+import threading
+import pandas as pd
+from services.connection_manager import SQLiteConnectionManager
+from services.dataframe_store import DataFrameStore
+from services.logger_config import app_logger
+from services.parquet_store import parquet_table_dir, read_parquet_table_metadata
+from services.settings import DB_PATH, QUERY_ENGINE, DUCKDB_THREADS
+from tools.parquet_query_engine import referenced_tables, run_parquet_select
+from tools.sql_dialect import to_duckdb_sql
+
+try:
+    import duckdb
+except ImportError: # Dependência opcional: necessária apenas com QUERY_ENGINE=duckdb
+    duckdb = None
+
+# Motores de execução dos SELECTs gerados pelo QueryAnalyzerAgent.
+# O SQL é sempre gerado no dialeto do SQLite; o motor é escolhido por implantação (QUERY_ENGINE):
+# - "sqlite": conexões somente leitura do pool (tabelas Parquet via run_parquet_select).
+# - "duckdb": DuckDB embutido, com varreduras vetorizadas e multithread sobre o banco SQLite
+#   anexado e sobre os arquivos Parquet. Consultas que o DuckDB rejeita são reexecutadas no SQLite.
+# As colunas do resultado têm os nomes do SQLite nos dois motores (ver tools/sql_dialect.py).
+
+
+class ExecutionEngine:
+    """
+    Interface dos motores de execução: recebe um SELECT (dialeto SQLite) e devolve um DataFrame.
+    """
+    name = None
+
+    def execute(self, sql_query: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class SQLiteEngine(ExecutionEngine):
+    name = "sqlite"
+
+    def execute(self, sql_query: str) -> pd.DataFrame:
+        store = DataFrameStore()
+        parquet_tables = store.get_tables_by_backend("parquet")
+        used_parquet_tables = referenced_tables(sql_query, list(parquet_tables))
+        if used_parquet_tables:
+            uses_sqlite_tables = bool(referenced_tables(sql_query, list(store.get_tables_by_backend("sqlite"))))
+            return run_parquet_select(
+                sql_query, {table: parquet_tables[table] for table in used_parquet_tables}, store.get_data_version(),
+                uses_sqlite_tables
+            )
+        with SQLiteConnectionManager().read_connection() as conn:
+            return pd.read_sql_query(sql_query, conn)
+
+
+class DuckDBEngine(ExecutionEngine):
+    """
+    Executa os SELECTs em um DuckDB em memória, no próprio processo. O banco SQLite é anexado
+    somente leitura (extensão sqlite do DuckDB) e cada tabela Parquet é exposta como uma view
+    sobre seus arquivos. O catálogo é sincronizado sempre que a versão dos dados muda.
+    Qualquer erro do DuckDB (sintaxe ou função que ele não aceita, extensão indisponível etc.)
+    faz a consulta ser reexecutada no motor de fallback.
+    """
+    name = "duckdb"
+    SQLITE_SCHEMA = "principal"
+
+    def __init__(self, fallback: ExecutionEngine):
+        self._fallback = fallback
+        self._conn = None
+        self._synced_version = None
+        self._sqlite_attached = False
+        self._sqlite_extension_missing = False # Falha ao obter a extensão sqlite: não tenta de novo a cada carga
+        self._parquet_views = []
+        self._lock = threading.Lock()
+
+    def _sync_catalog(self, data_version: int):
+        """
+        (Re)anexa o banco SQLite e recria as views das tabelas Parquet. Chamado com o lock adquirido.
+        """
+        if self._conn is None:
+            self._conn = duckdb.connect(":memory:")
+            if DUCKDB_THREADS > 0:
+                self._conn.execute(f"SET threads = {DUCKDB_THREADS}")
+        if self._synced_version == data_version:
+            return
+
+        attached = self._conn.execute(
+            "SELECT 1 FROM duckdb_databases() WHERE database_name = ?", [self.SQLITE_SCHEMA]
+        ).fetchone()
+        if attached:
+            self._conn.execute(f"DETACH {self.SQLITE_SCHEMA}")
+        self._sqlite_attached = False
+        if os.path.exists(DB_PATH) and not self._sqlite_extension_missing:
+            try:
+                self._conn.execute(
+                    f"ATTACH '{os.path.abspath(DB_PATH)}' AS {self.SQLITE_SCHEMA} (TYPE SQLITE, READ_ONLY)"
+                )
+                self._sqlite_attached = True
+            except duckdb.Error as e:
+                # Ex: extensão sqlite não instalada e sem acesso à internet; consultas às tabelas SQLite usarão o fallback
+                self._sqlite_extension_missing = isinstance(e, duckdb.IOException)
+                app_logger.warning(f"DuckDB: não foi possível anexar o banco SQLite: {e}")
+
+        for view_name in self._parquet_views:
+            self._conn.execute(f'DROP VIEW IF EXISTS "{view_name}"')
+        self._parquet_views = []
+        for table_name in DataFrameStore().get_tables_by_backend("parquet"):
+            metadata = read_parquet_table_metadata(table_name)
+            if metadata is None:
+                continue
+            files_pattern = os.path.join(os.path.abspath(parquet_table_dir(table_name)), "**", "*.parquet")
+            options = "union_by_name = true"
+            if metadata["partition_column"]:
+                options += f", hive_partitioning = true, hive_types = {{'{metadata['partition_column']}': VARCHAR}}"
+            try:
+                self._conn.execute(
+                    f"CREATE VIEW \"{table_name}\" AS SELECT * FROM read_parquet('{files_pattern}', {options})"
+                )
+                self._parquet_views.append(table_name)
+            except duckdb.Error as e:
+                app_logger.warning(f"DuckDB: não foi possível criar a view da tabela Parquet '{table_name}': {e}")
+        self._synced_version = data_version
+
+    def execute(self, sql_query: str) -> pd.DataFrame:
+        data_version = DataFrameStore().get_data_version()
+        with self._lock:
+            self._sync_catalog(data_version)
+            cursor = self._conn.cursor() # Conexão própria da consulta, sobre o mesmo banco em memória
+            sqlite_attached = self._sqlite_attached
+        try:
+            # Opções de sessão: nomes sem esquema também procuram no SQLite anexado; '/' entre inteiros como no SQLite
+            if sqlite_attached:
+                cursor.execute(f"SET search_path = 'main,{self.SQLITE_SCHEMA}'")
+            cursor.execute("SET integer_division = true")
+            return cursor.execute(to_duckdb_sql(sql_query)).df()
+        except duckdb.Error as e:
+            app_logger.warning(f"DuckDB rejeitou a consulta ({type(e).__name__}: {e}); executando no {self._fallback.name}.")
+            return self._fallback.execute(sql_query)
+        finally:
+            cursor.close()
+
+
+_sqlite_engine = SQLiteEngine()
+_duckdb_engine = None # Criado na primeira consulta e reaproveitado (mantém o catálogo e o pool de threads)
+_engine_lock = threading.Lock()
+_warned_engines = set()
+
+
+def get_execution_engine(name: str = QUERY_ENGINE) -> ExecutionEngine:
+    """
+    Retorna o motor de execução configurado. Se o DuckDB for pedido mas não estiver instalado,
+    ou o nome for desconhecido, usa o SQLite.
+
+    Args:
+        name (str): "sqlite" ou "duckdb".
+    """
+    global _duckdb_engine
+    if name == "duckdb" and duckdb is not None:
+        with _engine_lock:
+            if _duckdb_engine is None:
+                _duckdb_engine = DuckDBEngine(fallback=_sqlite_engine)
+        return _duckdb_engine
+    if name != "sqlite" and name not in _warned_engines:
+        _warned_engines.add(name)
+        app_logger.warning(f"Motor de execução '{name}' indisponível (pacote não instalado ou nome inválido); usando o SQLite.")
+    return _sqlite_engine
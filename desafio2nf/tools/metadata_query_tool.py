@@ -2,49 +2,52 @@
 
 import pandas as pd
 from crewai.tools import tool
-from langchain_openai import ChatOpenAI
 from services.dataframe_store import DataFrameStore # Para acessar os metadados
-import os
+from services.schema_context import SchemaContext
 from dotenv import load_dotenv
+from services.llm_registry import get_chat_llm
 
 load_dotenv() # Garante que as variáveis de ambiente sejam carregadas
 
-@tool
-def metadata_query_tool(question: str) -> str:
+NO_METADATA_MESSAGE = "[INFO] Não há metadados carregados. Por favor, carregue os arquivos CSV primeiro."
+
+
+def execute_metadata_code(generated_code: str, all_metadata_df: pd.DataFrame = None):
     """
-    Responde a perguntas sobre a estrutura e os metadados dos dados carregados
-    (tabelas, colunas, tipos, arquivos de origem), gerando e executando código Python
-    para consultar o DataFrameStore.
+    Executa uma expressão Python de consulta aos metadados (ex: "all_metadata_df['table_name'].unique().tolist()")
+    com 'all_metadata_df', 'pd' e 'DataFrameStore' disponíveis, e retorna o valor resultante.
 
     Args:
-        question (str): A pergunta em linguagem natural feita pelo usuário sobre os metadados.
+        generated_code (str): A expressão Python gerada.
+        all_metadata_df (pd.DataFrame): Os metadados; se omitido, são obtidos do DataFrameStore.
 
     Returns:
-        str: O resultado da consulta aos metadados, formatado em Markdown se for tabular,
-             ou uma mensagem de erro.
+        O resultado da expressão (DataFrame, lista, valor, etc.).
     """
-    llm = ChatOpenAI(
-        model="gpt-4o-mini", # Usando o modelo especificado
-        temperature=0,       # Determinístico
-        openai_api_key=os.getenv("OPENAI_API_KEY")
-    )
+    if all_metadata_df is None:
+        all_metadata_df = DataFrameStore().get_all_metadata()
+    local_vars = {"all_metadata_df": all_metadata_df, "pd": pd, "DataFrameStore": DataFrameStore} # Inclui DataFrameStore caso o código gerado tente instanciá-lo
+    exec_globals = {}
+    exec_locals = {"result_exec": None, **local_vars} # result_exec para capturar o resultado
 
-    store = DataFrameStore()
-    all_metadata_df = store.get_all_metadata() # Obtém todos os metadados
+    exec(f"result_exec = {generated_code}", exec_globals, exec_locals)
+    return exec_locals.get("result_exec")
 
-    if all_metadata_df.empty:
-        return "[INFO] Não há metadados carregados. Por favor, carregue os arquivos CSV primeiro."
 
-    # Representação dos metadados para o LLM
+def build_metadata_prompt(question: str, metadata_markdown: str) -> str:
+    """
+    Monta o prompt de geração do código Python de consulta aos metadados.
+    """
     metadata_representation = f"""
     Os metadados disponíveis sobre as tabelas e suas colunas estão neste formato de DataFrame:
-    {all_metadata_df.to_markdown(index=False)}
+    {metadata_markdown}
 
     Colunas do DataFrame de metadados:
     - 'table_name': Nome da tabela no SQLite e nome original do arquivo CSV (ex: 'vendas_2023').
     - 'column_name': Nome da coluna dentro da tabela (ex: 'valor_total').
     - 'data_type': Tipo de dado inferido da coluna (ex: 'int64', 'object', 'float64').
     - 'source_file': Nome do arquivo CSV original de onde a tabela foi carregada (ex: 'vendas_2023.csv').
+    - 'storage_backend': Onde a tabela está armazenada: 'sqlite' ou 'parquet'.
 
     Você deve escrever APENAS o código Python para consultar este DataFrame 'all_metadata_df'.
     O DataFrame 'all_metadata_df' já está disponível no ambiente de execução.
@@ -63,22 +66,65 @@ def metadata_query_tool(question: str) -> str:
     **Sua tarefa é gerar APENAS o código Python que, quando executado, irá responder à seguinte pergunta sobre os metadados:**
     """
 
-    full_prompt = f"{metadata_representation}\nPergunta: \"{question}\"\n\nCódigo Python:"
+    return f"{metadata_representation}\nPergunta: \"{question}\"\n\nCódigo Python:"
+
+
+def clean_generated_code(generated_code: str) -> str:
+    """
+    Remove cercas de código Markdown em volta do código Python gerado.
+    """
+    generated_code = generated_code.strip()
+    # Limpeza básica para remover blocos de código Markdown
+    if "```python" in generated_code.lower():
+        generated_code = generated_code.replace("```python", "").replace("```", "").strip()
+    return generated_code
+
+
+def generate_metadata_code(question: str) -> str:
+    """
+    Gera, com uma única chamada ao LLM, o código Python que responde a uma pergunta sobre os
+    metadados, sem executá-lo (usado diretamente pelo modo de geração 'direct').
+
+    Args:
+        question (str): A pergunta em linguagem natural sobre os metadados.
+
+    Returns:
+        str: O código Python gerado, ou uma mensagem começando com "[INFO]" (sem metadados)
+             ou "[ERRO]" (falha na geração).
+    """
+    # Representação dos metadados para o LLM (em cache até a próxima carga)
+    metadata_markdown = SchemaContext().metadata_markdown()
+    if not metadata_markdown:
+        return NO_METADATA_MESSAGE
 
+    llm = get_chat_llm(temperature=0) # Cliente compartilhado (pool de conexões reaproveitado entre perguntas)
     try:
-        generated_code = llm.predict(full_prompt).strip()
+        return clean_generated_code(llm.predict(build_metadata_prompt(question, metadata_markdown)))
+    except Exception as e:
+        return f"[ERRO] Falha ao gerar o código Python para metadados: {e}"
 
-        # Limpeza básica para remover blocos de código Markdown
-        if "```python" in generated_code.lower():
-            generated_code = generated_code.replace("```python", "").replace("```", "").strip()
 
-        # Executa o código Python gerado
-        local_vars = {"all_metadata_df": all_metadata_df, "pd": pd, "DataFrameStore": DataFrameStore} # Inclui DataFrameStore caso o código gerado tente instanciá-lo
-        exec_globals = {}
-        exec_locals = {"result_exec": None, **local_vars} # result_exec para capturar o resultado
+@tool
+def metadata_query_tool(question: str) -> str:
+    """
+    Responde a perguntas sobre a estrutura e os metadados dos dados carregados
+    (tabelas, colunas, tipos, arquivos de origem), gerando e executando código Python
+    para consultar o DataFrameStore.
 
-        exec(f"result_exec = {generated_code}", exec_globals, exec_locals)
-        execution_result = exec_locals.get("result_exec")
+    Args:
+        question (str): A pergunta em linguagem natural feita pelo usuário sobre os metadados.
+
+    Returns:
+        str: O resultado da consulta aos metadados, formatado em Markdown se for tabular,
+             ou uma mensagem de erro.
+    """
+    generated_code = generate_metadata_code(question)
+    if generated_code.startswith(("[INFO]", "[ERRO]")):
+        return generated_code
+
+    try:
+        # Executa o código Python gerado
+        execution_result = execute_metadata_code(generated_code)
 
         # Formata o resultado
         if isinstance(execution_result, pd.DataFrame):
@@ -89,4 +135,4 @@ def metadata_query_tool(question: str) -> str:
             return f"[AVISO] O código Python foi executado, mas não retornou um resultado explícito ou reconhecível. Código: ```{generated_code}```"
 
     except Exception as e:
-        return f"[ERRO] Falha ao gerar ou executar o código Python para metadados: {e}\nCódigo gerado: ```\n{generated_code}\n```"
\ No newline at end of file
+        return f"[ERRO] Falha ao gerar ou executar o código Python para metadados: {e}\nCódigo gerado: ```\n{generated_code}\n```"
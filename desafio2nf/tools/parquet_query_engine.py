@@ -0,0 +1,208 @@
+# ./tools/parquet_query_engine.py
+
+import atexit
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing, suppress
+import pandas as pd
+from services.logger_config import app_logger
+from services.parquet_store import ParquetColumnCache
+from services.query_result_cache import normalize_sql
+from services.settings import DB_PATH, DUCKDB_THREADS
+from tools.sql_dialect import to_duckdb_sql
+from tools.sqlite_bulk_loader import create_table, insert_dataframe
+
+try:
+    import duckdb
+except ImportError: # Dependência opcional: sem ela, as tabelas Parquet são consultadas pela cópia no SQLite
+    duckdb = None
+
+# Execução de SELECTs sobre tabelas armazenadas em Parquet.
+# O SQL gerado continua no dialeto do SQLite. Apenas as colunas referenciadas na consulta são
+# lidas (via ParquetColumnCache), e as tabelas Arrow resultantes são consultadas diretamente
+# pelo DuckDB, sem cópia. Consultas que também usam tabelas do banco SQLite (ou que o DuckDB
+# rejeita, ou sem o pacote duckdb) rodam em um banco SQLite temporário com as colunas Parquet
+# materializadas e o banco principal anexado (somente leitura); esse banco é reaproveitado
+# enquanto a versão dos dados não muda.
+
+# 'SELECT *' ou 'tabela.*' exigem todas as colunas; COUNT(*) não
+_SELECT_ALL_PATTERN = re.compile(r"(select|,)\s*(distinct\s+)?([a-z0-9_\"]+\.)?\*")
+_IDENTIFIER_PATTERN = re.compile(r"[a-z0-9_]+")
+
+
+def referenced_columns(sql_query: str, table_columns: list) -> list:
+    """
+    Retorna as colunas de uma tabela mencionadas na consulta (todas, no caso de 'SELECT *').
+    A análise é léxica: um nome que aparece apenas dentro de um literal também é lido,
+    o que custa uma coluna a mais mas nunca produz um resultado errado.
+    """
+    normalized = normalize_sql(sql_query)
+    if _SELECT_ALL_PATTERN.search(normalized):
+        return list(table_columns)
+    tokens = set(_IDENTIFIER_PATTERN.findall(normalized))
+    columns = [col for col in table_columns if col in tokens]
+    # Ex: 'SELECT COUNT(*) FROM tabela' não cita colunas, mas precisa da quantidade de linhas
+    return columns or list(table_columns[:1])
+
+
+def referenced_tables(sql_query: str, table_names: list) -> list:
+    """
+    Retorna, dentre 'table_names', as tabelas mencionadas na consulta.
+    """
+    tokens = set(_IDENTIFIER_PATTERN.findall(normalize_sql(sql_query)))
+    return [table for table in table_names if table in tokens]
+
+
+class MaterializedParquetTables:
+    """
+    Banco SQLite (Singleton) com as colunas Parquet já copiadas, reaproveitado pelas consultas enquanto
+    a versão dos dados não muda. O banco fica em um arquivo temporário e, depois de publicado, nunca é
+    alterado: quando uma consulta precisa de colunas que ainda não foram copiadas, um novo arquivo é
+    montado (cópia do atual, com as tabelas afetadas recriadas) e passa a ser o atual. O lock protege
+    apenas a montagem, a troca e a abertura da conexão; cada consulta roda depois, sem o lock, em uma
+    conexão própria (somente leitura), de modo que consultas longas não bloqueiam as demais.
+    """
+    _instance = None # Armazena a única instância da classe
+
+    def __new__(cls):
+        """
+        Garante que apenas uma instância de MaterializedParquetTables seja criada (Singleton).
+        """
+        if cls._instance is None:
+            cls._instance = super(MaterializedParquetTables, cls).__new__(cls)
+            cls._instance._directory = None # Diretório temporário dos bancos, removido ao fim do processo
+            cls._instance._path = None # Banco publicado
+            cls._instance._data_version = None
+            cls._instance._table_columns = {} # Tabela -> colunas já copiadas
+            cls._instance._lock = threading.Lock()
+        return cls._instance
+
+    def _build(self, missing_columns: dict, data_version: int) -> str:
+        """
+        Monta um novo banco: cópia do banco publicado (se houver, da mesma versão dos dados) com as
+        tabelas de 'missing_columns' (tabela -> colunas) recriadas. Chamado com o lock adquirido.
+
+        Returns:
+            str: O caminho do novo banco.
+        """
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="parquet_sqlite_")
+            atexit.register(shutil.rmtree, self._directory, True)
+        fd, path = tempfile.mkstemp(suffix=".sqlite", dir=self._directory)
+        os.close(fd)
+        column_cache = ParquetColumnCache()
+        conn = sqlite3.connect(path)
+        try:
+            if self._path is not None:
+                with closing(sqlite3.connect(f"file:{self._path}?mode=ro", uri=True)) as published:
+                    published.backup(conn)
+            conn.execute("PRAGMA journal_mode = OFF") # Banco descartável: sem journal nem fsync
+            conn.execute("PRAGMA synchronous = OFF")
+            cursor = conn.cursor()
+            for table_name, columns in missing_columns.items():
+                df = column_cache.get_columns(table_name, columns, data_version).to_pandas()
+                cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                create_table(cursor, table_name, df.dtypes.to_dict())
+                insert_dataframe(cursor, table_name, df)
+            conn.commit()
+        finally:
+            conn.close()
+        return path
+
+    def _publish(self, path: str):
+        """
+        Troca o banco publicado. O arquivo anterior é removido; consultas que ainda o leem mantêm a
+        conexão aberta (no Windows, onde um arquivo aberto não pode ser removido, ele fica para o fim
+        do processo). Chamado com o lock adquirido.
+        """
+        if self._path is not None:
+            with suppress(OSError):
+                os.remove(self._path)
+        self._path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Conexão somente leitura com o banco publicado e o banco principal anexado.
+        """
+        # uri=True também habilita URIs no ATTACH
+        conn = sqlite3.connect(f"file:{self._path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            conn.execute("ATTACH DATABASE ? AS principal", (f"file:{os.path.abspath(DB_PATH)}?mode=ro",))
+        except sqlite3.Error:
+            pass # Sem banco principal (nenhuma tabela SQLite carregada): consulta só as tabelas Parquet
+        return conn
+
+    def execute(self, sql_query: str, parquet_tables: dict, data_version: int) -> pd.DataFrame:
+        with self._lock:
+            if self._data_version != data_version:
+                self._publish(None) # Nova versão dos dados: as colunas copiadas são descartadas
+                self._data_version = data_version
+                self._table_columns = {}
+            missing_columns = {}
+            for table_name, table_columns in parquet_tables.items():
+                columns = referenced_columns(sql_query, table_columns)
+                copied_columns = self._table_columns.get(table_name, [])
+                if not set(columns) <= set(copied_columns):
+                    missing_columns[table_name] = [col for col in table_columns
+                                                   if col in columns or col in copied_columns]
+            if self._path is None or missing_columns:
+                self._publish(self._build(missing_columns, data_version))
+                self._table_columns = {**self._table_columns, **missing_columns}
+            # Aberta antes de liberar o lock, para que o arquivo não seja trocado antes da abertura
+            conn = self._connect()
+        try:
+            return pd.read_sql_query(sql_query, conn)
+        finally:
+            conn.close()
+
+    def clear(self):
+        with self._lock:
+            self._publish(None)
+            self._data_version = None
+            self._table_columns = {}
+
+
+def _run_on_arrow(sql_query: str, parquet_tables: dict, data_version: int) -> pd.DataFrame:
+    """
+    Executa a consulta no DuckDB sobre as colunas referenciadas, registradas como tabelas Arrow
+    (o DuckDB as lê diretamente da memória do cache, sem cópia).
+    """
+    column_cache = ParquetColumnCache()
+    conn = duckdb.connect(":memory:")
+    try:
+        if DUCKDB_THREADS > 0:
+            conn.execute(f"SET threads = {DUCKDB_THREADS}")
+        conn.execute("SET integer_division = true") # '/' entre inteiros como no SQLite
+        for table_name, table_columns in parquet_tables.items():
+            columns = referenced_columns(sql_query, table_columns)
+            conn.register(table_name, column_cache.get_columns(table_name, columns, data_version))
+        return conn.execute(to_duckdb_sql(sql_query)).df()
+    finally:
+        conn.close()
+
+
+def run_parquet_select(sql_query: str, parquet_tables: dict, data_version: int,
+                       uses_sqlite_tables: bool = False) -> pd.DataFrame:
+    """
+    Executa um SELECT que referencia tabelas Parquet.
+
+    Args:
+        sql_query (str): O comando SELECT (dialeto SQLite).
+        parquet_tables (dict): Tabela Parquet referenciada -> lista de todas as suas colunas.
+        data_version (int): Versão atual dos dados, usada na chave do cache de colunas.
+        uses_sqlite_tables (bool): Se a consulta também referencia tabelas do banco SQLite
+                                   (junção entre backends; executada na cópia em SQLite).
+
+    Returns:
+        pd.DataFrame: O resultado da consulta.
+    """
+    if duckdb is not None and not uses_sqlite_tables:
+        try:
+            return _run_on_arrow(sql_query, parquet_tables, data_version)
+        except duckdb.Error as e:
+            app_logger.warning(f"DuckDB rejeitou a consulta às tabelas Parquet ({type(e).__name__}: {e}); executando no SQLite.")
+    return MaterializedParquetTables().execute(sql_query, parquet_tables, data_version)
@@ -0,0 +1,151 @@
+# ./tools/sql_dialect.py
+
+import re
+
+# Ajustes dos SELECTs gerados (sempre no dialeto do SQLite) para execução no DuckDB, usados pelo
+# DuckDBEngine (tools/execution_engine.py) e pela execução sobre tabelas Parquet
+# (tools/parquet_query_engine.py). O resultado deve ter o mesmo significado e as mesmas colunas
+# que teria no SQLite, para que o formato da resposta não dependa do motor que executou a consulta.
+
+# Literais de texto e identificadores entre aspas, que não devem ser reescritos
+_QUOTED_PATTERN = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_LIKE_PATTERN = re.compile(r"\blike\b", re.IGNORECASE)
+
+# Tokens relevantes para localizar a lista de colunas do SELECT externo
+_TOKEN_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|[A-Za-z_][A-Za-z0-9_]*|[(),]|\S")
+_IDENTIFIER = r"(?:[A-Za-z_][A-Za-z0-9_]*|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])"
+# Coluna simples (ex: uf_emitente, t."uf_emitente") ou '*': mesmo nome nos dois motores
+_PLAIN_COLUMN_PATTERN = re.compile(rf"^(?:{_IDENTIFIER}\s*\.\s*)?(?:{_IDENTIFIER}|\*)$")
+_ALIAS_PATTERN = re.compile(rf"^(.*?\S)\s+(AS\s+)?({_IDENTIFIER})$", re.IGNORECASE | re.DOTALL)
+# Palavras que terminam uma expressão (ex: CASE ... END) ou que exigem um operando depois
+_NOT_ALIASES = {"END", "NULL", "TRUE", "FALSE", "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP"}
+_OPERATOR_KEYWORDS = {"AND", "OR", "NOT", "IS", "LIKE", "GLOB", "IN", "BETWEEN", "CASE", "WHEN", "THEN", "ELSE",
+                      "DISTINCT", "ESCAPE", "COLLATE", "SELECT", "ALL"}
+_SELECT_LIST_END = {"FROM", "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "WINDOW", "UNION", "INTERSECT", "EXCEPT"}
+# Momento atual no strftime do SQLite ('now', em UTC): sem equivalente exato, a chamada não é reescrita
+_NOW_PATTERN = re.compile(r"^'now'$", re.IGNORECASE)
+
+
+def _has_alias(item: str) -> bool:
+    match = _ALIAS_PATTERN.match(item)
+    if match is None:
+        return False
+    expression, as_keyword, alias = match.groups()
+    if as_keyword:
+        return True
+    last_word = re.search(r"([A-Za-z_][A-Za-z0-9_]*)$", expression)
+    # Alias sem AS (ex: SUM(valor_total) total): a expressão termina em um operando completo
+    return alias.upper() not in _NOT_ALIASES and expression[-1] not in "+-*/%|<>=!~&.,(" \
+        and (last_word is None or last_word.group(1).upper() not in _OPERATOR_KEYWORDS)
+
+
+def sqlite_column_aliases(sql_query: str) -> str:
+    """
+    Acrescenta às expressões sem alias da lista de colunas do SELECT externo o nome que o SQLite
+    daria à coluna do resultado: o próprio texto da expressão. Ex: 'SELECT uf, COUNT(*) FROM t'
+    vira 'SELECT uf, COUNT(*) AS "COUNT(*)" FROM t' (o DuckDB chamaria a coluna de 'count_star()').
+    Colunas simples, '*' e expressões com alias não mudam. Se a lista não puder ser localizada,
+    a consulta é devolvida sem mudanças.
+    """
+    depth = 0
+    items = [] # (início, fim) de cada expressão da lista, no texto original
+    start = end = None
+    for match in _TOKEN_PATTERN.finditer(sql_query):
+        token = match.group(0)
+        upper = token.upper()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and start is None and upper == "SELECT":
+            start = match.end()
+        elif depth == 0 and start is not None and upper in ("DISTINCT", "ALL") and not items \
+             and not sql_query[start:match.start()].strip():
+            start = match.end()
+        elif depth == 0 and start is not None and token == ",":
+            items.append((start, match.start()))
+            start = match.end()
+        elif depth == 0 and start is not None and upper in _SELECT_LIST_END:
+            end = match.start()
+            break
+    if start is None:
+        return sql_query
+    items.append((start, len(sql_query.rstrip().rstrip(";")) if end is None else end))
+
+    rewritten = []
+    position = 0
+    for item_start, item_end in items:
+        item = sql_query[item_start:item_end].strip()
+        if not item or _PLAIN_COLUMN_PATTERN.match(item) or _has_alias(item):
+            continue
+        alias = item.replace('"', '""')
+        item_end = item_start + len(sql_query[item_start:item_end].rstrip())
+        rewritten.append(sql_query[position:item_end] + f' AS "{alias}"')
+        position = item_end
+    return "".join(rewritten) + sql_query[position:]
+
+
+def _call_arguments(sql_query: str, tokens: list, open_index: int):
+    """
+    Argumentos (texto de cada um) da chamada cujo '(' é tokens[open_index], e o índice do ')' que a
+    fecha; (None, None) se os parênteses não se fecham.
+    """
+    depth = 0
+    args = []
+    arg_start = tokens[open_index].end()
+    for index in range(open_index, len(tokens)):
+        token = tokens[index].group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0:
+                args.append(sql_query[arg_start:tokens[index].start()])
+                return args, index
+        elif token == "," and depth == 1:
+            args.append(sql_query[arg_start:tokens[index].start()])
+            arg_start = tokens[index].end()
+    return None, None
+
+
+def duckdb_strftime(sql_query: str) -> str:
+    """
+    Reescreve STRFTIME(formato, valor) do SQLite (formato primeiro, valor em texto) como
+    strftime(TRY_CAST(valor AS TIMESTAMP), formato) do DuckDB (valor primeiro, do tipo TIMESTAMP).
+    TRY_CAST devolve NULL para textos que não são datas, como o strftime do SQLite. Chamadas com
+    modificadores (ex: STRFTIME('%Y', data, 'start of month')) ou com 'now' não mudam: falham no
+    DuckDB e a consulta volta ao SQLite. Ex: "STRFTIME('%Y-%m', data_emissao)" vira
+    "strftime(TRY_CAST(data_emissao AS TIMESTAMP), '%Y-%m')".
+    """
+    tokens = list(_TOKEN_PATTERN.finditer(sql_query))
+    rewritten = []
+    position = 0
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.group(0).upper() == "STRFTIME" and index + 1 < len(tokens) and tokens[index + 1].group(0) == "(":
+            args, close_index = _call_arguments(sql_query, tokens, index + 1)
+            if args is not None and len(args) == 2 and not _NOW_PATTERN.match(args[1].strip()):
+                date_format, value = (duckdb_strftime(arg.strip()) for arg in args)
+                rewritten.append(sql_query[position:token.start()]
+                                 + f"strftime(TRY_CAST({value} AS TIMESTAMP), {date_format})")
+                position = tokens[close_index].end()
+                index = close_index + 1
+                continue
+        index += 1
+    return "".join(rewritten) + sql_query[position:]
+
+
+def to_duckdb_sql(sql_query: str) -> str:
+    """
+    Ajusta um SELECT do dialeto SQLite para o DuckDB:
+    - as colunas do resultado recebem os nomes do SQLite (ver sqlite_column_aliases);
+    - STRFTIME(formato, valor) troca a ordem dos argumentos e converte o valor (ver duckdb_strftime);
+    - LIKE no SQLite ignora maiúsculas/minúsculas (ASCII), portanto vira ILIKE.
+    (A divisão inteira é alinhada pela opção integer_division de cada conexão.)
+    """
+    parts = _QUOTED_PATTERN.split(duckdb_strftime(sqlite_column_aliases(sql_query)))
+    return "".join(
+        part if index % 2 else _LIKE_PATTERN.sub("ILIKE", part) # Índices ímpares são os trechos entre aspas
+        for index, part in enumerate(parts)
+    )
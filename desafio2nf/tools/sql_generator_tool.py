@@ -1,36 +1,17 @@
 # ./tools/sql_generator_tool.py
 
-import os
 from crewai.tools import tool
-from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
+from services.llm_registry import get_chat_llm
 
 load_dotenv() # Garante que as variáveis de ambiente sejam carregadas neste arquivo
 
-@tool
-def sql_generator_tool(question: str, table_schemas_context: str) -> str:
-    """
-    Gera um comando SQL válido e otimizado para SQLite com base em uma pergunta em linguagem natural
-    e no contexto do esquema das tabelas disponíveis.
-
-    Args:
-        question (str): A pergunta em linguagem natural feita pelo usuário sobre os dados.
-        table_schemas_context (str): Uma string formatada contendo o nome das tabelas e seus esquemas
-                                     (nomes das colunas e tipos de dados) do banco de dados SQLite.
-                                     Exemplo: "Tabela 'faturas': id INTEGER, valor REAL, data TEXT.
-                                     Tabela 'clientes': id INTEGER, nome TEXT, cidade TEXT."
 
-    Returns:
-        str: O comando SQL gerado, pronto para ser executado.
-             Em caso de erro na geração, retorna uma mensagem de erro começando com "[ERRO]".
+def build_sql_prompt(question: str, table_schemas_context: str) -> str:
     """
-    llm = ChatOpenAI(
-        model="gpt-4o-mini", # Escolha um modelo adequado
-        temperature=0, # Determinístico para geração de código
-        openai_api_key=os.getenv("OPENAI_API_KEY")
-    )
-
-    prompt = f"""
+    Monta o prompt de geração de SQL a partir da pergunta e do contexto do esquema.
+    """
+    return f"""
     Você é um experiente analista de banco de dados SQL e sua tarefa é gerar comandos SQL para um banco de dados SQLite.
     Seu objetivo é transformar perguntas em linguagem natural em consultas SQL precisas.
 
@@ -49,6 +30,9 @@ def sql_generator_tool(question: str, table_schemas_context: str) -> str:
     - Use alias para colunas ou tabelas se isso melhorar a clareza.
     - Para comparações de texto (cláusulas WHERE, por exemplo), o valor deve ser convertido para MAIÚSCULAS e SEM ACENTOS, pois os dados no banco de dados já foram normalizados desta forma. Use a função `UPPER(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(coluna, 'Á', 'A'), 'À', 'A'), 'Ã', 'A'), 'Â', 'A'), 'É', 'E'), 'È', 'E'), 'Ê', 'E'), 'Í', 'I'), 'Ó', 'O'), 'Õ', 'O'), 'Ô', 'O'), 'Ú', 'U'), 'Ü', 'U'), 'Ç', 'C'))` ou simplifique se a LLM entender, mas priorize a robustez.**
     - Exemplo de comparação de texto: `WHERE UPPER(REPLACE(REPLACE(nome_municipio, 'Á', 'A'), 'Ã', 'A')) = 'CAJAMAR'`
+    - O contexto traz, entre colchetes, o perfil de cada coluna obtido na carga: quantidade de valores distintos, os valores mais frequentes ("valores: ...") ou o mínimo e o máximo. Ao filtrar por uma coluna com "valores", use exatamente a grafia de um desses valores; use o mínimo e o máximo para entender o formato de datas e a escala dos números.
+    - O contexto pode trazer apenas as tabelas e colunas relevantes para a pergunta, seguidas de um "Glossário das colunas". Use somente essas tabelas e colunas, e siga o glossário: colunas descritas como não utilizadas para cálculo servem apenas para busca, ordenação ou identificação.
+    - Exceção: colunas listadas em "Colunas indexadas" devem ser comparadas diretamente, sem funções em volta da coluna (ex: `WHERE uf_emitente = 'SP'`), convertendo apenas o valor procurado para MAIÚSCULAS e SEM ACENTOS. Assim o SQLite usa o índice. Prefira essas colunas em filtros e junções (ex: `JOIN ... ON c.chave_de_acesso = i.chave_de_acesso`).
 
 
     **Exemplos (apenas para seu entendimento, não gere exemplos na resposta):**
@@ -73,11 +57,51 @@ def sql_generator_tool(question: str, table_schemas_context: str) -> str:
     SQL:
     """
 
+
+def clean_generated_sql(sql_command: str) -> str:
+    """
+    Remove cercas de código Markdown que o LLM às vezes coloca em volta do SQL.
+    """
+    sql_command = sql_command.strip()
+    # Validação simples para tentar capturar casos onde a LLM "explica" o SQL
+    if "```sql" in sql_command.lower():
+        sql_command = sql_command.replace("```sql", "").replace("```", "").strip()
+    return sql_command
+
+
+def generate_sql(question: str, table_schemas_context: str) -> str:
+    """
+    Gera o SQL com uma única chamada ao LLM (usado diretamente pelo modo de geração 'direct').
+
+    Args:
+        question (str): A pergunta em linguagem natural.
+        table_schemas_context (str): O contexto do esquema das tabelas.
+
+    Returns:
+        str: O comando SQL gerado, ou uma mensagem de erro começando com "[ERRO]".
+    """
+    llm = get_chat_llm(temperature=0) # Cliente compartilhado (pool de conexões reaproveitado entre perguntas)
     try:
-        sql_command = llm.predict(prompt).strip()
-        # Validação simples para tentar capturar casos onde a LLM "explica" o SQL
-        if "```sql" in sql_command.lower():
-            sql_command = sql_command.replace("```sql", "").replace("```", "").strip()
-        return sql_command
+        return clean_generated_sql(llm.predict(build_sql_prompt(question, table_schemas_context)))
     except Exception as e:
-        return f"[ERRO] Falha ao gerar SQL: {e}"
\ No newline at end of file
+        return f"[ERRO] Falha ao gerar SQL: {e}"
+
+
+@tool
+def sql_generator_tool(question: str, table_schemas_context: str) -> str:
+    """
+    Gera um comando SQL válido e otimizado para SQLite com base em uma pergunta em linguagem natural
+    e no contexto do esquema das tabelas disponíveis.
+
+    Args:
+        question (str): A pergunta em linguagem natural feita pelo usuário sobre os dados.
+        table_schemas_context (str): Uma string formatada contendo o nome das tabelas e seus esquemas
+                                     (nomes das colunas, tipos de dados e perfil) do banco de dados SQLite.
+                                     Exemplo: "Tabela 'faturas': id INTEGER, valor REAL, data TEXT.
+                                     Tabela 'clientes': id INTEGER, nome TEXT, cidade TEXT."
+
+    Returns:
+        str: O comando SQL gerado, pronto para ser executado.
+             Em caso de erro na geração, retorna uma mensagem de erro começando com "[ERRO]".
+    """
+    return generate_sql(question, table_schemas_context)
@@ -0,0 +1,120 @@
+# ./tools/sqlite_bulk_loader.py
+
+import sqlite3
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from services.settings import BULK_INSERT_BATCH_SIZE
+from tools.sqlite_dictionary_encoder import encoded_table_name
+
+# Caminho de escrita em massa no SQLite usado pelo carregador de CSV.
+# Substitui o df.to_sql do pandas por CREATE TABLE com afinidades explícitas e
+# INSERTs de várias linhas por comando (executemany em lotes grandes), dentro de uma transação
+# controlada pelo chamador. O custo da gravação é dominado pela passagem de cada linha do Python
+# ao SQLite (um passo do comando por linha); com ROWS_PER_INSERT linhas por comando, esse custo
+# cai para uma fração (ver benchmarks/bench_sqlite_bulk_write.py).
+
+# Linhas por comando INSERT, limitado pela quantidade de parâmetros por comando
+# (SQLITE_MAX_VARIABLE_NUMBER: 999 nas versões anteriores à 3.32)
+ROWS_PER_INSERT = 64
+SQLITE_MAX_VARIABLES = 999
+
+# Perfil de PRAGMAs aplicado somente durante a carga.
+# - journal_mode=WAL: mantém o ROLLBACK funcionando (necessário para desfazer arquivos com erro)
+#   e permite leituras concorrentes enquanto a carga acontece.
+# - synchronous=OFF: não espera o fsync a cada commit; seguro aqui porque uma carga interrompida
+#   é simplesmente refeita a partir do ZIP.
+# - cache_size negativo = KiB (256 MiB); temp_store=MEMORY para índices e ordenações temporárias.
+LOAD_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "OFF",
+    "cache_size": -262144,
+    "temp_store": "MEMORY",
+}
+
+
+@contextmanager
+def bulk_load_profile(conn: sqlite3.Connection):
+    """
+    Aplica o perfil de PRAGMAs de carga (LOAD_PRAGMAS) na conexão e, ao final (inclusive em
+    caso de erro), restaura os valores que estavam configurados antes.
+    Deve envolver as transações de carga, nunca ser usado dentro de uma transação aberta.
+    """
+    original_values = {
+        pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in LOAD_PRAGMAS
+    }
+    try:
+        for pragma, value in LOAD_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        yield conn
+    finally:
+        for pragma, value in original_values.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+
+
+def sqlite_affinity(dtype) -> str:
+    """
+    Converte um dtype do pandas na afinidade de coluna correspondente do SQLite.
+    """
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def drop_table(cursor, table_name: str):
+    """
+    Remove uma tabela carregada, codificada por dicionário (view + tabela física) ou não.
+    DROP TABLE falha quando o nome é uma view (e DROP VIEW, quando é uma tabela), por isso o tipo é consultado antes.
+    """
+    row = cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (table_name,)).fetchone()
+    if row is not None and row[0] == "view":
+        cursor.execute(f'DROP VIEW "{table_name}"')
+        cursor.execute(f'DROP TABLE IF EXISTS "{encoded_table_name(table_name)}"')
+    elif row is not None:
+        cursor.execute(f'DROP TABLE "{table_name}"')
+
+
+def create_table(cursor, table_name: str, column_dtypes: dict):
+    """
+    (Re)cria uma tabela com afinidades explícitas para cada coluna.
+
+    Args:
+        cursor: Cursor da conexão de escrita.
+        table_name (str): Nome da tabela.
+        column_dtypes (dict): Nome da coluna -> dtype do pandas.
+    """
+    columns_sql = ", ".join(f'"{col}" {sqlite_affinity(dtype)}' for col, dtype in column_dtypes.items())
+    drop_table(cursor, table_name) # Inclusive a versão codificada por dicionário, se houver
+    cursor.execute(f'CREATE TABLE "{table_name}" ({columns_sql})')
+
+
+def insert_dataframe(cursor, table_name: str, df: pd.DataFrame, batch_size: int = BULK_INSERT_BATCH_SIZE):
+    """
+    Insere as linhas de um DataFrame em lotes de 'batch_size' linhas via executemany, com
+    ROWS_PER_INSERT linhas por comando. Cada coluna é convertida de uma vez para objetos Python
+    nativos em uma matriz linha x coluna, cujos parâmetros são fatiados diretamente da lista
+    achatada (sem montar uma tupla por linha); NaN é gravado como NULL pelo SQLite.
+    """
+    if df.empty:
+        return
+    column_count = len(df.columns)
+    rows_per_insert = max(1, min(ROWS_PER_INSERT, SQLITE_MAX_VARIABLES // column_count))
+    row_placeholders = "(" + ", ".join(["?"] * column_count) + ")"
+    multi_row_sql = f'INSERT INTO "{table_name}" VALUES ' + ", ".join([row_placeholders] * rows_per_insert)
+    single_row_sql = f'INSERT INTO "{table_name}" VALUES {row_placeholders}'
+
+    values = np.empty((len(df), column_count), dtype=object)
+    for i in range(column_count):
+        values[:, i] = df.iloc[:, i].to_numpy(dtype=object)
+    batch_size = max(batch_size // rows_per_insert, 1) * rows_per_insert # Lotes com comandos completos
+    for start in range(0, len(values), batch_size):
+        batch = values[start:start + batch_size]
+        full_rows = len(batch) // rows_per_insert * rows_per_insert
+        if full_rows:
+            params = batch[:full_rows].ravel().tolist()
+            step = rows_per_insert * column_count
+            cursor.executemany(multi_row_sql, (params[i:i + step] for i in range(0, len(params), step)))
+        if full_rows < len(batch):
+            cursor.executemany(single_row_sql, batch[full_rows:].tolist())
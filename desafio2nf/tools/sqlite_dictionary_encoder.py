@@ -0,0 +1,152 @@
+# ./tools/sqlite_dictionary_encoder.py
+
+import sqlite3
+import time
+import pandas as pd
+from services.column_types import column_type, COLUMN_DATE
+
+# Codificação por dicionário (opcional, DICTIONARY_ENCODING) das colunas de texto repetitivas de uma
+# tabela recém-carregada no SQLite, como razao_social_emitente, municipio_emitente, natureza_da_operacao,
+# ncm_sh_tipo_de_produto e unidade: cada valor distinto é gravado uma única vez em uma tabela de
+# dimensão por coluna ('_dim_<coluna>', compartilhada entre as tabelas e os meses, com códigos estáveis)
+# e a tabela física ('__enc_<tabela>') guarda apenas o código inteiro. Uma view com o nome e as colunas
+# originais junta a tabela física às dimensões, portanto o SQL gerado continua funcionando sem mudanças.
+# Filtros por igualdade em uma coluna codificada (ex: WHERE municipio_emitente = 'CURITIBA') usam o
+# índice único da dimensão e o índice do código na tabela física.
+
+ENCODED_TABLE_PREFIX = "__enc_"
+DIMENSION_TABLE_PREFIX = "_dim_"
+
+# Uma coluna de texto é codificada quando tem até STATS_DISTINCT_LIMIT valores distintos (perfil da
+# carga), cada valor se repete em média ao menos DICTIONARY_REPETITION vezes e o texto tem em média
+# ao menos DICTIONARY_MIN_AVG_LENGTH caracteres (códigos curtos, como uf_emitente, não compensam a junção).
+# Datas não são codificadas: filtros por período precisam comparar os valores na própria tabela.
+DICTIONARY_REPETITION = 10
+DICTIONARY_MIN_AVG_LENGTH = 6
+
+
+def encoded_table_name(table_name: str) -> str:
+    return f"{ENCODED_TABLE_PREFIX}{table_name}"
+
+
+def dimension_table_name(column_name: str) -> str:
+    return f"{DIMENSION_TABLE_PREFIX}{column_name}"
+
+
+def select_dictionary_columns(summary: dict) -> list:
+    """
+    Escolhe as colunas de texto de uma tabela que devem ser codificadas por dicionário.
+
+    Args:
+        summary (dict): O resumo do arquivo carregado (ver FileLoadSummary.to_dict).
+
+    Returns:
+        list: Os nomes das colunas, na ordem da tabela.
+    """
+    row_count = summary["row_count"]
+    selected = []
+    for col, dtype in summary["column_dtypes"].items():
+        stats = summary["column_stats"].get(col) or {}
+        distinct_count = stats.get("distinct_count")
+        avg_length = stats.get("avg_length")
+        if not pd.api.types.is_object_dtype(pd.api.types.pandas_dtype(str(dtype))) \
+           or distinct_count is None or avg_length is None or (column_type(col) or (None,))[0] == COLUMN_DATE:
+            continue
+        if distinct_count * DICTIONARY_REPETITION <= row_count and avg_length >= DICTIONARY_MIN_AVG_LENGTH:
+            selected.append(col)
+    return selected
+
+
+def table_size_bytes(conn: sqlite3.Connection, table_names: list):
+    """
+    Bytes ocupados pelas páginas das tabelas (sem os índices), pela tabela virtual dbstat.
+    Retorna None se o SQLite foi compilado sem dbstat.
+    """
+    placeholders = ", ".join(["?"] * len(table_names))
+    try:
+        return conn.execute(f"SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN ({placeholders})",
+                            table_names).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def time_full_scan(conn: sqlite3.Connection, table_name: str, columns: list) -> float:
+    """
+    Tempo (em segundos) de uma varredura completa da tabela (ou view), lendo todas as colunas de
+    cada linha. Em uma view codificada, cada coluna codificada custa a busca na sua dimensão,
+    como nas consultas geradas (contar apenas uma coluna deixaria o SQLite omitir as junções).
+    """
+    counts_sql = ", ".join(f'COUNT("{col}")' for col in columns)
+    start = time.perf_counter()
+    conn.execute(f'SELECT {counts_sql} FROM "{table_name}"').fetchone()
+    return time.perf_counter() - start
+
+
+def encode_table(conn: sqlite3.Connection, table_name: str, summary: dict) -> dict:
+    """
+    Codifica por dicionário as colunas escolhidas por select_dictionary_columns de uma tabela
+    recém-carregada, em uma única transação: a tabela passa a ser a view de mesmo nome sobre
+    '__enc_<tabela>' e as dimensões '_dim_<coluna>'. Mede o tamanho e o tempo de uma varredura
+    completa antes (na tabela) e depois (na view, que é o que as consultas geradas leem).
+    A conexão deve ter sido aberta com isolation_level=None (transações explícitas).
+
+    Returns:
+        dict: {'columns', 'dimensions', 'bytes_before', 'bytes_after', 'scan_seconds_before',
+               'scan_seconds_after'}, ou None se nenhuma coluna foi codificada. bytes_after é o tamanho
+              da tabela física, sem as dimensões (compartilhadas com outras tabelas; ver table_size_bytes).
+              Os tamanhos são None sem a tabela virtual dbstat.
+    """
+    columns = select_dictionary_columns(summary)
+    if not columns:
+        return None
+
+    table_info = conn.execute(f'PRAGMA table_info("{table_name}")').fetchall()
+    column_types = {row[1]: row[2] for row in table_info}
+    all_columns = [row[1] for row in table_info]
+    encoded_table = encoded_table_name(table_name)
+    dimensions = [dimension_table_name(col) for col in columns]
+
+    bytes_before = table_size_bytes(conn, [table_name])
+    scan_seconds_before = time_full_scan(conn, table_name, all_columns)
+
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        for col, dimension in zip(columns, dimensions):
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS "{dimension}" (id INTEGER PRIMARY KEY, valor TEXT NOT NULL UNIQUE)')
+            # Dimensões só recebem valores novos: os códigos já usados por outras tabelas não mudam
+            cursor.execute(f'INSERT OR IGNORE INTO "{dimension}" (valor) '
+                           f'SELECT DISTINCT "{col}" FROM "{table_name}" WHERE "{col}" IS NOT NULL')
+
+        columns_sql = ", ".join(
+            f'"{col}" {"INTEGER" if col in columns else column_types[col]}' for col in all_columns
+        )
+        cursor.execute(f'DROP TABLE IF EXISTS "{encoded_table}"')
+        cursor.execute(f'CREATE TABLE "{encoded_table}" ({columns_sql})')
+        aliases = {col: f"d{position}" for position, col in enumerate(columns)}
+        select_sql = ", ".join(f'{aliases[col]}.id' if col in columns else f't."{col}"' for col in all_columns)
+        joins_sql = " ".join(f'LEFT JOIN "{dimension_table_name(col)}" {aliases[col]} ON {aliases[col]}.valor = t."{col}"'
+                             for col in columns)
+        cursor.execute(f'INSERT INTO "{encoded_table}" SELECT {select_sql} FROM "{table_name}" t {joins_sql} '
+                       f'ORDER BY t.rowid')
+
+        # A view mantém o nome, as colunas e a ordem das linhas da tabela original
+        cursor.execute(f'DROP TABLE "{table_name}"')
+        view_select_sql = ", ".join(f'{aliases[col]}.valor AS "{col}"' if col in columns else f't."{col}"'
+                                    for col in all_columns)
+        view_joins_sql = " ".join(f'LEFT JOIN "{dimension_table_name(col)}" {aliases[col]} ON {aliases[col]}.id = t."{col}"'
+                                  for col in columns)
+        cursor.execute(f'CREATE VIEW "{table_name}" AS SELECT {view_select_sql} FROM "{encoded_table}" t {view_joins_sql}')
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+    return {
+        "columns": columns,
+        "dimensions": dimensions,
+        "bytes_before": bytes_before,
+        "bytes_after": table_size_bytes(conn, [encoded_table]),
+        "scan_seconds_before": scan_seconds_before,
+        "scan_seconds_after": time_full_scan(conn, table_name, all_columns),
+    }
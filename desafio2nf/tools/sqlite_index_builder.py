@@ -0,0 +1,95 @@
+# ./tools/sqlite_index_builder.py
+
+import sqlite3
+import pandas as pd
+from services.settings import MAX_AUTO_INDEXES_PER_TABLE
+
+# Etapa pós-carga que cria índices nas colunas usadas em junções e filtros,
+# a partir das estatísticas coletadas durante a leitura dos CSVs (FileLoadSummary).
+
+# Colunas de junção entre cabeçalho e itens, conforme o glossário das colunas (services/column_glossary.py)
+# ("chave_de_acesso: valor único na tabela ..._nfs_cabecalho e chave estrangeira na tabela ..._nfs_itens").
+KEY_COLUMNS = ("chave_de_acesso",)
+
+# Colunas de data/hora (ex: data_emissao), usadas em filtros por período
+DATE_COLUMN_PREFIX = "data_"
+
+# Uma coluna é considerada filtro categórico (ex: uf_emitente, municipio_emitente, cfop) quando tem
+# ao menos MIN_FILTER_DISTINCT valores distintos e, em média, cada valor se repete FILTER_REPETITION vezes.
+# Colunas com 1 ou 2 valores (ex: 'SIM'/'NAO') não se beneficiam de índice.
+MIN_FILTER_DISTINCT = 3
+FILTER_REPETITION = 10
+
+# Linhas amostradas por índice no ANALYZE pós-carga (PRAGMA analysis_limit): estatísticas aproximadas,
+# mas com custo limitado em tabelas grandes, em vez de uma leitura completa de cada índice
+ANALYSIS_LIMIT = 1000
+
+
+def select_index_columns(summary: dict, max_indexes: int = MAX_AUTO_INDEXES_PER_TABLE) -> list:
+    """
+    Escolhe as colunas de uma tabela que devem receber índice.
+
+    Args:
+        summary (dict): O resumo do arquivo carregado (ver FileLoadSummary.to_dict).
+        max_indexes (int): Quantidade máxima de índices para a tabela.
+
+    Returns:
+        list: Tuplas (column_name, reason), em ordem de prioridade; reason é 'chave', 'data' ou 'filtro'.
+    """
+    column_dtypes = summary["column_dtypes"]
+    column_stats = summary["column_stats"]
+    row_count = summary["row_count"]
+
+    selected = [(col, "chave") for col in column_dtypes if col in KEY_COLUMNS]
+    selected += [(col, "data") for col in column_dtypes if col.startswith(DATE_COLUMN_PREFIX)]
+
+    filter_candidates = []
+    for col, stats in column_stats.items():
+        distinct_count = stats["distinct_count"]
+        if col in KEY_COLUMNS or col.startswith(DATE_COLUMN_PREFIX):
+            continue
+        if pd.api.types.is_float_dtype(column_dtypes[col]) or distinct_count is None:
+            continue # Valores monetários/quantidades e colunas de alta cardinalidade não são filtros categóricos
+        if distinct_count >= MIN_FILTER_DISTINCT and distinct_count * FILTER_REPETITION <= row_count:
+            filter_candidates.append((distinct_count, col))
+
+    # Mais valores distintos = filtro mais seletivo, portanto com maior prioridade
+    selected += [(col, "filtro") for _, col in sorted(filter_candidates, reverse=True)]
+    return selected[:max_indexes]
+
+
+def build_indexes(conn: sqlite3.Connection, table_name: str, summary: dict) -> list:
+    """
+    Cria os índices escolhidos por select_index_columns para uma tabela recém-carregada.
+    Os índices são removidos junto com a tabela quando ela é recriada em uma nova carga.
+
+    Returns:
+        list: Um dict por índice criado, com as chaves 'index_name', 'column_name' e 'reason'.
+    """
+    indexes = []
+    for column_name, reason in select_index_columns(summary):
+        index_name = f"idx_{table_name}_{column_name}"
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ("{column_name}")')
+        indexes.append({"index_name": index_name, "column_name": column_name, "reason": reason})
+    return indexes
+
+
+def analyze_database(conn: sqlite3.Connection, index_names: list = None):
+    """
+    Atualiza as estatísticas do planejador do SQLite (tabela sqlite_stat1),
+    para que os novos índices sejam efetivamente escolhidos nas consultas.
+
+    Com index_names, apenas esses índices são analisados (as tabelas e índices que a carga não
+    tocou mantêm as estatísticas anteriores); sem, o banco inteiro. Cada índice é amostrado em até
+    ANALYSIS_LIMIT linhas (PRAGMA analysis_limit, ignorado por versões do SQLite anteriores à 3.32).
+
+    Args:
+        conn (sqlite3.Connection): A conexão de escrita.
+        index_names (list): Opcional; os nomes dos índices a analisar.
+    """
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    if index_names is None:
+        conn.execute("ANALYZE")
+        return
+    for index_name in dict.fromkeys(index_names):
+        conn.execute(f'ANALYZE "{index_name}"')
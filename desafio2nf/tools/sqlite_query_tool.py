@@ -4,12 +4,42 @@ import sqlite3
 import pandas as pd
 import os
 from crewai.tools import tool
+from services.connection_manager import SQLiteConnectionManager
+from services.dataframe_store import DataFrameStore
+from services.query_result_cache import QueryResultCache
+from services.settings import DB_PATH
+from tools.execution_engine import get_execution_engine
+
+
+def run_select_query(sql_query: str) -> pd.DataFrame:
+    """
+    Executa um SELECT em uma conexão somente leitura do pool, passando antes pelo cache de
+    resultados. A chave do cache inclui a versão dos dados, portanto uma nova carga de CSVs
+    nunca devolve resultados antigos. A consulta é executada pelo motor configurado em
+    QUERY_ENGINE (ver tools/execution_engine.py).
+
+    Args:
+        sql_query (str): O comando SELECT.
+
+    Returns:
+        pd.DataFrame: O resultado da consulta.
+    """
+    cache = QueryResultCache()
+    data_version = DataFrameStore().get_data_version()
+    df = cache.get(sql_query, data_version)
+    if df is None:
+        df = get_execution_engine().execute(sql_query)
+        cache.put(sql_query, data_version, df)
+    return df
+
 
 @tool
 def sqlite_query_tool(sql_query: str) -> str:
     """
     Executa um comando SQL no banco de dados SQLite localizado em './tmp/db.sqlite'.
     Retorna os resultados da consulta em formato de tabela Markdown.
+    SELECTs usam uma conexão somente leitura do pool compartilhado (SQLiteConnectionManager)
+    e passam pelo cache de resultados; os demais comandos usam a conexão de escrita.
 
     Args:
         sql_query (str): O comando SQL a ser executado.
@@ -18,31 +48,28 @@ def sqlite_query_tool(sql_query: str) -> str:
         str: Os resultados da consulta formatados como uma tabela Markdown,
              ou uma mensagem de erro se a execução falhar.
     """
-    db_path = "./tmp/db.sqlite"
+    db_path = DB_PATH
 
     if not os.path.exists(db_path):
         return f"[ERRO] Banco de dados SQLite não encontrado em '{db_path}'. Certifique-se de que os dados foram carregados."
 
-    conn = None
+    connection_manager = SQLiteConnectionManager()
     try:
-        conn = sqlite3.connect(db_path)
         # Para SELECTs, pandas.read_sql_query é excelente
         if sql_query.strip().lower().startswith("select"):
-            df = pd.read_sql_query(sql_query, conn)
+            df = run_select_query(sql_query)
             if df.empty:
                 return "A consulta SQL foi executada com sucesso, mas não retornou resultados."
             return df.to_markdown(index=False) # Formata o DataFrame como tabela Markdown
         else:
             # Para comandos DDL/DML como CREATE, INSERT, DELETE, UPDATE
-            cursor = conn.cursor()
-            cursor.execute(sql_query)
-            conn.commit()
+            with connection_manager.write_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql_query)
+            DataFrameStore().bump_data_version() # Os dados podem ter mudado
             return f"Comando SQL (não SELECT) executado com sucesso."
 
     except sqlite3.Error as e:
         return f"[ERRO] Erro ao executar SQL: {e}\nSQL tentado: ```{sql_query}```"
     except Exception as e:
         return f"[ERRO] Erro inesperado ao executar SQL: {e}\nSQL tentado: ```{sql_query}```"
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file